@@ -0,0 +1,25 @@
+"""Add documento_sha256 to convencoes
+
+Revision ID: 002_documento_sha256
+Revises: 001_initial
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_documento_sha256'
+down_revision = '001_initial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('convencoes', sa.Column('documento_sha256', sa.String(64), nullable=True))
+    op.create_index('ix_convencoes_documento_sha256', 'convencoes', ['documento_sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_convencoes_documento_sha256', table_name='convencoes')
+    op.drop_column('convencoes', 'documento_sha256')
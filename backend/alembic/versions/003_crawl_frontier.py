@@ -0,0 +1,53 @@
+"""Add crawl frontier and crawl state
+
+Revision ID: 003_crawl_frontier
+Revises: 002_documento_sha256
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '003_crawl_frontier'
+down_revision = '002_documento_sha256'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'crawl_frontier',
+        sa.Column('instrumento_id', sa.String(50), primary_key=True),
+        sa.Column('stage', sa.String(20), nullable=False, server_default='DESCOBERTO'),
+        sa.Column('metadados', postgresql.JSONB(), nullable=True),
+        sa.Column('data_publicacao', sa.Date(), nullable=True),
+        sa.Column('documento_path', sa.Text(), nullable=True),
+        sa.Column('documento_sha256', sa.String(64), nullable=True),
+        sa.Column('documento_ext', sa.String(10), nullable=True),
+        sa.Column('texto_extraido', sa.Text(), nullable=True),
+        sa.Column('formato_documento', sa.String(20), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('discovered_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+    op.create_index('ix_crawl_frontier_stage', 'crawl_frontier', ['stage'])
+    op.create_index('ix_crawl_frontier_data_publicacao', 'crawl_frontier', ['data_publicacao'])
+    op.create_index('ix_crawl_frontier_discovered_at', 'crawl_frontier', ['discovered_at'])
+
+    op.create_table(
+        'crawl_state',
+        sa.Column('chave', sa.String(100), primary_key=True),
+        sa.Column('valor', sa.Text(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('crawl_state')
+    op.drop_index('ix_crawl_frontier_discovered_at', table_name='crawl_frontier')
+    op.drop_index('ix_crawl_frontier_data_publicacao', table_name='crawl_frontier')
+    op.drop_index('ix_crawl_frontier_stage', table_name='crawl_frontier')
+    op.drop_table('crawl_frontier')
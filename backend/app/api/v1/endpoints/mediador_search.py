@@ -2,18 +2,158 @@
 Endpoint para buscar convenções diretamente do Mediador MTE em tempo real
 """
 from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from app.core.database import get_db
 from app.api.v1.endpoints.auth import get_current_user
 from app.models.user import User
-from app.services.mediador_api import MediadorAPIClient
+from app.services.mediador_async import get_async_mediador_client
+from app.services.circuit_breaker import get_circuit_states
+from app.services.http_transport import get_connection_stats
+from app.services.mirrors import get_mirror_stats
+from app.services.search_cache import MISS, get_search_cache, normalize_search_key
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Formatos de resposta em streaming: um evento por linha (NDJSON) ou Server-Sent Events
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
+
+STREAM_QUERY = Query(
+    None,
+    pattern="^(ndjson|sse)$",
+    description="Transmite os resultados à medida que ficam prontos (ndjson ou sse)",
+)
+
+
+def _format_event(mode: str, event: str, data: Dict) -> str:
+    """Serializa um evento no formato de streaming escolhido"""
+    payload = json.dumps({"event": event, **data}, ensure_ascii=False, default=str)
+    if mode == "sse":
+        return f"event: {event}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
+def _streaming_response(mode: str, events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type=STREAM_MEDIA_TYPES[mode],
+        # Evitar que proxies segurem os eventos em buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_search(
+    mode: str,
+    search_params: Dict,
+    limit: int,
+    banco_local: Optional[List[Dict]] = None,
+    page_size: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Eventos de uma busca: banco_local (se houver), uma página do Mediador MTE
+    por evento à medida que é extraída, e um resumo final
+    """
+    started = time.monotonic()
+    seen_ids = set()
+    total_local = 0
+    total_live = 0
+    pages = 0
+    cache_status = None
+    has_more = False
+    error = None
+    # Quantos resultados ao vivo ainda cabem na resposta
+    budget = page_size if page_size is not None else limit
+
+    def novos(resultados: List[Dict]) -> List[Dict]:
+        nonlocal budget, has_more
+        selecionados = []
+        for convencao in resultados:
+            instrumento_id = convencao.get('instrumento_id')
+            if instrumento_id in seen_ids:
+                continue
+            if budget <= 0:
+                has_more = True
+                break
+            seen_ids.add(instrumento_id)
+            selecionados.append(convencao)
+            budget -= 1
+        return selecionados
+
+    if banco_local is not None:
+        seen_ids.update(r.get('instrumento_id') for r in banco_local)
+        total_local = len(banco_local)
+        budget -= total_local
+        yield _format_event(mode, "banco_local", {
+            "results": banco_local,
+            "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+        })
+
+    live = get_async_mediador_client()
+    cache = get_search_cache()
+    cache_key = normalize_search_key(limit=limit, **search_params)
+
+    try:
+        cached = await live.run(
+            cache.lookup,
+            cache_key,
+            lambda: live.client.search_convencoes(limit=limit, **search_params)
+        )
+        if cached is not None:
+            resultados, cache_status = cached
+            selecionados = novos(resultados)
+            total_live += len(selecionados)
+            yield _format_event(mode, "mediador_mte", {
+                "page": None,
+                "cache": cache_status,
+                "results": selecionados,
+                "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+            })
+        else:
+            # Cada página é enviada assim que é extraída; buscas idênticas simultâneas
+            # compartilham a mesma coleta, que grava o resultado completo no cache
+            cache_status = MISS
+            paginas = live.stream_search(limit=limit, **search_params)
+            try:
+                async for pagina in paginas:
+                    pages += 1
+                    selecionados = novos(pagina)
+                    total_live += len(selecionados)
+                    yield _format_event(mode, "mediador_mte", {
+                        "page": pages,
+                        "results": selecionados,
+                        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+                    })
+            finally:
+                # contextlib.aclosing só existe a partir do Python 3.10
+                await paginas.aclose()
+    except Exception as e:
+        logger.warning(f"Erro ao transmitir busca em tempo real: {e}")
+        error = str(e)
+        yield _format_event(mode, "error", {"message": f"Erro ao buscar no Mediador MTE: {error}"})
+
+    summary = {
+        "total": total_local + total_live,
+        "banco_local": total_local,
+        "mediador_mte": total_live,
+        "pages": pages,
+        "cache": cache_status,
+        "elapsed_ms": round((time.monotonic() - started) * 1000, 1),
+    }
+    if page_size is not None:
+        summary["has_more"] = has_more
+    if error:
+        summary["error"] = error
+    yield _format_event(mode, "summary", summary)
+
 
 @router.get("/search-live")
 async def search_convencoes_live(
@@ -22,30 +162,45 @@ async def search_convencoes_live(
     cnae: Optional[str] = Query(None),
     cnpj: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
+    stream: Optional[str] = STREAM_QUERY,
     current_user: User = Depends(get_current_user),
 ):
     """
     Busca convenções diretamente do Mediador MTE em tempo real
     (sem armazenar no banco de dados)
     
+    Com `stream`, cada página de resultados é enviada assim que é extraída,
+    seguida de um evento `summary`.
+    
     Nota: O site do Mediador MTE pode requerer autenticação ou ter estrutura
     que muda frequentemente. Se não encontrar resultados, use a busca no banco local.
     """
+    if stream:
+        search_params = {"municipio": municipio, "uf": uf, "cnae": cnae, "cnpj": cnpj}
+        return _streaming_response(stream, _stream_search(stream, search_params, limit))
+    
     try:
-        client = MediadorAPIClient()
-        
-        convencoes = client.search_convencoes(
-            municipio=municipio,
-            uf=uf,
-            cnae=cnae,
-            cnpj=cnpj,
-            limit=limit
+        # Buscas iguais (mesma cidade, CNAE...) reaproveitam o resultado em cache
+        # A busca roda fora do event loop para não travar as demais requisições
+        live = get_async_mediador_client()
+        cache_key = normalize_search_key(municipio, uf, cnae, cnpj, limit)
+        convencoes, cache_status = await live.run(
+            get_search_cache().get_or_fetch,
+            cache_key,
+            lambda: live.client.search_convencoes(
+                municipio=municipio,
+                uf=uf,
+                cnae=cnae,
+                cnpj=cnpj,
+                limit=limit
+            )
         )
         
         response_data = {
             "total": len(convencoes),
             "results": convencoes,
-            "source": "mediador_mte_live"
+            "source": "mediador_mte_live",
+            "cache": cache_status
         }
         
         # Se não encontrou resultados, adicionar mensagem informativa
@@ -71,28 +226,60 @@ async def search_convencoes_live(
         }
 
 
-@router.get("/search-hybrid")
-async def search_convencoes_hybrid(
-    municipio: Optional[str] = Query(None),
-    uf: Optional[str] = Query(None),
-    cnae: Optional[str] = Query(None),
-    cnpj: Optional[str] = Query(None),
-    q: Optional[str] = Query(None),
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    use_live: bool = Query(False, description="Se True, busca também no Mediador MTE em tempo real"),
+@router.get("/mirrors")
+async def get_mirrors_status(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
 ):
     """
-    Busca híbrida: dados do banco + busca em tempo real no Mediador MTE
+    Latência (p50/p95) e saúde de cada espelho do Mediador MTE neste processo
+    """
+    return {"mirrors": get_mirror_stats()}
+
+
+@router.get("/search-cache")
+async def get_search_cache_stats(
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Métricas do cache de buscas em tempo real (acertos por camada, taxa de acerto)
+    """
+    return get_search_cache().stats()
+
+
+@router.get("/circuits")
+async def get_circuits_status(
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Estado dos circuit breakers por host e por padrão de URL (compartilhado entre workers)
     """
+    return {"circuits": get_circuit_states()}
+
+
+@router.get("/connections")
+async def get_connections_status(
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Reuso de conexões por host no pool HTTP compartilhado deste processo
+    (conexões abertas, requisições, handshakes TLS evitados)
+    """
+    return {"connections": get_connection_stats()}
+
+
+def _buscar_banco_local(
+    db: Session,
+    municipio: Optional[str],
+    uf: Optional[str],
+    cnae: Optional[str],
+    q: Optional[str],
+    page: int,
+    page_size: int,
+) -> List[Dict]:
+    """Busca paginada no banco de dados local"""
     from app.models.convencao import Convencao
     from sqlalchemy import or_
     
-    results = []
-    
-    # 1. Buscar no banco de dados local
     query = db.query(Convencao)
     
     if municipio:
@@ -115,6 +302,7 @@ async def search_convencoes_hybrid(
     db_results = query.order_by(Convencao.data_publicacao.desc()).offset(offset).limit(page_size).all()
     
     # Converter para dict
+    results = []
     for conv in db_results:
         results.append({
             'id': str(conv.id),
@@ -130,16 +318,65 @@ async def search_convencoes_hybrid(
             'fonte': 'banco_local'
         })
     
+    return results
+
+
+@router.get("/search-hybrid")
+async def search_convencoes_hybrid(
+    municipio: Optional[str] = Query(None),
+    uf: Optional[str] = Query(None),
+    cnae: Optional[str] = Query(None),
+    cnpj: Optional[str] = Query(None),
+    q: Optional[str] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    use_live: bool = Query(False, description="Se True, busca também no Mediador MTE em tempo real"),
+    stream: Optional[str] = STREAM_QUERY,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Busca híbrida: dados do banco + busca em tempo real no Mediador MTE
+    
+    Com `stream`, os resultados do banco local são enviados primeiro (evento
+    `banco_local`), depois cada página do Mediador MTE e um `summary` final.
+    """
+    # 1. Buscar no banco de dados local (antes do streaming: a sessão do banco
+    # não deve ser usada depois que a resposta começa)
+    results = _buscar_banco_local(db, municipio, uf, cnae, q, page, page_size)
+    
+    if stream:
+        if not use_live:
+            async def somente_local():
+                yield _format_event(stream, "banco_local", {"results": results})
+                yield _format_event(stream, "summary", {
+                    "total": len(results),
+                    "banco_local": len(results),
+                    "mediador_mte": 0,
+                    "has_more": False,
+                })
+            return _streaming_response(stream, somente_local())
+        search_params = {"municipio": municipio, "uf": uf, "cnae": cnae, "cnpj": cnpj}
+        return _streaming_response(
+            stream,
+            _stream_search(stream, search_params, page_size, banco_local=results, page_size=page_size)
+        )
+    
     # 2. Se solicitado, buscar também no Mediador MTE em tempo real
     if use_live:
         try:
-            client = MediadorAPIClient()
-            live_results = client.search_convencoes(
-                municipio=municipio,
-                uf=uf,
-                cnae=cnae,
-                cnpj=cnpj,
-                limit=page_size
+            live = get_async_mediador_client()
+            cache_key = normalize_search_key(municipio, uf, cnae, cnpj, page_size)
+            live_results, _ = await live.run(
+                get_search_cache().get_or_fetch,
+                cache_key,
+                lambda: live.client.search_convencoes(
+                    municipio=municipio,
+                    uf=uf,
+                    cnae=cnae,
+                    cnpj=cnpj,
+                    limit=page_size
+                )
             )
             
             # Adicionar resultados ao final (evitar duplicatas por instrumento_id)
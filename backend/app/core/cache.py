@@ -0,0 +1,169 @@
+"""
+Shared key-value cache backed by Redis, with an in-process fallback
+
+Values are stored as JSON. When Redis is unreachable the cache keeps working
+with a process-local dictionary, so callers never have to handle the outage.
+"""
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import redis
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before trying to reconnect after Redis was unavailable
+REDIS_RETRY_SECONDS = 30
+
+_redis_client: Optional[redis.Redis] = None
+_redis_failed_at: Optional[float] = None
+_redis_lock = threading.Lock()
+
+_local_store: Dict[str, Tuple[Optional[float], str]] = {}
+_local_lock = threading.Lock()
+
+
+def get_redis() -> Optional[redis.Redis]:
+    """Return a shared Redis client, or None if Redis is unavailable"""
+    global _redis_client, _redis_failed_at
+
+    if _redis_client is not None:
+        return _redis_client
+
+    with _redis_lock:
+        if _redis_client is not None:
+            return _redis_client
+        if _redis_failed_at and time.monotonic() - _redis_failed_at < REDIS_RETRY_SECONDS:
+            return None
+        try:
+            client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=1,
+                socket_connect_timeout=1,
+            )
+            client.ping()
+            _redis_client = client
+            _redis_failed_at = None
+            logger.info("Connected to Redis for shared cache")
+        except Exception as e:
+            _redis_failed_at = time.monotonic()
+            logger.warning(f"Redis unavailable, using in-process cache: {e}")
+            return None
+
+    return _redis_client
+
+
+def _redis_error(e: Exception):
+    """Drop the client after an error so the next call reconnects later"""
+    global _redis_client, _redis_failed_at
+    logger.debug(f"Redis error, falling back to in-process cache: {e}")
+    _redis_client = None
+    _redis_failed_at = time.monotonic()
+
+
+class SharedCache:
+    """JSON cache with TTL, namespaced by key prefix"""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"cc:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        full_key = self._key(key)
+
+        client = get_redis()
+        if client is not None:
+            try:
+                raw = client.get(full_key)
+                return json.loads(raw) if raw is not None else None
+            except Exception as e:
+                _redis_error(e)
+
+        with _local_lock:
+            entry = _local_store.get(full_key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del _local_store[full_key]
+                return None
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        full_key = self._key(key)
+        raw = json.dumps(value, default=str)
+
+        client = get_redis()
+        if client is not None:
+            try:
+                client.set(full_key, raw, ex=ttl)
+                return
+            except Exception as e:
+                _redis_error(e)
+
+        expires_at = time.monotonic() + ttl if ttl else None
+        with _local_lock:
+            _local_store[full_key] = (expires_at, raw)
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Set `key` only if it is absent (an atomic claim); returns True when set"""
+        full_key = self._key(key)
+        raw = json.dumps(value, default=str)
+
+        client = get_redis()
+        if client is not None:
+            try:
+                return bool(client.set(full_key, raw, nx=True, px=max(1, int(ttl * 1000))))
+            except Exception as e:
+                _redis_error(e)
+
+        now = time.monotonic()
+        with _local_lock:
+            entry = _local_store.get(full_key)
+            if entry is not None and (entry[0] is None or entry[0] >= now):
+                return False
+            _local_store[full_key] = (now + ttl, raw)
+            return True
+
+    def delete(self, key: str):
+        full_key = self._key(key)
+
+        client = get_redis()
+        if client is not None:
+            try:
+                client.delete(full_key)
+            except Exception as e:
+                _redis_error(e)
+
+        with _local_lock:
+            _local_store.pop(full_key, None)
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """All live (key, value) pairs in this namespace"""
+        prefix = self._key("")
+
+        client = get_redis()
+        if client is not None:
+            try:
+                keys = list(client.scan_iter(match=f"{prefix}*", count=500))
+                values = client.mget(keys) if keys else []
+                return [
+                    (key.decode("utf-8")[len(prefix):], json.loads(raw))
+                    for key, raw in zip(keys, values)
+                    if raw is not None
+                ]
+            except Exception as e:
+                _redis_error(e)
+
+        now = time.monotonic()
+        with _local_lock:
+            entries = [
+                (key[len(prefix):], raw)
+                for key, (expires_at, raw) in _local_store.items()
+                if key.startswith(prefix) and (expires_at is None or expires_at >= now)
+            ]
+        return [(key, json.loads(raw)) for key, raw in entries]
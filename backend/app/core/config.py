@@ -40,16 +40,58 @@ class Settings(BaseSettings):
     # Storage
     STORAGE_TYPE: str = "local"
     STORAGE_PATH: str = "./storage"
+    HTTP_CACHE_ENABLED: bool = True  # Revalidate Mediador pages/documents with ETag/Last-Modified
+    HTTP_CACHE_PATH: str = "./storage/http_cache"
+    HTTP_CACHE_MAX_MB: int = 256  # Least recently used entries are evicted past this size
+    HTTP_CACHE_MAX_ENTRY_MB: int = 5  # Larger bodies (and PDFs, kept by document storage) are not cached
+    EXTRACTION_CACHE_ENABLED: bool = True  # Reuse extracted/OCR'd text of documents with the same content hash
+    EXTRACTION_CACHE_PATH: str = "./storage/extraction_cache"
+    EXTRACTION_CACHE_MAX_MB: int = 1024  # Least recently used entries are evicted past this size
     
     # Scraper
     SCRAPER_DELAY_SECONDS: int = 3
     SCRAPER_USER_AGENT: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     MEDIADOR_BASE_URL: str = "https://mediador.trabalho.gov.br"
     MEDIADOR_API_URL: str = "https://www3.mte.gov.br/sistemas/mediador"
+    MEDIADOR_HTTP_MODE: str = "live"  # live | record (save responses as fixtures) | replay (serve fixtures, no network)
+    MEDIADOR_FIXTURES_PATH: str = "./fixtures/mediador"  # Recorded response corpus for record/replay
+    MEDIADOR_ENDPOINT_CACHE_TTL_SECONDS: int = 86400  # How long a discovered search URL is trusted
+    MEDIADOR_HEDGED_REQUESTS: bool = True  # Start a backup request on the next mirror when the preferred one is slow
+    MEDIADOR_HEDGE_PERCENTILE: float = 95.0  # Latency percentile of a mirror after which the backup request starts
+    MEDIADOR_HEDGE_DELAY_SECONDS: float = 3.0  # Hedge delay used until a mirror has enough latency samples
+    MEDIADOR_MAX_OUTSTANDING_HEDGES: int = 4  # Backup requests running at once; past it the slow mirror is just waited on
+    MEDIADOR_MAX_RESULT_PAGES: int = 20  # Max result pages followed when iterating a live search
+    MEDIADOR_LIVE_CONCURRENCY: int = 8  # Live searches running at once, off the API event loop
+    HTTP_POOL_CONNECTIONS: int = 20  # Hosts with a kept connection pool (shared by all Mediador clients)
+    HTTP_POOL_MAXSIZE: int = 16  # Keep-alive connections kept per host
+    HTTP_POOL_WARMUP: bool = True  # Open connections to the Mediador hosts at API startup
+    SEARCH_CACHE_TTL_SECONDS: int = 300  # Live search results are served from cache while fresh
+    SEARCH_CACHE_STALE_SECONDS: int = 3600  # After the TTL, serve stale results and refresh in the background
+    SEARCH_CACHE_LOCAL_MAX_ENTRIES: int = 256  # In-process LRU tier in front of Redis
+    SINGLE_FLIGHT_LOCK_SECONDS: int = 120  # Redis lock TTL for a coalesced Mediador fetch
+    SINGLE_FLIGHT_WAIT_SECONDS: float = 90.0  # Max wait for an identical fetch running elsewhere
+    CIRCUIT_BREAKER_ENABLED: bool = True  # Fail fast on Mediador hosts/endpoints that keep failing
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before a circuit opens
+    CIRCUIT_BREAKER_BACKOFF_SECONDS: float = 30.0  # First wait before a half-open probe (doubles per reopen)
+    CIRCUIT_BREAKER_MAX_BACKOFF_SECONDS: float = 900.0  # Upper bound for the probe backoff
+    SCRAPER_ASYNC_CRAWL: bool = True  # Fetch detail pages concurrently during collection
+    SCRAPER_CONCURRENCY: int = 8  # Number of concurrent crawler workers
+    SCRAPER_MAX_REQUESTS_PER_SECOND: float = 2.0  # HTTP requests per second to the site, shared by all crawler workers
+    COLLECTION_BATCH_SIZE: int = 100  # Instrumentos per crawl batch (progress is committed per stage)
+    COLLECTION_MAX_ATTEMPTS: int = 3  # Give up on an instrumento after this many failures
+    SCRAPER_DRIVER_POOL_SIZE: int = 2  # Max headless Chrome instances kept per process
+    SCRAPER_DRIVER_MAX_PAGES: int = 50  # Recycle a driver after this many page loads
+    SCRAPER_DRIVER_LEASE_TIMEOUT: int = 120  # Seconds to wait for a free driver
     
     # OCR
     TESSERACT_CMD: str = "/usr/bin/tesseract"
     OCR_LANG: str = "por"
+    OCR_RENDER_WINDOW: int = 4  # Pages rasterized at a time when OCR runs sequentially (bounds memory)
+    OCR_WORKERS: int = 0  # Parallel OCR of scanned PDF pages (0 = one worker per CPU, 1 = sequential)
+    OCR_DPI: int = 300  # Render resolution for OCR (the escalation resolution in adaptive mode)
+    OCR_ADAPTIVE_DPI: bool = True  # OCR at OCR_LOW_DPI first, re-render at OCR_DPI only low-confidence pages
+    OCR_LOW_DPI: int = 200  # First-pass resolution in adaptive mode
+    OCR_MIN_CONFIDENCE: float = 80.0  # Mean tesseract word confidence (0-100) below which a page is re-rendered
     
     class Config:
         env_file = ".env"
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.services.http_transport import warm_up_in_background
 import logging
 import traceback
 
@@ -40,6 +41,13 @@ app.add_middleware(
 app.include_router(api_router, prefix="/api/v1")
 
 
+@app.on_event("startup")
+async def warm_up_http_pool():
+    """Open keep-alive connections to the Mediador hosts before the first search"""
+    if settings.HTTP_POOL_WARMUP:
+        warm_up_in_background()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler"""
@@ -2,6 +2,7 @@ from app.models.user import User
 from app.models.company import Company
 from app.models.convencao import Convencao, ConvencaoEmpresa, ConvencaoMetadata
 from app.models.notification import Notification, NotificationPreference
+from app.models.crawl import CrawlFrontier, CrawlState
 
 __all__ = [
     "User",
@@ -11,5 +12,7 @@ __all__ = [
     "ConvencaoMetadata",
     "Notification",
     "NotificationPreference",
+    "CrawlFrontier",
+    "CrawlState",
 ]
 
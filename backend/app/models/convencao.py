@@ -23,8 +23,9 @@ class Convencao(Base):
     cnae = Column(String(7), index=True)
     documento_url = Column(Text)
     documento_path = Column(Text)
+    documento_sha256 = Column(String(64), index=True)  # Hash do arquivo no storage
     texto_extraido = Column(Text)  # Limitado a 1MB no código
-    formato_documento = Column(String(20))  # HTML, PDF_DIGITAL, PDF_ESCANEADO
+    formato_documento = Column(String(20))  # HTML, PDF_DIGITAL, PDF_ESCANEADO, PDF_HIBRIDO
     status = Column(String(20), default="PROCESSANDO")  # PROCESSANDO, PROCESSADO, ERRO
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
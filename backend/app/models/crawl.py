@@ -0,0 +1,33 @@
+from sqlalchemy import Column, String, Date, Text, Integer, DateTime
+from sqlalchemy.dialects.postgresql import JSONB
+from datetime import datetime
+from app.core.database import Base
+
+
+class CrawlFrontier(Base):
+    """Estado de coleta de cada instrumento descoberto (permite retomar a coleta)"""
+    __tablename__ = "crawl_frontier"
+
+    instrumento_id = Column(String(50), primary_key=True)
+    # DESCOBERTO, METADADOS, BAIXADO, EXTRAIDO, PERSISTIDO, IGNORADO, ERRO
+    stage = Column(String(20), nullable=False, default="DESCOBERTO", index=True)
+    metadados = Column(JSONB)
+    data_publicacao = Column(Date, index=True)
+    documento_path = Column(Text)
+    documento_sha256 = Column(String(64))
+    documento_ext = Column(String(10))
+    texto_extraido = Column(Text)  # Mantido apenas até a convenção ser persistida
+    formato_documento = Column(String(20))
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    discovered_at = Column(DateTime, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CrawlState(Base):
+    """Valores globais da coleta (ex.: marca d'água da última data de publicação vista)"""
+    __tablename__ = "crawl_state"
+
+    chave = Column(String(100), primary_key=True)
+    valor = Column(Text)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -29,6 +29,7 @@ class ConvencaoResponse(BaseModel):
 class ConvencaoDetail(ConvencaoResponse):
     texto_extraido: Optional[str]
     documento_path: Optional[str]
+    documento_sha256: Optional[str] = None
 
 
 class ConvencaoSearch(BaseModel):
@@ -0,0 +1,201 @@
+"""
+Circuit breaker for the Mediador hosts, shared across workers
+
+When the government site is down every URL pattern the clients try ends in a
+timeout, and a single search or crawl item can spend minutes waiting.
+CircuitBreakerAdapter wraps the transport adapter of a requests.Session and
+keeps one breaker per host (connection failures) and one per host + URL
+template (timeouts and 5xx answers). After consecutive failures a breaker
+opens and requests fail immediately with CircuitOpenError; once the backoff
+has elapsed a single probe request is let through (half-open): the probe is
+claimed atomically (Redis SET NX), so only one worker sends it. Each time the
+probe fails the backoff doubles, with jitter, up to a maximum.
+
+Breaker state lives in the shared cache, so all API and Celery workers see
+the same picture.
+"""
+import random
+import re
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from app.core.cache import SharedCache
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+# Answers that mean the endpoint is unhealthy (4xx are normal while probing URL patterns)
+FAILURE_STATUSES = frozenset([500, 502, 503, 504])
+
+# Path segments with IDs are collapsed so /Detalhes/123456 and /Detalhes/654321 share a breaker
+ID_SEGMENT_RE = re.compile(r'\d{4,}')
+
+_states = SharedCache("circuit")
+# One claim per open window: whoever sets it sends the half-open probe
+_probes = SharedCache("circuit-probe")
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request while its circuit is open"""
+
+    def __init__(self, key: str, retry_in: float):
+        super().__init__(f"Circuit open for {key}, retry in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+
+
+def circuit_keys(url: str):
+    """(host key, host + URL template key) for a request URL"""
+    parts = urlsplit(url)
+    host = f"{parts.scheme}://{parts.netloc}"
+    template = ID_SEGMENT_RE.sub('{id}', parts.path or '/')
+    return host, f"{host}{template}"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with exponential, jittered half-open backoff"""
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+        max_backoff_seconds: Optional[float] = None,
+    ):
+        self.failure_threshold = max(1, failure_threshold or settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD)
+        self.backoff_seconds = backoff_seconds or settings.CIRCUIT_BREAKER_BACKOFF_SECONDS
+        self.max_backoff_seconds = max_backoff_seconds or settings.CIRCUIT_BREAKER_MAX_BACKOFF_SECONDS
+        # Forget breakers that have not been touched for a while
+        self.state_ttl = int(self.max_backoff_seconds * 4)
+
+    def _backoff(self, opens: int) -> float:
+        backoff = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** max(opens - 1, 0)))
+        # Equal jitter keeps workers from probing a recovering host in lockstep
+        return backoff / 2 + random.uniform(0, backoff / 2)
+
+    def allow(self, key: str) -> Optional[Dict]:
+        """
+        Check the breaker before a request
+
+        Returns:
+            The current state (None when closed and clean)
+
+        Raises:
+            CircuitOpenError: while the circuit is open
+        """
+        state = _states.get(key)
+        if not state or state.get("state") == CLOSED:
+            return state
+
+        now = time.time()
+        if now < state.get("retry_at", 0):
+            raise CircuitOpenError(key, state["retry_at"] - now)
+
+        # Backoff elapsed: the first worker to claim this window sends the
+        # probe, everyone else stays out until the next window
+        window = self._backoff(state.get("opens", 1))
+        if not _probes.add(f"{key}@{state.get('retry_at', 0)}", now, ttl=window):
+            raise CircuitOpenError(key, window)
+        state["state"] = HALF_OPEN
+        state["retry_at"] = now + window
+        state["updated_at"] = now
+        _states.set(key, state, ttl=self.state_ttl)
+        logger.info(f"Circuit half-open for {key}, probing")
+        return state
+
+    def release(self, key: str, state: Optional[Dict]):
+        """Give back a probe claimed by allow() when no request was sent after all"""
+        if not state or state.get("state") != HALF_OPEN:
+            return
+        state = dict(state, state=OPEN, retry_at=time.time())
+        _states.set(key, state, ttl=self.state_ttl)
+
+    def record_success(self, key: str, state: Optional[Dict]):
+        if state:
+            _states.delete(key)
+            if state.get("state") != CLOSED:
+                logger.info(f"Circuit closed for {key}")
+
+    def record_failure(self, key: str, state: Optional[Dict], error: str):
+        now = time.time()
+        state = dict(state or {"state": CLOSED, "failures": 0, "opens": 0})
+        state["failures"] = state.get("failures", 0) + 1
+        state["last_error"] = error[:500]
+        state["updated_at"] = now
+
+        if state["state"] == HALF_OPEN or state["failures"] >= self.failure_threshold:
+            state["opens"] = state.get("opens", 0) + 1
+            state["state"] = OPEN
+            state["retry_at"] = now + self._backoff(state["opens"])
+            logger.warning(
+                f"Circuit open for {key} after {state['failures']} failures "
+                f"(retry in {state['retry_at'] - now:.0f}s): {error}"
+            )
+        _states.set(key, state, ttl=self.state_ttl)
+
+
+def get_circuit_states() -> List[Dict]:
+    """Every breaker that has recorded failures, across all workers"""
+    now = time.time()
+    states = []
+    for key, state in sorted(_states.items()):
+        entry = dict(state, key=key)
+        if state.get("state") != CLOSED:
+            entry["retry_in_seconds"] = max(0, round(state.get("retry_at", now) - now, 1))
+        states.append(entry)
+    return states
+
+
+class CircuitBreakerAdapter(BaseAdapter):
+    """Transport adapter that short-circuits requests to failing hosts/endpoints"""
+
+    def __init__(self, inner: BaseAdapter, breaker: Optional[CircuitBreaker] = None):
+        super().__init__()
+        self.inner = inner
+        self.breaker = breaker or CircuitBreaker()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        host_key, endpoint_key = circuit_keys(request.url)
+        host_state = self.breaker.allow(host_key)
+        try:
+            endpoint_state = self.breaker.allow(endpoint_key)
+        except CircuitOpenError:
+            # Nothing is sent: a host probe claimed above must not be used up
+            self.breaker.release(host_key, host_state)
+            raise
+
+        try:
+            response = self.inner.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        except requests.ConnectionError as e:
+            # Covers connect timeouts: the host itself is unreachable
+            self.breaker.record_failure(host_key, host_state, str(e))
+            raise
+        except requests.Timeout as e:
+            self.breaker.record_failure(endpoint_key, endpoint_state, str(e))
+            raise
+
+        self.breaker.record_success(host_key, host_state)
+        if response.status_code in FAILURE_STATUSES:
+            self.breaker.record_failure(endpoint_key, endpoint_state, f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success(endpoint_key, endpoint_state)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def install_circuit_breaker(session: requests.Session):
+    """Wrap the session's HTTP(S) adapters with the circuit breaker"""
+    if not settings.CIRCUIT_BREAKER_ENABLED:
+        return
+    for prefix in ('http://', 'https://'):
+        inner = session.adapters[prefix]
+        if not isinstance(inner, CircuitBreakerAdapter):
+            session.mount(prefix, CircuitBreakerAdapter(inner))
@@ -0,0 +1,333 @@
+"""
+Incremental, resumable collection pipeline for convenções
+
+Each instrumento moves through the stages of the crawl frontier
+(DESCOBERTO -> METADADOS -> BAIXADO -> EXTRAIDO -> PERSISTIDO) and every
+transition is committed, so a run that dies resumes from the last stage
+reached. Instruments published before the watermark left by previous runs
+are skipped unless a full collection is requested.
+"""
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Optional
+from dateutil import parser
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.company import Company
+from app.models.convencao import Convencao, ConvencaoEmpresa
+from app.models.crawl import CrawlFrontier
+from app.models.notification import Notification
+from app.services import crawl_frontier as frontier
+from app.services.crawler import CrawlStats, MetadataCrawler
+from app.services.document_processor import DocumentProcessor, OcrStats
+from app.services.extraction_cache import get_extraction_cache_stats
+from app.services.http_cache import get_http_cache_stats
+from app.services.scraper import MediadorScraper
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages timed separately, to find the bottleneck of a run
+TIMED_STAGES = ("descoberta", "metadados", "download", "extracao", "persistencia")
+
+
+def associate_convencao_to_companies(convencao: Convencao, db: Session):
+    """Associate convenção with relevant companies"""
+    # Find companies by CNAE
+    companies_cnae = []
+    if convencao.cnae:
+        companies_cnae = db.query(Company).filter(Company.cnae == convencao.cnae).all()
+
+    # Find companies by municipio
+    companies_municipio = []
+    if convencao.municipio and convencao.uf:
+        companies_municipio = db.query(Company).filter(
+            Company.municipio == convencao.municipio,
+            Company.uf == convencao.uf
+        ).all()
+
+    # Combine and remove duplicates
+    all_companies = list(set(companies_cnae + companies_municipio))
+
+    # Create associations
+    for company in all_companies:
+        existing = db.query(ConvencaoEmpresa).filter(
+            ConvencaoEmpresa.convencao_id == convencao.id,
+            ConvencaoEmpresa.company_id == company.id
+        ).first()
+
+        if not existing:
+            score = calculate_relevancia_score(convencao, company)
+            association = ConvencaoEmpresa(
+                convencao_id=convencao.id,
+                company_id=company.id,
+                relevancia_score=score
+            )
+            db.add(association)
+
+    db.commit()
+
+
+def calculate_relevancia_score(convencao: Convencao, company: Company) -> float:
+    """Calculate relevance score"""
+    score = 0.0
+
+    if convencao.cnae == company.cnae:
+        score += 50.0
+
+    if convencao.municipio == company.municipio and convencao.uf == company.uf:
+        score += 50.0
+
+    return score
+
+
+def generate_notifications(convencao: Convencao, db: Session):
+    """Generate notifications for relevant users"""
+    # Get companies associated with this convenção
+    associations = db.query(ConvencaoEmpresa).filter(
+        ConvencaoEmpresa.convencao_id == convencao.id
+    ).all()
+
+    user_ids = set()
+    for assoc in associations:
+        company = db.query(Company).filter(Company.id == assoc.company_id).first()
+        if company:
+            user_ids.add(company.user_id)
+
+    # Create notifications
+    for user_id in user_ids:
+        notification = Notification(
+            user_id=user_id,
+            convencao_id=convencao.id,
+            tipo='NOVA_CONVENCAO',
+            titulo=f"Nova convenção: {convencao.titulo or 'Sem título'}",
+            mensagem=f"Uma nova convenção coletiva foi publicada e pode ser aplicável às suas empresas."
+        )
+        db.add(notification)
+
+    db.commit()
+
+
+def _parse_date(value: Optional[str]) -> Optional[date]:
+    if not value:
+        return None
+    try:
+        # ISO dates first, dayfirst would swap their month and day
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        pass
+    try:
+        return parser.parse(value, dayfirst=True).date()
+    except (ValueError, OverflowError):
+        return None
+
+
+class CollectionPipeline:
+    """Runs (or resumes) a collection over the persisted crawl frontier"""
+
+    def __init__(
+        self,
+        db: Session,
+        scraper: Optional[MediadorScraper] = None,
+        processor: Optional[DocumentProcessor] = None,
+    ):
+        self.db = db
+        self.scraper = scraper or MediadorScraper()
+        self.processor = processor or DocumentProcessor()
+        self.batch_size = max(1, settings.COLLECTION_BATCH_SIZE)
+        self.max_attempts = max(1, settings.COLLECTION_MAX_ATTEMPTS)
+        self.stage_seconds: Dict[str, float] = dict.fromkeys(TIMED_STAGES, 0.0)
+        self.ocr_stats = OcrStats()
+
+    @contextmanager
+    def _timed(self, stage: str):
+        """Add the wall time of the block to the stage total"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] += time.perf_counter() - start
+
+    def run(self, limit: Optional[int] = None, full: bool = False) -> Dict:
+        """
+        Discover new instrumentos and advance every pending one
+
+        Args:
+            limit: Maximum number of instrumentos to work on in this run
+            full: Ignore the watermark and process every pending instrumento
+        """
+        db = self.db
+        started = time.perf_counter()
+        self.stage_seconds = dict.fromkeys(TIMED_STAGES, 0.0)
+        self.ocr_stats = OcrStats()
+        watermark = None if full else frontier.get_watermark(db)
+        logger.info(f"Starting collection (watermark: {watermark or 'none'})")
+
+        # Discover IDs; the watermark is passed on so the source can filter too
+        logger.info("Extracting instrumento IDs...")
+        search_params = {'data_publicacao_inicio': watermark.isoformat()} if watermark else None
+        with self._timed("descoberta"):
+            instrumento_ids = self.scraper.extract_instrumento_ids(search_params)
+            discovered = frontier.register_discovered(db, instrumento_ids)
+        logger.info(f"Found {len(instrumento_ids)} instrumento IDs, {discovered} new in the frontier")
+
+        # Everything not finished yet, including work left by interrupted runs
+        work_ids = frontier.pending_ids(db, self.max_attempts, limit)
+        logger.info(f"{len(work_ids)} instrumentos to process")
+
+        result = {"status": "success", "discovered": discovered, "new_count": 0, "skipped_count": 0, "error_count": 0}
+        crawl_stats = CrawlStats()
+
+        for start in range(0, len(work_ids), self.batch_size):
+            batch = frontier.get_entries(db, work_ids[start:start + self.batch_size])
+
+            # Fetch metadata for the whole batch concurrently
+            prefetched = None
+            to_fetch = [e.instrumento_id for e in batch if e.stage == frontier.DESCOBERTO]
+            if settings.SCRAPER_ASYNC_CRAWL and to_fetch:
+                with self._timed("metadados"):
+                    prefetched, batch_stats = MetadataCrawler(self.scraper).run(to_fetch)
+                crawl_stats.merge(batch_stats)
+
+            for entry in batch:
+                instrumento_id = entry.instrumento_id
+                try:
+                    outcome = self._advance(entry, prefetched, watermark)
+                    if outcome == frontier.PERSISTIDO:
+                        result["new_count"] += 1
+                    elif outcome == frontier.IGNORADO:
+                        result["skipped_count"] += 1
+                except Exception as e:
+                    logger.error(f"Error processing {instrumento_id}: {e}")
+                    db.rollback()
+                    frontier.record_failure(db, instrumento_id, str(e), self.max_attempts)
+                    result["error_count"] += 1
+
+        # Only a drained frontier may move the watermark: pending entries older
+        # than it would be skipped as IGNORADO by the next run
+        if frontier.pending_ids(db, self.max_attempts, limit=1):
+            logger.info("Frontier not drained, watermark left unchanged")
+        else:
+            frontier.update_watermark(db, frontier.newest_persisted(db))
+
+        logger.info(
+            f"Collection complete. {result['new_count']} new convenções added, "
+            f"{result['skipped_count']} older than watermark, {result['error_count']} errors"
+        )
+        if crawl_stats.pages:
+            result["crawl"] = crawl_stats.as_dict()
+        if self.ocr_stats.pages:
+            result["ocr"] = self.ocr_stats.as_dict()
+        elapsed = time.perf_counter() - started
+        processed = result["new_count"] + result["skipped_count"] + result["error_count"]
+        result["stages"] = {stage: round(seconds, 2) for stage, seconds in self.stage_seconds.items()}
+        result["elapsed_seconds"] = round(elapsed, 2)
+        result["instrumentos_per_second"] = round(processed / elapsed, 2) if elapsed else 0.0
+        logger.info(f"Stage timings (s): {result['stages']}")
+        result["frontier"] = frontier.stage_counts(db)
+        result["http_cache"] = get_http_cache_stats()
+        logger.info(f"HTTP cache: {result['http_cache']}")
+        result["extraction_cache"] = get_extraction_cache_stats()
+        logger.info(f"Extraction cache: {result['extraction_cache']}")
+        return result
+
+    def _advance(self, entry: CrawlFrontier, prefetched: Optional[Dict], watermark: Optional[date]) -> str:
+        """Move one instrumento forward as far as possible; returns the stage reached"""
+        db = self.db
+        instrumento_id = entry.instrumento_id
+
+        if entry.stage == frontier.DESCOBERTO:
+            if prefetched is not None:
+                metadados = prefetched.get(instrumento_id)
+            else:
+                logger.info(f"Extracting metadata for {instrumento_id}...")
+                with self._timed("metadados"):
+                    metadados = self.scraper.extract_metadados(instrumento_id)
+
+            if not metadados:
+                raise ValueError("No metadata extracted")
+
+            entry.metadados = metadados
+            entry.data_publicacao = _parse_date(metadados.get('data_publicacao'))
+            if watermark and entry.data_publicacao and entry.data_publicacao < watermark:
+                entry.stage = frontier.IGNORADO
+                db.commit()
+                return entry.stage
+            entry.stage = frontier.METADADOS
+            db.commit()
+
+        metadados = entry.metadados or {}
+
+        if entry.stage == frontier.METADADOS:
+            # Download documento (optional - can skip if URL not available)
+            if metadados.get('documento_url'):
+                logger.info(f"Downloading documento for {instrumento_id}...")
+                with self._timed("download"):
+                    download_result = self.scraper.download_documento(metadados['documento_url'], instrumento_id)
+                if download_result:
+                    entry.documento_path, entry.documento_ext, entry.documento_sha256 = download_result
+            entry.stage = frontier.BAIXADO
+            db.commit()
+
+        if entry.stage == frontier.BAIXADO:
+            if entry.documento_path:
+                logger.info(f"Extracting text for {instrumento_id}...")
+                with self._timed("extracao"):
+                    texto_extraido, formato = self.processor.extract_text(
+                        entry.documento_path, entry.documento_ext, sha256=entry.documento_sha256
+                    )
+                if self.processor.last_ocr_stats is not None:
+                    self.ocr_stats.merge(self.processor.last_ocr_stats)
+                entry.texto_extraido = texto_extraido[:1000000] if texto_extraido else None  # Limit to 1MB
+                entry.formato_documento = formato
+            entry.stage = frontier.EXTRAIDO
+            db.commit()
+
+        if entry.stage == frontier.EXTRAIDO:
+            with self._timed("persistencia"):
+                self._persist(entry, metadados)
+
+        return entry.stage
+
+    def _persist(self, entry: CrawlFrontier, metadados: Dict):
+        """Create the convenção record, associations and notifications"""
+        db = self.db
+        instrumento_id = entry.instrumento_id
+
+        existing = db.query(Convencao).filter(Convencao.instrumento_id == instrumento_id).first()
+        if existing is None:
+            convencao = Convencao(
+                instrumento_id=instrumento_id,
+                titulo=metadados.get('titulo') or f"Convenção {instrumento_id}",
+                tipo=metadados.get('tipo') or 'CCT',
+                data_publicacao=entry.data_publicacao,
+                data_vigencia_inicio=_parse_date(metadados.get('vigencia_inicio')),
+                data_vigencia_fim=_parse_date(metadados.get('vigencia_fim')),
+                sindicato_empregador=metadados.get('sindicato_empregador'),
+                sindicato_trabalhador=metadados.get('sindicato_trabalhador'),
+                municipio=metadados.get('municipio'),
+                uf=metadados.get('uf'),
+                cnae=metadados.get('cnae'),
+                documento_url=metadados.get('documento_url'),
+                documento_path=entry.documento_path,
+                documento_sha256=entry.documento_sha256,
+                texto_extraido=entry.texto_extraido,
+                formato_documento=entry.formato_documento,
+                status='PROCESSADO' if entry.texto_extraido else 'PROCESSANDO'
+            )
+            db.add(convencao)
+            db.commit()
+            db.refresh(convencao)
+
+            # Associate with companies
+            associate_convencao_to_companies(convencao, db)
+
+            # Generate notifications
+            generate_notifications(convencao, db)
+            logger.info(f"Successfully processed {instrumento_id}")
+
+        # The text now lives on the convenção
+        entry.texto_extraido = None
+        entry.stage = frontier.PERSISTIDO
+        db.commit()
@@ -0,0 +1,126 @@
+"""
+Persisted crawl frontier and publication-date watermark
+
+Every discovered instrumento gets a row in crawl_frontier with the stage it
+has reached, so an interrupted collection resumes where it stopped instead of
+starting over.
+"""
+from datetime import date
+from typing import Iterable, List, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app.models.convencao import Convencao
+from app.models.crawl import CrawlFrontier, CrawlState
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Stages, in pipeline order
+DESCOBERTO = "DESCOBERTO"
+METADADOS = "METADADOS"
+BAIXADO = "BAIXADO"
+EXTRAIDO = "EXTRAIDO"
+PERSISTIDO = "PERSISTIDO"
+# Final stages besides PERSISTIDO
+IGNORADO = "IGNORADO"  # Older than the watermark
+ERRO = "ERRO"  # Gave up after too many attempts
+
+FINAL_STAGES = (PERSISTIDO, IGNORADO, ERRO)
+
+WATERMARK_KEY = "watermark_data_publicacao"
+
+INSERT_CHUNK_SIZE = 1000
+
+
+def register_discovered(db: Session, instrumento_ids: Iterable[str]) -> int:
+    """
+    Add newly discovered IDs to the frontier (existing rows are left alone)
+
+    IDs that already have a convenção stored are marked PERSISTIDO right away.
+
+    Returns:
+        Number of rows inserted
+    """
+    ids = list(dict.fromkeys(instrumento_ids))
+    inserted = 0
+    for start in range(0, len(ids), INSERT_CHUNK_SIZE):
+        chunk = ids[start:start + INSERT_CHUNK_SIZE]
+        stmt = insert(CrawlFrontier).values(
+            [{"instrumento_id": i, "stage": DESCOBERTO, "attempts": 0} for i in chunk]
+        ).on_conflict_do_nothing(index_elements=["instrumento_id"])
+        inserted += db.execute(stmt).rowcount or 0
+
+    db.query(CrawlFrontier).filter(
+        CrawlFrontier.stage == DESCOBERTO,
+        CrawlFrontier.instrumento_id.in_(db.query(Convencao.instrumento_id)),
+    ).update({CrawlFrontier.stage: PERSISTIDO}, synchronize_session=False)
+    db.commit()
+    return inserted
+
+
+def pending_ids(db: Session, max_attempts: int, limit: Optional[int] = None) -> List[str]:
+    """IDs that still have work to do, oldest discovery first"""
+    query = db.query(CrawlFrontier.instrumento_id).filter(
+        CrawlFrontier.stage.notin_(FINAL_STAGES),
+        CrawlFrontier.attempts < max_attempts,
+    ).order_by(CrawlFrontier.discovered_at, CrawlFrontier.instrumento_id)
+    if limit:
+        query = query.limit(limit)
+    return [row[0] for row in query.all()]
+
+
+def get_entries(db: Session, instrumento_ids: List[str]) -> List[CrawlFrontier]:
+    entries = db.query(CrawlFrontier).filter(CrawlFrontier.instrumento_id.in_(instrumento_ids)).all()
+    order = {instrumento_id: i for i, instrumento_id in enumerate(instrumento_ids)}
+    return sorted(entries, key=lambda e: order[e.instrumento_id])
+
+
+def record_failure(db: Session, instrumento_id: str, error: str, max_attempts: int):
+    """Count a failed attempt; the entry keeps its stage until attempts run out"""
+    entry = db.get(CrawlFrontier, instrumento_id)
+    if entry is None:
+        return
+    entry.attempts = (entry.attempts or 0) + 1
+    entry.last_error = error[:2000]
+    if entry.attempts >= max_attempts:
+        entry.stage = ERRO
+    db.commit()
+
+
+def get_watermark(db: Session) -> Optional[date]:
+    """Newest publication date seen by previous collections"""
+    state = db.get(CrawlState, WATERMARK_KEY)
+    if state and state.valor:
+        try:
+            return date.fromisoformat(state.valor)
+        except ValueError:
+            logger.warning(f"Invalid watermark value: {state.valor}")
+    return None
+
+
+def update_watermark(db: Session, seen: Optional[date]):
+    """Advance the watermark if `seen` is newer"""
+    if seen is None:
+        return
+    current = get_watermark(db)
+    if current is not None and seen <= current:
+        return
+    state = db.get(CrawlState, WATERMARK_KEY)
+    if state is None:
+        state = CrawlState(chave=WATERMARK_KEY)
+        db.add(state)
+    state.valor = seen.isoformat()
+    db.commit()
+    logger.info(f"Watermark advanced to {state.valor}")
+
+
+def newest_persisted(db: Session) -> Optional[date]:
+    """Newest publication date among the instrumentos stored so far"""
+    return db.query(func.max(CrawlFrontier.data_publicacao)).filter(CrawlFrontier.stage == PERSISTIDO).scalar()
+
+
+def stage_counts(db: Session) -> dict:
+    """Number of frontier entries per stage"""
+    rows = db.query(CrawlFrontier.stage, func.count()).group_by(CrawlFrontier.stage).all()
+    return {stage: count for stage, count in rows}
@@ -0,0 +1,167 @@
+"""
+Async crawler for fetching convenção detail pages concurrently
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.scraper import MediadorScraper
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    Global politeness budget shared by all crawler workers.
+
+    Each call to acquire() reserves the next free slot. The crawler takes a
+    slot before every HTTP request (a detail page may need several, one per
+    URL pattern tried), so the crawl as a whole never sends more than `rate`
+    requests per second, no matter how many workers are running.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class CrawlStats:
+    """Throughput counters for one crawl"""
+    pages: int = 0
+    failures: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+        return self.pages / self.elapsed_seconds
+
+    def merge(self, other: "CrawlStats"):
+        """Accumulate the counters of another crawl (e.g. the next batch)"""
+        self.pages += other.pages
+        self.failures += other.failures
+        self.elapsed_seconds += other.elapsed_seconds
+
+    def as_dict(self) -> Dict:
+        return {
+            "pages": self.pages,
+            "failures": self.failures,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "pages_per_second": round(self.pages_per_second, 2),
+        }
+
+
+class MetadataCrawler:
+    """
+    Fetch metadata for many instrumentos concurrently.
+
+    Workers are asyncio tasks pulling IDs from a shared queue. The blocking
+    `MediadorScraper.extract_metadados` call runs in a thread pool sized to the
+    worker count, and the per-item sleep is replaced by a single RateLimiter
+    charged for each HTTP request the scraper sends.
+    """
+
+    def __init__(
+        self,
+        scraper: Optional[MediadorScraper] = None,
+        workers: Optional[int] = None,
+        max_requests_per_second: Optional[float] = None,
+    ):
+        self.scraper = scraper or MediadorScraper()
+        self.workers = max(1, workers or settings.SCRAPER_CONCURRENCY)
+        if max_requests_per_second is None:
+            max_requests_per_second = settings.SCRAPER_MAX_REQUESTS_PER_SECOND
+        self.max_requests_per_second = max_requests_per_second
+
+    async def crawl(self, instrumento_ids: List[str]) -> Tuple[Dict[str, Optional[Dict]], CrawlStats]:
+        """
+        Crawl detail pages for the given IDs
+
+        Returns:
+            Tuple of ({instrumento_id: metadados or None}, CrawlStats)
+        """
+        results: Dict[str, Optional[Dict]] = {}
+        stats = CrawlStats()
+        if not instrumento_ids:
+            return results, stats
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for instrumento_id in instrumento_ids:
+            queue.put_nowait(instrumento_id)
+
+        limiter = RateLimiter(self.max_requests_per_second)
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        total = len(instrumento_ids)
+
+        def before_request():
+            # Runs on the executor thread: wait for a slot from the event loop
+            asyncio.run_coroutine_threadsafe(limiter.acquire(), loop).result()
+
+        async def worker(executor: ThreadPoolExecutor):
+            while True:
+                try:
+                    instrumento_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                try:
+                    metadados = await loop.run_in_executor(
+                        executor,
+                        partial(
+                            self.scraper.extract_metadados,
+                            instrumento_id,
+                            throttle=False,
+                            before_request=before_request,
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"Crawler failed on {instrumento_id}: {e}")
+                    metadados = None
+
+                results[instrumento_id] = metadados
+                stats.pages += 1
+                if metadados is None:
+                    stats.failures += 1
+
+                if stats.pages % 50 == 0 or stats.pages == total:
+                    stats.elapsed_seconds = time.monotonic() - started
+                    logger.info(
+                        f"Crawled {stats.pages}/{total} pages "
+                        f"({stats.pages_per_second:.2f} pages/s, {stats.failures} failures)"
+                    )
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawler") as executor:
+            await asyncio.gather(*(worker(executor) for _ in range(min(self.workers, total))))
+
+        stats.elapsed_seconds = time.monotonic() - started
+        logger.info(
+            f"Crawl finished: {stats.pages} pages in {stats.elapsed_seconds:.1f}s "
+            f"({stats.pages_per_second:.2f} pages/s, {self.workers} workers, "
+            f"budget {self.max_requests_per_second} req/s)"
+        )
+        return results, stats
+
+    def run(self, instrumento_ids: List[str]) -> Tuple[Dict[str, Optional[Dict]], CrawlStats]:
+        """Synchronous entry point for Celery tasks and background jobs"""
+        return asyncio.run(self.crawl(instrumento_ids))
@@ -0,0 +1,175 @@
+"""
+Bounded pool of reusable headless Chrome drivers for the scraper
+
+Starting Chrome costs seconds and hundreds of MB, so drivers are kept warm
+between discovery jobs. A driver is leased for the duration of a job, checked
+for health before it is handed out, and recycled after a number of page loads
+to keep memory growth in check.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Iterator, Optional
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def create_chrome_driver(user_agent: Optional[str] = None):
+    """Launch a headless Chrome WebDriver"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument(f'user-agent={user_agent or settings.SCRAPER_USER_AGENT}')
+    return webdriver.Chrome(options=chrome_options)
+
+
+class PooledDriver:
+    """A driver leased from the pool, counting the pages it has loaded"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created_at = time.monotonic()
+        self.broken = False
+
+    def get(self, url: str):
+        """Load a page and count it towards recycling"""
+        self.pages += 1
+        self.driver.get(url)
+
+    def is_healthy(self) -> bool:
+        try:
+            self.driver.execute_script('return 1')
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.debug(f"Error quitting driver: {e}")
+
+
+class ChromeDriverPool:
+    """Lease/return pool with a fixed maximum number of live browsers"""
+
+    def __init__(
+        self,
+        factory: Callable = create_chrome_driver,
+        max_size: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        lease_timeout: Optional[float] = None,
+    ):
+        self.factory = factory
+        self.max_size = max(1, max_size or settings.SCRAPER_DRIVER_POOL_SIZE)
+        self.max_pages = max_pages or settings.SCRAPER_DRIVER_MAX_PAGES
+        self.lease_timeout = lease_timeout or settings.SCRAPER_DRIVER_LEASE_TIMEOUT
+        self._idle: Deque[PooledDriver] = deque()
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _acquire(self) -> PooledDriver:
+        deadline = time.monotonic() + self.lease_timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self._idle:
+                    pooled = self._idle.popleft()
+                    break
+                if self._live < self.max_size:
+                    self._live += 1
+                    pooled = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No Chrome driver available after {self.lease_timeout}s")
+                self._cond.wait(remaining)
+
+        if pooled is not None:
+            if pooled.is_healthy():
+                return pooled
+            logger.info("Discarding unhealthy Chrome driver")
+            pooled.quit()
+
+        # Launch outside the lock, it takes seconds
+        try:
+            logger.info("Starting new headless Chrome driver")
+            return PooledDriver(self.factory())
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, pooled: PooledDriver):
+        recycle = pooled.broken or pooled.pages >= self.max_pages or self._closed
+        if not recycle:
+            try:
+                # Leave no state behind for the next job
+                pooled.driver.delete_all_cookies()
+                pooled.driver.get('about:blank')
+            except Exception:
+                recycle = True
+
+        if recycle:
+            logger.info(f"Recycling Chrome driver after {pooled.pages} pages")
+            pooled.quit()
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+        else:
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    @contextmanager
+    def lease(self) -> Iterator[PooledDriver]:
+        """Borrow a warm driver; it goes back to the pool when the block exits"""
+        pooled = self._acquire()
+        try:
+            yield pooled
+        except Exception:
+            pooled.broken = not pooled.is_healthy()
+            raise
+        finally:
+            self._release(pooled)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"live": self._live, "idle": len(self._idle), "max_size": self.max_size}
+
+    def shutdown(self):
+        """Quit every idle driver; leased drivers are quit when returned"""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._live -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            pooled.quit()
+
+
+_pool: Optional[ChromeDriverPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> ChromeDriverPool:
+    """Process-wide driver pool"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ChromeDriverPool()
+                atexit.register(_pool.shutdown)
+    return _pool
@@ -0,0 +1,180 @@
+"""
+On-disk cache of document text extraction results
+
+Extraction, and OCR above all, is a pure function of the document bytes and
+of the extractor settings, so results are keyed by the document's SHA-256
+plus a fingerprint of the extractor version and OCR settings. Scanned PDFs
+are also cached page by page: a document whose classification or OCR was
+interrupted only redoes the pages that are missing.
+
+Entries are small gzip-compressed JSON files. The store is bounded by
+EXTRACTION_CACHE_MAX_MB; when it grows past the limit the least recently
+used entries (by mtime, refreshed on every hit) are evicted.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Evict down to this fraction of the limit, so eviction does not run on every write
+EVICTION_TARGET = 0.9
+
+
+class ExtractionCacheStats:
+    """Process-wide hit/miss counters, per entry kind (document, page)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits: Dict[str, int] = {"document": 0, "page": 0}
+            self.misses: Dict[str, int] = {"document": 0, "page": 0}
+            self.stored = 0
+            self.evicted = 0
+
+    def record(self, kind: str, hit: bool):
+        with self._lock:
+            counters = self.hits if hit else self.misses
+            counters[kind] = counters.get(kind, 0) + 1
+
+    def record_store(self, stored: int = 0, evicted: int = 0):
+        with self._lock:
+            self.stored += stored
+            self.evicted += evicted
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            result = {"stored": self.stored, "evicted": self.evicted}
+            for kind in self.hits:
+                hits, misses = self.hits[kind], self.misses.get(kind, 0)
+                total = hits + misses
+                result[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": round(hits / total, 3) if total else 0.0,
+                }
+            return result
+
+
+stats = ExtractionCacheStats()
+
+
+def get_extraction_cache_stats() -> Dict:
+    """Return the extraction cache counters for this process"""
+    result = stats.as_dict()
+    if _cache is not None:
+        result["size_bytes"] = _cache.size_bytes
+    return result
+
+
+class ExtractionCache:
+    """Size-bounded LRU store of extraction results on disk"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or settings.EXTRACTION_CACHE_PATH
+        self.max_bytes = max_bytes if max_bytes is not None else settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self.size_bytes = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def key(kind: str, sha256: str, fingerprint: str, page: Optional[int] = None) -> str:
+        raw = f"{kind}:{sha256}:{page or ''}:{fingerprint}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+
+    def _entries(self):
+        """(path, size, mtime) of every entry"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json.gz'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def get(self, kind: str, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rb') as f:
+                value = json.loads(f.read().decode('utf-8'))
+            # Mark as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            stats.record(kind, hit=False)
+            return None
+        stats.record(kind, hit=True)
+        return value
+
+    def put(self, key: str, value: Dict):
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                gz.write(json.dumps(value).encode('utf-8'))
+            size = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {key}: {e}")
+            return
+
+        stats.record_store(stored=1)
+        with self._lock:
+            self.size_bytes += size - replaced
+            if self.size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the store is under the target size"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.size_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for path, size, _ in entries:
+            if self.size_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self.size_bytes -= size
+            evicted += 1
+        if evicted:
+            stats.record_store(evicted=evicted)
+            logger.info(f"Extraction cache: evicted {evicted} entries, {self.size_bytes} bytes left")
+
+
+_cache: Optional[ExtractionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    """Process-wide extraction cache, or None when disabled"""
+    global _cache
+    if not settings.EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ExtractionCache()
+    return _cache
@@ -0,0 +1,129 @@
+"""
+HTML parsing helpers shared by the Mediador scraper and API client
+
+Pages are parsed with lxml (C-backed) when it is installed, falling back to
+the pure-Python html.parser. Search pages can be restricted with a
+SoupStrainer so only the elements the result parsers look at are built.
+
+Response bytes are decoded once, before parsing: the charset is taken from a
+byte order mark, the Content-Type header or a <meta> declaration, and
+otherwise sniffed (strict UTF-8, then windows-1252). Government pages often
+declare ISO-8859-1 while serving UTF-8, so a latin-1 family declaration is
+only trusted when the bytes are not valid UTF-8.
+"""
+import codecs
+import re
+from typing import Optional, Tuple, Union
+from bs4 import BeautifulSoup, SoupStrainer
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+    logger.warning("lxml not installed, falling back to html.parser")
+
+# Elements read by MediadorAPIClient._parse_search_results: result tables,
+# result/menu containers and links. Everything else (head, scripts, forms,
+# footers outside containers) is skipped while parsing.
+SEARCH_RESULTS_STRAINER = SoupStrainer(['table', 'div', 'ul', 'li', 'section', 'main', 'nav', 'a'])
+
+# Only links, for pages scanned for navigation targets
+LINKS_STRAINER = SoupStrainer('a', href=True)
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+HEADER_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([\w.:-]+)', re.I)
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+# The HTML spec only looks for the meta declaration in the first 1024 bytes
+META_SCAN_BYTES = 1024
+# Declarations that are routinely wrong for UTF-8 pages
+LATIN1_FAMILY = {'iso8859-1', 'cp1252', 'iso8859-15'}
+FALLBACK_ENCODING = 'cp1252'
+
+
+def _normalize_charset(name: Optional[str]) -> Optional[str]:
+    """Canonical codec name, or None when Python does not know the charset"""
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name.strip()).name
+    except LookupError:
+        return None
+
+
+def _declared_charset(content: bytes, content_type: Optional[str]) -> Optional[str]:
+    """Charset from the Content-Type header, else from a <meta> declaration"""
+    if content_type:
+        match = HEADER_CHARSET_RE.search(content_type)
+        if match:
+            declared = _normalize_charset(match.group(1))
+            if declared:
+                return declared
+    match = META_CHARSET_RE.search(content[:META_SCAN_BYTES])
+    if match:
+        return _normalize_charset(match.group(1).decode('ascii', 'replace'))
+    return None
+
+
+def _decode(content: bytes, content_type: Optional[str]) -> Tuple[str, str]:
+    """Decode a body with its detected charset; returns (text, encoding)"""
+    for bom, encoding in BOMS:
+        if content.startswith(bom):
+            return content[len(bom):].decode(encoding, errors='replace'), encoding
+
+    declared = _declared_charset(content, content_type)
+    if declared is not None and declared not in LATIN1_FAMILY and declared != 'utf-8':
+        try:
+            return content.decode(declared), declared
+        except UnicodeDecodeError:
+            logger.debug(f"Body is not valid {declared} as declared, sniffing")
+
+    # Strict UTF-8 doubles as the sniffing step: latin-1 text is almost never valid UTF-8
+    try:
+        return content.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    encoding = declared if declared in LATIN1_FAMILY else FALLBACK_ENCODING
+    # windows-1252 leaves five bytes undefined: keep them visible instead of dropping them
+    return content.decode(encoding, errors='replace'), encoding
+
+
+def decode_html(content: bytes, content_type: Optional[str] = None) -> str:
+    """Decode a response body once, with its detected charset"""
+    return _decode(content, content_type)[0]
+
+
+def parse_html(
+    content: Union[bytes, str],
+    only: Optional[SoupStrainer] = None,
+    from_encoding: Optional[str] = None,
+) -> BeautifulSoup:
+    """
+    Parse an HTML document once with the fastest available parser
+
+    Args:
+        content: Raw response bytes or decoded text
+        only: Optional SoupStrainer restricting which elements are built
+        from_encoding: Declared charset of `content` when it is bytes;
+            detected from the bytes when omitted
+
+    Returns:
+        BeautifulSoup tree
+    """
+    if isinstance(content, bytes):
+        content = decode_html(content, f"charset={from_encoding}" if from_encoding else None)
+    return BeautifulSoup(content, PARSER, parse_only=only)
+
+
+def parse_response(response, only: Optional[SoupStrainer] = None) -> BeautifulSoup:
+    """Parse a requests response, decoding its body once with the detected charset"""
+    return parse_html(decode_html(response.content, response.headers.get('Content-Type')), only=only)
@@ -0,0 +1,339 @@
+"""
+On-disk HTTP cache with conditional revalidation for Mediador pages and documents
+
+CachingAdapter wraps the transport adapter of a requests.Session. Bodies of GET
+responses that carry an ETag or Last-Modified header are stored on disk, keyed
+by URL. The next request for the same URL is sent with If-None-Match /
+If-Modified-Since, and a 304 answer is served from the stored body.
+
+PDFs are not cached: downloaded documents already live in the
+content-addressed document storage. Bodies above HTTP_CACHE_MAX_ENTRY_MB are
+skipped too, and the store is bounded by HTTP_CACHE_MAX_MB, evicting the least
+recently used entries (by metadata mtime, rewritten on every revalidation).
+"""
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Optional
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Evict down to this fraction of the limit, so eviction does not run on every write
+EVICTION_TARGET = 0.9
+UNCACHED_CONTENT_TYPES = ('application/pdf',)
+
+
+class HTTPCacheStats:
+    """Process-wide hit/miss counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0  # 304 answered from disk
+            self.misses = 0  # full body transferred
+            self.stored = 0  # bodies written to disk
+            self.skipped = 0  # bodies not stored (PDF or too large)
+            self.evicted = 0
+            self.bytes_saved = 0
+
+    def record(
+        self,
+        hits: int = 0,
+        misses: int = 0,
+        stored: int = 0,
+        skipped: int = 0,
+        evicted: int = 0,
+        bytes_saved: int = 0,
+    ):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+            self.stored += stored
+            self.skipped += skipped
+            self.evicted += evicted
+            self.bytes_saved += bytes_saved
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stored": self.stored,
+                "skipped": self.skipped,
+                "evicted": self.evicted,
+                "bytes_saved": self.bytes_saved,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+stats = HTTPCacheStats()
+
+
+def get_http_cache_stats() -> Dict:
+    """Return the HTTP cache counters for this process"""
+    return stats.as_dict()
+
+
+class CacheBudget:
+    """Size accounting and LRU eviction of one cache directory"""
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.size_bytes = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """(key path without extension, size of body + metadata, last use) of every entry"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                base = os.path.join(root, name[:-len('.json')])
+                try:
+                    meta = os.stat(base + '.json')
+                    size = meta.st_size + os.path.getsize(base + '.body')
+                except OSError:
+                    continue
+                yield base, size, meta.st_mtime
+
+    def add(self, size: int):
+        with self._lock:
+            self.size_bytes += size
+            if self.size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Delete least recently used entries until the store is under the target size"""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        self.size_bytes = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_TARGET
+        evicted = 0
+        for base, size, _ in entries:
+            if self.size_bytes <= target:
+                break
+            try:
+                # Metadata first: an entry without it is never served
+                os.remove(base + '.json')
+                os.remove(base + '.body')
+            except OSError:
+                continue
+            self.size_bytes -= size
+            evicted += 1
+        if evicted:
+            stats.record(evicted=evicted)
+            logger.info(f"HTTP cache: evicted {evicted} entries, {self.size_bytes} bytes left")
+
+
+_budgets: Dict[str, CacheBudget] = {}
+_budgets_lock = threading.Lock()
+
+
+def _get_budget(cache_dir: str) -> CacheBudget:
+    """Process-wide budget of a cache directory, shared by every session's adapter"""
+    with _budgets_lock:
+        budget = _budgets.get(cache_dir)
+        if budget is None:
+            budget = _budgets[cache_dir] = CacheBudget(cache_dir, settings.HTTP_CACHE_MAX_MB * 1024 * 1024)
+        return budget
+
+
+class CachingAdapter(BaseAdapter):
+    """Transport adapter that revalidates cached GET responses"""
+
+    def __init__(self, inner: BaseAdapter, cache_dir: Optional[str] = None):
+        super().__init__()
+        self.inner = inner
+        self.cache_dir = cache_dir or settings.HTTP_CACHE_PATH
+        self.max_entry_bytes = settings.HTTP_CACHE_MAX_ENTRY_MB * 1024 * 1024
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.budget = _get_budget(self.cache_dir)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        directory = os.path.join(self.cache_dir, key[:2])
+        return directory, os.path.join(directory, f"{key}.body"), os.path.join(directory, f"{key}.json")
+
+    def _load_entry(self, url: str) -> Optional[Dict]:
+        _, body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if os.path.exists(body_path):
+                return entry
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def _write_meta(self, url: str, entry: Dict):
+        directory, _, meta_path = self._paths(url)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, meta_path)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if request.method != 'GET':
+            return self.inner.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        entry = self._load_entry(request.url)
+        if entry:
+            if entry.get('etag') and 'If-None-Match' not in request.headers:
+                request.headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified') and 'If-Modified-Since' not in request.headers:
+                request.headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self.inner.send(request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        if response.status_code == 304 and entry:
+            try:
+                cached = self._cached_response(request, entry, response)
+            except OSError:
+                # Evicted since it was loaded: fetch the full body again
+                response.content
+                response.close()
+                for header, field in (('If-None-Match', 'etag'), ('If-Modified-Since', 'last_modified')):
+                    if entry.get(field) and request.headers.get(header) == entry[field]:
+                        del request.headers[header]
+                response = self.inner.send(
+                    request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies
+                )
+                cached = None
+            if cached is not None:
+                stats.record(hits=1, bytes_saved=entry.get('size', 0))
+                # Validators may be refreshed by the 304
+                for header, field in (('ETag', 'etag'), ('Last-Modified', 'last_modified')):
+                    if response.headers.get(header):
+                        entry[field] = response.headers[header]
+                        entry['headers'][header] = response.headers[header]
+                self._write_meta(request.url, entry)
+                # Drain the empty 304 body so the connection returns to the pool
+                response.content
+                response.close()
+                return self._finish(cached, stream)
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        cache_control = response.headers.get('Cache-Control', '').lower()
+        if response.status_code == 200 and (etag or last_modified) and 'no-store' not in cache_control:
+            stats.record(misses=1)
+            if not self._cacheable(response):
+                stats.record(skipped=1)
+                return self._finish(response, stream)
+            try:
+                self._store(request.url, response, etag, last_modified)
+            except OSError as e:
+                logger.warning(f"Could not write HTTP cache entry for {request.url}: {e}")
+        elif response.status_code == 200:
+            stats.record(misses=1)
+
+        return self._finish(response, stream)
+
+    def _cacheable(self, response: requests.Response) -> bool:
+        """PDFs and bodies announced as too large are not worth a second copy on disk"""
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type in UNCACHED_CONTENT_TYPES:
+            return False
+        try:
+            return int(response.headers.get('Content-Length', 0)) <= self.max_entry_bytes
+        except ValueError:
+            return True
+
+    def _store(self, url: str, response: requests.Response, etag: Optional[str], last_modified: Optional[str]):
+        """Spool the body to disk and serve the response from the stored file"""
+        directory, body_path, meta_path = self._paths(url)
+        os.makedirs(directory, exist_ok=True)
+        replaced = 0
+        for path in (body_path, meta_path):
+            try:
+                replaced += os.path.getsize(path)
+            except OSError:
+                pass
+
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp_path, body_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        headers = dict(response.headers)
+        # The stored body is already decoded
+        headers.pop('Content-Encoding', None)
+        headers.pop('Transfer-Encoding', None)
+        headers['Content-Length'] = str(size)
+        self._write_meta(url, {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': headers,
+            'etag': etag,
+            'last_modified': last_modified,
+            'size': size,
+        })
+        stats.record(stored=1)
+        self.budget.add(size + os.path.getsize(meta_path) - replaced)
+
+        original_raw = response.raw
+        response.raw = open(body_path, 'rb')
+        # Keep cookies from the real response visible to the session
+        response.raw._original_response = getattr(original_raw, '_original_response', None)
+        response.headers = CaseInsensitiveDict(headers)
+        response._content_consumed = False
+
+    def _cached_response(self, request, entry: Dict, revalidation: requests.Response) -> requests.Response:
+        _, body_path, _ = self._paths(request.url)
+        response = requests.Response()
+        response.status_code = entry.get('status_code', 200)
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.raw = open(body_path, 'rb')
+        response.raw._original_response = getattr(revalidation.raw, '_original_response', None)
+        response.from_cache = True
+        return response
+
+    def _finish(self, response: requests.Response, stream: bool) -> requests.Response:
+        """Honour the caller's stream flag (the inner request is always streamed)"""
+        if not stream:
+            response.content
+            # Releases the pooled connection, or closes the cached body file
+            response.close()
+            if isinstance(response.raw, io.IOBase):
+                response.raw.close()
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+def install_http_cache(session: requests.Session):
+    """Wrap the session's HTTP(S) adapters with the on-disk cache"""
+    if not settings.HTTP_CACHE_ENABLED:
+        return
+    for prefix in ('http://', 'https://'):
+        inner = session.adapters[prefix]
+        if not isinstance(inner, CachingAdapter):
+            session.mount(prefix, CachingAdapter(inner))
@@ -0,0 +1,206 @@
+"""
+Record/replay of Mediador HTTP traffic for offline tests and benchmarks
+
+With MEDIADOR_HTTP_MODE=record every response the scraper and the live
+search client receive is saved (gzip-compressed, with status and headers)
+into a fixture corpus. With MEDIADOR_HTTP_MODE=replay the same clients are
+served from that corpus without touching the network; requests that were
+never recorded fail like a connection error.
+
+The adapters are mounted outermost, so replay also bypasses the circuit
+breaker and the on-disk HTTP cache and always returns the recorded bytes.
+"""
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Union
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+
+# Stored bodies are already decoded
+DROPPED_HEADERS = ('Content-Encoding', 'Transfer-Encoding')
+
+
+@dataclass
+class Fixture:
+    """One recorded exchange"""
+    method: str
+    url: str
+    status_code: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+    # sha256 of the request body, None for requests without one
+    request_sha256: Optional[str] = None
+
+
+def request_body_sha256(body: Union[str, bytes, None]) -> Optional[str]:
+    if not body:
+        return None
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+def fixture_path(corpus_dir: str, method: str, url: str, request_sha256: Optional[str] = None) -> str:
+    """
+    Corpus file for a request: {corpus}/{host}/{hash}.json.gz
+
+    Requests with a body (form POSTs) are told apart by its hash; requests
+    without one keep the method + URL key.
+    """
+    host = urlsplit(url).netloc.replace(':', '_') or 'unknown'
+    identity = f"{method.upper()} {url}"
+    if request_sha256:
+        identity += f" {request_sha256}"
+    key = hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(corpus_dir, host, f"{key}.json.gz")
+
+
+def save_fixture(corpus_dir: str, fixture: Fixture) -> str:
+    path = fixture_path(corpus_dir, fixture.method, fixture.url, fixture.request_sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = {
+        'method': fixture.method,
+        'url': fixture.url,
+        'request_sha256': fixture.request_sha256,
+        'status_code': fixture.status_code,
+        'reason': fixture.reason,
+        'headers': fixture.headers,
+        'body': base64.b64encode(fixture.body).decode('ascii'),
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb') as gz:
+        gz.write(json.dumps(record).encode('utf-8'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_fixture(path: str) -> Fixture:
+    with gzip.open(path, 'rb') as f:
+        record = json.loads(f.read().decode('utf-8'))
+    return Fixture(
+        method=record['method'],
+        url=record['url'],
+        status_code=record['status_code'],
+        reason=record.get('reason') or '',
+        headers=record.get('headers') or {},
+        body=base64.b64decode(record['body']),
+        request_sha256=record.get('request_sha256'),
+    )
+
+
+def iter_fixtures(corpus_dir: Optional[str] = None) -> Iterator[Fixture]:
+    """Every fixture in the corpus, in a stable order"""
+    corpus_dir = corpus_dir or settings.MEDIADOR_FIXTURES_PATH
+    for root, dirs, files in os.walk(corpus_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.endswith('.json.gz'):
+                yield load_fixture(os.path.join(root, name))
+
+
+def build_response(request, fixture: Fixture, connection=None) -> requests.Response:
+    response = requests.Response()
+    response.status_code = fixture.status_code
+    response.reason = fixture.reason
+    response.headers = CaseInsensitiveDict(fixture.headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    response.connection = connection
+    response.raw = io.BytesIO(fixture.body)
+    return response
+
+
+class RecordingAdapter(BaseAdapter):
+    """Passes requests through and saves every response into the corpus"""
+
+    def __init__(self, inner: BaseAdapter, corpus_dir: Optional[str] = None):
+        super().__init__()
+        self.inner = inner
+        self.corpus_dir = corpus_dir or settings.MEDIADOR_FIXTURES_PATH
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        # Record full bodies, never 304s that only make sense with a warm cache
+        request.headers.pop('If-None-Match', None)
+        request.headers.pop('If-Modified-Since', None)
+
+        response = self.inner.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        # Reading the body here keeps it available to stream=True callers as well
+        body = response.content
+        headers = {k: v for k, v in response.headers.items() if k not in DROPPED_HEADERS}
+        headers['Content-Length'] = str(len(body))
+        try:
+            path = save_fixture(self.corpus_dir, Fixture(
+                method=request.method,
+                url=request.url,
+                status_code=response.status_code,
+                reason=response.reason or '',
+                headers=headers,
+                body=body,
+                request_sha256=request_body_sha256(request.body),
+            ))
+            logger.debug(f"Recorded {request.method} {request.url} -> {path}")
+        except OSError as e:
+            logger.warning(f"Could not record {request.url}: {e}")
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves requests from the corpus; never touches the network"""
+
+    def __init__(self, corpus_dir: Optional[str] = None):
+        super().__init__()
+        self.corpus_dir = corpus_dir or settings.MEDIADOR_FIXTURES_PATH
+        self.hits = 0
+        self.misses = 0
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        path = fixture_path(self.corpus_dir, request.method, request.url, request_body_sha256(request.body))
+        if not os.path.exists(path):
+            self.misses += 1
+            raise requests.ConnectionError(f"No recorded fixture for {request.method} {request.url}", request=request)
+        self.hits += 1
+        return build_response(request, load_fixture(path), connection=self)
+
+    def close(self):
+        pass
+
+
+def install_http_fixtures(session: requests.Session, mode: Optional[str] = None, corpus_dir: Optional[str] = None):
+    """Mount the record or replay adapter according to MEDIADOR_HTTP_MODE"""
+    mode = (mode or settings.MEDIADOR_HTTP_MODE or LIVE).lower()
+    if mode == LIVE:
+        return
+    if mode not in (RECORD, REPLAY):
+        raise ValueError(f"Invalid MEDIADOR_HTTP_MODE: {mode}")
+
+    for prefix in ('http://', 'https://'):
+        inner = session.adapters[prefix]
+        if isinstance(inner, (RecordingAdapter, ReplayAdapter)):
+            continue
+        if mode == RECORD:
+            session.mount(prefix, RecordingAdapter(inner, corpus_dir))
+        else:
+            session.mount(prefix, ReplayAdapter(corpus_dir))
+    logger.info(f"HTTP {mode} mode, corpus at {corpus_dir or settings.MEDIADOR_FIXTURES_PATH}")
@@ -0,0 +1,153 @@
+"""
+Process-wide pooled HTTP transport for the Mediador clients
+
+Every MediadorScraper and MediadorAPIClient keeps its own requests.Session
+(headers, cookies and the adapter layers for fixtures, cache and circuit
+breaker), but the innermost adapter is shared: one set of urllib3 connection
+pools per process. Keep-alive connections to the government hosts survive
+across sessions, collection tasks and API requests, so most requests skip the
+TCP and TLS handshakes entirely.
+
+TLS setup (SSL context, CA bundle, handshake) is only paid when a pool opens
+a new connection. HTTP/2 is not available: neither requests nor urllib3
+speak it.
+
+Per-host counters (connections opened vs. requests sent) come from the
+urllib3 pools themselves and survive pool eviction.
+"""
+import socket
+import threading
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from app.core.config import settings
+from app.services.http_fixtures import LIVE
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Probe OS-level liveness of idle keep-alive connections
+SOCKET_OPTIONS = HTTPConnection.default_socket_options + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+WARMUP_TIMEOUT_SECONDS = 10
+
+
+def _host_key(scheme: str, host: str, port: Optional[int]) -> str:
+    default_port = 443 if scheme == 'https' else 80
+    return f"{scheme}://{host}" if port in (None, default_port) else f"{scheme}://{host}:{port}"
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter with TCP keep-alive and per-host reuse counters"""
+
+    def __init__(self, pool_connections: int, pool_maxsize: int):
+        # Counters of pools already evicted or closed, per host
+        self._retired: Dict[str, Dict[str, int]] = {}
+        self._retired_lock = threading.Lock()
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs.setdefault('socket_options', SOCKET_OPTIONS)
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        pools = self.poolmanager.pools
+        dispose = pools.dispose_func
+
+        def retire(pool):
+            self._retire(pool)
+            if dispose is not None:
+                dispose(pool)
+
+        pools.dispose_func = retire
+
+    def _retire(self, pool):
+        key = _host_key(pool.scheme, pool.host, pool.port)
+        with self._retired_lock:
+            counters = self._retired.setdefault(key, {"connections": 0, "requests": 0})
+            counters["connections"] += pool.num_connections
+            counters["requests"] += pool.num_requests
+
+    def connection_stats(self) -> Dict[str, Dict]:
+        """Connections opened and requests sent per host since startup"""
+        with self._retired_lock:
+            totals = {key: dict(counters) for key, counters in self._retired.items()}
+
+        pools = self.poolmanager.pools
+        for pool_key in pools.keys():
+            pool = pools.get(pool_key)
+            if pool is None:
+                continue
+            counters = totals.setdefault(
+                _host_key(pool.scheme, pool.host, pool.port), {"connections": 0, "requests": 0}
+            )
+            counters["connections"] += pool.num_connections
+            counters["requests"] += pool.num_requests
+
+        for key, counters in totals.items():
+            reused = max(0, counters["requests"] - counters["connections"])
+            counters["reused"] = reused
+            counters["reuse_ratio"] = round(reused / counters["requests"], 3) if counters["requests"] else 0.0
+            # Every reused HTTPS connection is a TLS handshake not made
+            counters["handshakes_saved"] = reused if key.startswith('https') else 0
+        return totals
+
+
+_adapter: Optional[PooledAdapter] = None
+_adapter_lock = threading.Lock()
+
+
+def get_shared_adapter() -> PooledAdapter:
+    """Process-wide pooled adapter"""
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                maxsize = max(
+                    settings.HTTP_POOL_MAXSIZE,
+                    settings.SCRAPER_CONCURRENCY,
+                    settings.MEDIADOR_LIVE_CONCURRENCY,
+                )
+                _adapter = PooledAdapter(pool_connections=settings.HTTP_POOL_CONNECTIONS, pool_maxsize=maxsize)
+    return _adapter
+
+
+def mount_shared_transport(session: requests.Session):
+    """Send the session's HTTP(S) traffic through the shared connection pools"""
+    adapter = get_shared_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+
+def get_connection_stats() -> Dict[str, Dict]:
+    return get_shared_adapter().connection_stats()
+
+
+def warm_up(urls=None) -> Dict[str, bool]:
+    """Open a keep-alive connection to each Mediador host; returns host -> reachable"""
+    if (settings.MEDIADOR_HTTP_MODE or LIVE).lower() != LIVE:
+        return {}
+    urls = urls or [settings.MEDIADOR_API_URL, settings.MEDIADOR_BASE_URL]
+
+    session = requests.Session()
+    session.headers['User-Agent'] = settings.SCRAPER_USER_AGENT
+    mount_shared_transport(session)
+
+    results = {}
+    for url in urls:
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        if origin in results:
+            continue
+        try:
+            session.head(origin, timeout=WARMUP_TIMEOUT_SECONDS, allow_redirects=False)
+            results[origin] = True
+        except requests.RequestException as e:
+            logger.info(f"HTTP warm-up of {origin} failed: {e}")
+            results[origin] = False
+    logger.info(f"HTTP warm-up: {results}")
+    return results
+
+
+def warm_up_in_background():
+    """Warm the pools without holding up startup"""
+    threading.Thread(target=warm_up, name="http-warmup", daemon=True).start()
@@ -3,27 +3,158 @@ Serviço para buscar dados do Mediador MTE em tempo real
 """
 import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+from urllib.parse import urljoin
 from app.core.config import settings
+from app.core.cache import SharedCache
+from app.services.circuit_breaker import install_circuit_breaker
+from app.services.http_cache import install_http_cache
+from app.services.http_fixtures import install_http_fixtures
+from app.services.http_transport import mount_shared_transport
+from app.services.html_parser import decode_html, parse_html, parse_response, SEARCH_RESULTS_STRAINER, LINKS_STRAINER
+from app.services.mirrors import MirrorSet
+from app.services.search_cache import normalize_search_key, search_params
+from app.services.single_flight import SingleFlight
 import logging
 import re
-from datetime import datetime
+from datetime import date, datetime
 from dateutil import parser
 
 logger = logging.getLogger(__name__)
 
+# Endpoint de busca que funcionou por base_url (compartilhado entre workers via Redis)
+_endpoint_cache = SharedCache("mediador:endpoint")
+
+# Buscas idênticas simultâneas (neste processo ou em outros workers) compartilham uma única requisição
+_search_flight = SingleFlight("mediador:search")
+# Buscas em streaming propagam erros (search_convencoes devolve []), então não
+# podem compartilhar o resultado com _search_flight
+_stream_flight = SingleFlight("mediador:search-stream")
+_details_flight = SingleFlight("mediador:details")
+
+# --- Classificação de resultados: padrões compilados uma única vez ---
+
+# Textos de menu reconhecidos por igualdade exata (busca em conjunto, O(1))
+MENU_EXACT_MATCHES = frozenset([
+    'solicitação de registro de instrumento coletivo',
+    'solicitação de mediação',
+    'continuar solicitação',
+    'retificar solicitação',
+    'acompanhar solicitação',
+    'acompanhar mediação',
+    'imprimir requerimento',
+    'manual do usuário',
+    'instrumentos coletivos registrados',  # Esta é uma página de listagem
+    'boas práticas trabalhistas',  # Página informativa
+])
+
+# Padrões de menu no texto inteiro (variações com/sem acento)
+MENU_PATTERN_RE = re.compile(
+    r'^(?:continuar solicita[çc][ãa]o|retificar solicita[çc][ãa]o|acompanhar solicita[çc][ãa]o'
+    r'|solicitar media[çc][ãa]o|imprimir requerimento|manual do usuário)$',
+    re.I
+)
+
+# Palavras de ação que, em textos curtos, indicam item de menu
+MENU_ACTION_RE = re.compile(r'continuar|retificar|acompanhar|imprimir')
+
+# Palavras que descartam uma div de resultado sem ID ("imprimir" não entra aqui)
+DIV_ACTION_RE = re.compile(r'continuar|retificar|acompanhar')
+
+# Divs que são exatamente um item de menu
+DIV_MENU_RE = re.compile(
+    r'^(?:continuar solicitação|retificar solicitação|acompanhar solicitação|solicitar mediação)$',
+    re.I
+)
+
+RESULT_ITEM_CLASS_RE = re.compile(r'result|item|convencao|instrumento|registro', re.I)
+RESULT_CONTAINER_CLASS_RE = re.compile(r'result|lista|tabela|conteudo|content|main', re.I)
+NAV_CLASS_RE = re.compile(r'menu|nav|navigation', re.I)
+NAV_CLASSES = frozenset(['menu', 'nav', 'navigation', 'sidebar'])
+
+ID_ANY_RE = re.compile(r'(\d{4,})')
+ID_AFTER_SLASH_RE = re.compile(r'/(\d{4,})')
+ID_AFTER_SEPARATOR_RE = re.compile(r'[=/:](\d{4,})')
+DATE_RE = re.compile(r'(\d{2})[/-](\d{2})[/-](\d{4})')
+UF_RE = re.compile(r'\b([A-Z]{2})\b')
+
+# Links de paginação ("Próxima", "»", rel="next", class="next"...)
+NEXT_PAGE_TEXTS = frozenset(['próxima', 'próximo', 'proxima', 'proximo', 'seguinte', 'next', '»', '›', '>', '>>'])
+NEXT_PAGE_CLASS_RE = re.compile(r'next|proxim', re.I)
+
+# Teto de resultados extraídos de uma única página ao iterar
+MAX_RESULTS_PER_PAGE = 1000
+
+
+def is_menu_item(text: str) -> bool:
+    """Verifica se um texto é um item de menu"""
+    if not text:
+        return False
+    text_lower = text.lower().strip()
+    
+    # Verificar se é exatamente um item de menu conhecido
+    if text_lower in MENU_EXACT_MATCHES:
+        return True
+    
+    # Verificar padrões específicos no início do texto
+    if MENU_PATTERN_RE.match(text_lower):
+        return True
+    
+    # Se o texto é muito curto (< 30 caracteres) e contém palavras de ação específicas, provavelmente é menu
+    return len(text_lower) < 30 and MENU_ACTION_RE.search(text_lower) is not None
+
+
+def extract_instrumento_id(href: str) -> Optional[str]:
+    """
+    Extrai o ID (4+ dígitos) de uma URL
+    
+    Preferência: número após '/', depois após '=' ou ':', depois qualquer número.
+    Uma única busca resolve o caso comum; as demais só rodam se necessário.
+    """
+    match = ID_ANY_RE.search(href)
+    if not match:
+        return None
+    start = match.start()
+    if start and href[start - 1] == '/':
+        return match.group(1)
+    match = (
+        ID_AFTER_SLASH_RE.search(href, start) or
+        ID_AFTER_SEPARATOR_RE.search(href, max(start - 1, 0)) or
+        match
+    )
+    return match.group(1)
+
+
+def is_next_page_link(link) -> bool:
+    """Verifica se um link <a> aponta para a próxima página de resultados"""
+    if 'next' in (link.get('rel') or []):
+        return True
+    text = link.get_text(strip=True).lower()
+    if text in NEXT_PAGE_TEXTS or text.startswith(('próxima', 'proxima')):
+        return True
+    if NEXT_PAGE_CLASS_RE.search(' '.join(link.get('class', []))):
+        return True
+    parent = link.parent
+    return (
+        parent is not None and parent.name == 'li' and
+        NEXT_PAGE_CLASS_RE.search(' '.join(parent.get('class', []))) is not None
+    )
+
 
 class MediadorAPIClient:
     """Cliente para buscar dados do Mediador MTE"""
     
     def __init__(self):
-        # URL real do Mediador MTE - tentar diferentes padrões
+        # Espelhos do Mediador MTE - servem o mesmo conteúdo
         self.base_urls = [
-            "https://www3.mte.gov.br/sistemas/mediador",
-            "https://mediador.trabalho.gov.br",
+            settings.MEDIADOR_API_URL.rstrip('/'),
+            settings.MEDIADOR_BASE_URL.rstrip('/'),
             "http://mediador.mte.gov.br",
         ]
-        self.base_url = self.base_urls[0]  # Usar o primeiro como padrão
+        # Requisições com hedge: o espelho mais rápido e saudável vem primeiro
+        self.mirrors = MirrorSet(self.base_urls)
+        self.base_url = self.mirrors.preferred
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -31,6 +162,11 @@ class MediadorAPIClient:
             'Accept-Language': 'pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7',
             'Referer': 'https://www3.mte.gov.br/',
         })
+        # Pools de conexão compartilhados pelo processo (keep-alive entre requisições)
+        mount_shared_transport(self.session)
+        install_circuit_breaker(self.session)
+        install_http_cache(self.session)
+        install_http_fixtures(self.session)
     
     def search_convencoes(
         self,
@@ -53,142 +189,64 @@ class MediadorAPIClient:
         Returns:
             Lista de convenções encontradas
         """
+        key = normalize_search_key(municipio, uf, cnae, cnpj, limit)
+        return _search_flight.do(key, lambda: self._search_convencoes(municipio, uf, cnae, cnpj, limit))
+    
+    def search_result_pages(
+        self,
+        municipio: Optional[str],
+        uf: Optional[str],
+        cnae: Optional[str],
+        cnpj: Optional[str],
+        limit: int,
+        on_page: Callable[[List[Dict]], None],
+    ) -> List[Dict]:
+        """
+        Busca coalescida que entrega cada página a `on_page` assim que é extraída
+        
+        Se uma busca em streaming idêntica já estiver em andamento (neste ou em
+        outro worker), o resultado dela é entregue de uma vez, como uma única
+        página. Diferente de search_convencoes, erros são propagados; por isso
+        o single-flight é separado do de search_convencoes.
+        
+        Returns:
+            Lista completa de convenções (até `limit`)
+        """
+        executou = False
+        
+        def buscar() -> List[Dict]:
+            nonlocal executou
+            executou = True
+            coletados = []
+            for pagina in self.iter_result_pages(municipio, uf, cnae, cnpj):
+                pagina = pagina[:limit - len(coletados)]
+                coletados.extend(pagina)
+                on_page(pagina)
+                if len(coletados) >= limit:
+                    break
+            return coletados
+        
+        key = normalize_search_key(municipio, uf, cnae, cnpj, limit)
+        convencoes = _stream_flight.do(key, buscar)
+        if not executou:
+            on_page(convencoes)
+        return convencoes
+    
+    def _search_convencoes(
+        self,
+        municipio: Optional[str],
+        uf: Optional[str],
+        cnae: Optional[str],
+        cnpj: Optional[str],
+        limit: int
+    ) -> List[Dict]:
+        """Executa a busca (sem coalescência)"""
         convencoes = []
         
         try:
-            # Tentar diferentes URLs de busca
-            search_urls = [
-                f"{self.base_url}/ConvencaoColetiva/Consulta",
-                f"{self.base_url}/Consulta/ConvencaoColetiva",
-                f"{self.base_url}/Consulta",
-                f"{self.base_url}/InstrumentosColetivos/Consulta",
-                f"{self.base_url}/busca",
-                f"{self.base_url}/pesquisa",
-                f"{self.base_url}/",
-            ]
-            
-            # Preparar parâmetros de busca
-            params = {}
-            if municipio:
-                params['municipio'] = municipio
-            if uf:
-                params['uf'] = uf.upper()
-            if cnae:
-                # Remover formatação do CNAE
-                cnae_clean = cnae.replace('-', '').replace('/', '')
-                params['cnae'] = cnae_clean
-            if cnpj:
-                # Remover formatação do CNPJ
-                cnpj_clean = cnpj.replace('.', '').replace('/', '').replace('-', '')
-                params['cnpj'] = cnpj_clean
-            
-            response = None
-            soup = None
-            
-            # Tentar cada URL até encontrar uma que funcione
-            for search_url in search_urls:
-                try:
-                    logger.info(f"Tentando buscar em: {search_url} com parâmetros: {params}")
-                    response = self.session.get(search_url, params=params, timeout=30, allow_redirects=True)
-                    
-                    # Garantir encoding UTF-8
-                    if response.encoding is None or response.encoding.lower() not in ['utf-8', 'utf8']:
-                        response.encoding = 'utf-8'
-                    
-                    # Verificar se a resposta é válida
-                    if response.status_code == 200:
-                        # Verificar se a página contém conteúdo relevante
-                        content_lower = response.text.lower()
-                        
-                        # Verificar se tem resultados de busca (tabelas com dados, listas de resultados, etc.)
-                        # Usar encoding UTF-8 explicitamente
-                        temp_soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-                        has_results = (
-                            len(temp_soup.find_all('table')) > 0 or
-                            len(temp_soup.find_all(['div', 'ul'], class_=re.compile(r'result|lista|tabela', re.I))) > 0 or
-                            len([l for l in temp_soup.find_all('a', href=True) if re.search(r'/\d{6,}', l.get('href', ''))]) > 0
-                        )
-                        
-                        # Verificar se tem conteúdo relevante (mesmo que seja página inicial, pode ter links úteis)
-                        has_relevant_content = any(keyword in content_lower for keyword in ['convenção', 'instrumento', 'coletivo', 'trabalho'])
-                        
-                        # Aceitar se tem resultados OU se tem conteúdo relevante (vamos filtrar depois)
-                        if has_results or has_relevant_content:
-                            soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-                            logger.info(f"✓ URL funcionando: {search_url}")
-                            break
-                        else:
-                            logger.debug(f"Página não contém conteúdo relevante: {search_url}")
-                    elif response.status_code in [301, 302, 303, 307, 308]:
-                        # Seguir redirect
-                        redirect_url = response.headers.get('Location', '')
-                        if redirect_url:
-                            if not redirect_url.startswith('http'):
-                                redirect_url = f"{self.base_url}{redirect_url}"
-                            logger.info(f"Redirect detectado para: {redirect_url}")
-                            response = self.session.get(redirect_url, timeout=30)
-                            if response.encoding is None or response.encoding.lower() not in ['utf-8', 'utf8']:
-                                response.encoding = 'utf-8'
-                            if response.status_code == 200:
-                                soup = BeautifulSoup(response.content, 'html.parser', from_encoding='utf-8')
-                                logger.info(f"✓ URL após redirect funcionando: {redirect_url}")
-                                break
-                except requests.RequestException as e:
-                    logger.debug(f"Erro ao acessar {search_url}: {e}")
-                    continue
-            
-            if not soup:
-                logger.warning("Nenhuma URL de busca funcionou. Tentando navegar pela página inicial...")
-                # Tentar acessar a página inicial e procurar por links de consulta
-                try:
-                    home_response = self.session.get(self.base_url, timeout=10)
-                    if home_response.encoding is None or home_response.encoding.lower() not in ['utf-8', 'utf8']:
-                        home_response.encoding = 'utf-8'
-                    if home_response.status_code == 200:
-                        home_soup = BeautifulSoup(home_response.content, 'html.parser', from_encoding='utf-8')
-                        
-                        # Procurar por links que levem à área de consulta
-                        consulta_keywords = ['consultar', 'consulta', 'instrumentos coletivos', 'registrados']
-                        consulta_links = []
-                        
-                        for link in home_soup.find_all('a', href=True):
-                            href = link.get('href', '').lower()
-                            text = link.get_text(strip=True).lower()
-                            
-                            if any(kw in href or kw in text for kw in consulta_keywords):
-                                full_url = href if href.startswith('http') else f"{self.base_url}{href}"
-                                consulta_links.append(full_url)
-                        
-                        # Tentar acessar os links de consulta encontrados
-                        for consulta_url in consulta_links[:3]:  # Tentar até 3 links
-                            try:
-                                logger.info(f"Tentando link de consulta encontrado: {consulta_url}")
-                                consulta_response = self.session.get(consulta_url, params=params, timeout=30)
-                                if consulta_response.encoding is None or consulta_response.encoding.lower() not in ['utf-8', 'utf8']:
-                                    consulta_response.encoding = 'utf-8'
-                                if consulta_response.status_code == 200:
-                                    consulta_soup = BeautifulSoup(consulta_response.content, 'html.parser', from_encoding='utf-8')
-                                    # Verificar se tem resultados
-                                    if len(consulta_soup.find_all('table')) > 0 or len([l for l in consulta_soup.find_all('a', href=True) if re.search(r'/\d{6,}', l.get('href', ''))]) > 0:
-                                        soup = consulta_soup
-                                        logger.info(f"✓ Encontrada página de consulta: {consulta_url}")
-                                        break
-                            except:
-                                continue
-                        
-                        if not soup:
-                            logger.info("Página inicial acessível, mas não foi possível encontrar área de consulta pública.")
-                except:
-                    logger.warning("Não foi possível acessar nem a página inicial.")
-                
-                if not soup:
-                    return []
-            
-            # Extrair convenções da página
-            convencoes = self._parse_search_results(soup, limit)
-            
+            # Páginas seguintes só são buscadas se a primeira não bastar
+            convencoes = list(islice(self.iter_convencoes(municipio, uf, cnae, cnpj), limit))
             logger.info(f"Encontradas {len(convencoes)} convenções")
-            
         except requests.RequestException as e:
             logger.error(f"Erro ao buscar convenções: {e}")
         except Exception as e:
@@ -198,65 +256,276 @@ class MediadorAPIClient:
         
         return convencoes
     
-    def _parse_search_results(self, soup: BeautifulSoup, limit: int) -> List[Dict]:
-        """Extrai convenções dos resultados da busca"""
-        convencoes = []
+    def iter_convencoes(
+        self,
+        municipio: Optional[str] = None,
+        uf: Optional[str] = None,
+        cnae: Optional[str] = None,
+        cnpj: Optional[str] = None,
+        max_pages: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """
+        Itera sobre as convenções encontradas, seguindo a paginação do site
         
-        # Palavras-chave que indicam que NÃO é uma convenção (são links do menu)
-        # Lista expandida com padrões específicos do site Mediador MTE
-        menu_keywords = [
-            'solicitação de registro', 'solicitar mediação', 'solicitação de mediação',
-            'continuar solicitação', 'retificar solicitação', 'acompanhar solicitação',
-            'acompanhar mediação', 'imprimir requerimento', 'manual do usuário',
-            'cláusulas - grupos', 'cláusulas â grupos', 'cláusulas grupos',
-            'protocolo sei mte', 'menu principal', 'navegação',
-            'instrumentos coletivos registrados',  # Esta é uma página de listagem, não uma convenção
-            'boas práticas trabalhistas', 'boas práticas',  # Página informativa
+        A próxima página só é buscada quando o consumidor pede mais resultados,
+        então parar a iteração (ex.: islice) evita requisições desnecessárias.
+        """
+        for pagina in self.iter_result_pages(municipio, uf, cnae, cnpj, max_pages=max_pages):
+            yield from pagina
+    
+    def iter_result_pages(
+        self,
+        municipio: Optional[str] = None,
+        uf: Optional[str] = None,
+        cnae: Optional[str] = None,
+        cnpj: Optional[str] = None,
+        max_pages: Optional[int] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Itera página a página sobre os resultados da busca
+        
+        Cada item é a lista de convenções de uma página, sem IDs já vistos em
+        páginas anteriores. A iteração termina quando não há link para a
+        próxima página ou ao atingir max_pages.
+        """
+        max_pages = max_pages or settings.MEDIADOR_MAX_RESULT_PAGES
+        
+        # Mesmos parâmetros que compõem a chave do cache de buscas
+        params = search_params(municipio, uf, cnae, cnpj)
+        
+        # Consultar o espelho preferido; se demorar, um segundo espelho entra na disputa
+        result = self.mirrors.fetch(lambda base_url: self._search_on_mirror(base_url, params))
+        if not result:
+            return
+        soup, page_url = result
+        
+        seen_ids = set()
+        visited = {page_url}
+        for numero in range(1, max_pages + 1):
+            pagina = []
+            ids_pagina = set()
+            # Sem limite por página, a estratégia 3 rodaria sempre e completaria
+            # cada página com links de rodapé antes das páginas seguintes
+            for convencao in self._parse_search_results(soup, MAX_RESULTS_PER_PAGE, loose_links=False):
+                instrumento_id = convencao.get('instrumento_id')
+                if instrumento_id in seen_ids:
+                    continue
+                ids_pagina.add(instrumento_id)
+                pagina.append(convencao)
+            seen_ids.update(ids_pagina)
+            
+            logger.info(f"Página {numero}: {len(pagina)} convenções")
+            yield pagina
+            
+            next_url = self._find_next_page(soup, page_url)
+            if not next_url or next_url in visited:
+                return
+            visited.add(next_url)
+            
+            soup = self._fetch_results_page(next_url)
+            if soup is None:
+                return
+            page_url = next_url
+    
+    def _find_next_page(self, soup: BeautifulSoup, page_url: str) -> Optional[str]:
+        """URL da próxima página de resultados, se houver link de paginação"""
+        for link in soup.find_all('a', href=True):
+            href = link['href'].strip()
+            if not href or href.startswith(('#', 'javascript:')):
+                continue
+            if is_next_page_link(link):
+                return urljoin(page_url, href)
+        return None
+    
+    def _fetch_results_page(self, url: str) -> Optional[BeautifulSoup]:
+        """Busca uma página seguinte dos resultados"""
+        try:
+            response = self.session.get(url, timeout=30)
+            if response.status_code == 200:
+                return parse_response(response, only=SEARCH_RESULTS_STRAINER)
+            logger.info(f"Paginação interrompida: {url} retornou {response.status_code}")
+        except requests.RequestException as e:
+            logger.warning(f"Erro ao buscar página de resultados {url}: {e}")
+        return None
+    
+    def _search_on_mirror(self, base_url: str, params: Dict) -> Optional[Tuple[BeautifulSoup, str]]:
+        """
+        Localiza a área de consulta em um espelho e retorna a página de resultados
+        
+        Returns:
+            Tupla (soup, URL da página) da primeira página de resultados, ou None
+            se o espelho não tem uma
+        """
+        # Tentar diferentes URLs de busca
+        search_urls = [
+            f"{base_url}/ConvencaoColetiva/Consulta",
+            f"{base_url}/Consulta/ConvencaoColetiva",
+            f"{base_url}/Consulta",
+            f"{base_url}/InstrumentosColetivos/Consulta",
+            f"{base_url}/busca",
+            f"{base_url}/pesquisa",
+            f"{base_url}/",
         ]
         
-        def is_menu_item(text: str) -> bool:
-            """Verifica se um texto é um item de menu"""
-            if not text:
-                return False
-            text_lower = text.lower().strip()
-            
-            # Verificar padrões exatos de menu - ser mais específico
-            exact_menu_matches = [
-                'solicitação de registro de instrumento coletivo',
-                'solicitação de mediação',
-                'continuar solicitação',
-                'retificar solicitação',
-                'acompanhar solicitação',
-                'acompanhar mediação',
-                'imprimir requerimento',
-                'manual do usuário',
-                'instrumentos coletivos registrados',  # Esta é uma página de listagem
-                'boas práticas trabalhistas',  # Página informativa
-            ]
-            
-            # Verificar se é exatamente um item de menu conhecido
-            if text_lower in exact_menu_matches:
-                return True
-            
-            # Verificar padrões específicos no início do texto
-            menu_patterns = [
-                r'^continuar solicita[çc][ãa]o$',
-                r'^retificar solicita[çc][ãa]o$',
-                r'^acompanhar solicita[çc][ãa]o$',
-                r'^solicitar media[çc][ãa]o$',
-                r'^imprimir requerimento$',
-                r'^manual do usuário$',
-            ]
-            
-            for pattern in menu_patterns:
-                if re.match(pattern, text_lower, re.I):
-                    return True
-            
-            # Se o texto é muito curto (< 30 caracteres) e contém palavras de ação específicas, provavelmente é menu
-            if len(text_lower) < 30 and any(kw in text_lower for kw in ['continuar', 'retificar', 'acompanhar', 'imprimir']):
-                return True
+        soup = None
+        page_url = None
+        
+        # Usar o endpoint descoberto anteriormente para este base_url, se houver
+        cached = _endpoint_cache.get(base_url)
+        tried_urls = set()
+        if cached:
+            cached_url = cached.get('redirect_url') or cached.get('url')
+            tried_urls.add(cached_url)
+            logger.info(f"Usando endpoint em cache: {cached_url}")
+            result = self._probe_search_url(cached_url, params, base_url)
+            if result:
+                soup, _, page_url = result
+            else:
+                logger.info("Endpoint em cache não respondeu. Redescobrindo...")
+                _endpoint_cache.delete(base_url)
+        
+        # Tentar cada URL até encontrar uma que funcione
+        if not soup:
+            for search_url in search_urls:
+                if search_url in tried_urls:
+                    continue
+                result = self._probe_search_url(search_url, params, base_url)
+                if result:
+                    soup, redirect_url, page_url = result
+                    self._remember_endpoint(base_url, search_url, redirect_url)
+                    break
+        
+        if not soup:
+            logger.warning("Nenhuma URL de busca funcionou. Tentando navegar pela página inicial...")
+            # Tentar acessar a página inicial e procurar por links de consulta
+            try:
+                home_response = self.session.get(base_url, timeout=10)
+                if home_response.status_code == 200:
+                    home_soup = parse_response(home_response, only=LINKS_STRAINER)
+                    
+                    # Procurar por links que levem à área de consulta
+                    consulta_keywords = ['consultar', 'consulta', 'instrumentos coletivos', 'registrados']
+                    consulta_links = []
+                    
+                    for link in home_soup.find_all('a', href=True):
+                        href = link.get('href', '').lower()
+                        text = link.get_text(strip=True).lower()
+                        
+                        if any(kw in href or kw in text for kw in consulta_keywords):
+                            full_url = href if href.startswith('http') else f"{base_url}{href}"
+                            consulta_links.append(full_url)
+                    
+                    # Tentar acessar os links de consulta encontrados
+                    for consulta_url in consulta_links[:3]:  # Tentar até 3 links
+                        try:
+                            logger.info(f"Tentando link de consulta encontrado: {consulta_url}")
+                            consulta_response = self.session.get(consulta_url, params=params, timeout=30)
+                            if consulta_response.status_code == 200:
+                                consulta_soup = parse_response(consulta_response, only=SEARCH_RESULTS_STRAINER)
+                                # Verificar se tem resultados
+                                if consulta_soup.find('table') is not None or consulta_soup.find('a', href=re.compile(r'/\d{6,}')) is not None:
+                                    soup = consulta_soup
+                                    page_url = consulta_response.url
+                                    self._remember_endpoint(base_url, consulta_url, None)
+                                    logger.info(f"✓ Encontrada página de consulta: {consulta_url}")
+                                    break
+                        except:
+                            continue
+                    
+                    if not soup:
+                        logger.info("Página inicial acessível, mas não foi possível encontrar área de consulta pública.")
+            except:
+                logger.warning("Não foi possível acessar nem a página inicial.")
+        
+        if not soup:
+            return None
+        return soup, page_url
+    
+    def _probe_search_url(self, search_url: str, params: Dict, base_url: str) -> Optional[Tuple[BeautifulSoup, Optional[str], str]]:
+        """
+        Tenta uma URL de busca
+        
+        Returns:
+            Tupla (soup, redirect_url, URL final da página) se a página é uma
+            área de consulta válida, ou None
+        """
+        try:
+            logger.info(f"Tentando buscar em: {search_url} com parâmetros: {params}")
+            response = self.session.get(search_url, params=params, timeout=30, allow_redirects=True)
             
-            return False
+            # Verificar se a resposta é válida
+            if response.status_code == 200:
+                # Decodificar uma única vez, com o charset detectado nos bytes
+                text = decode_html(response.content, response.headers.get('Content-Type'))
+                
+                # Verificar se a página contém conteúdo relevante
+                content_lower = text.lower()
+                
+                # Fazer o parse uma única vez, apenas dos elementos usados na extração
+                soup = parse_html(text, only=SEARCH_RESULTS_STRAINER)
+                
+                # Verificar se tem resultados de busca (tabelas com dados, listas de resultados, etc.)
+                has_results = (
+                    soup.find('table') is not None or
+                    soup.find(['div', 'ul'], class_=re.compile(r'result|lista|tabela', re.I)) is not None or
+                    soup.find('a', href=re.compile(r'/\d{6,}')) is not None
+                )
+                
+                # Verificar se tem conteúdo relevante (mesmo que seja página inicial, pode ter links úteis)
+                has_relevant_content = any(keyword in content_lower for keyword in ['convenção', 'instrumento', 'coletivo', 'trabalho'])
+                
+                # Aceitar se tem resultados OU se tem conteúdo relevante (vamos filtrar depois)
+                if has_results or has_relevant_content:
+                    logger.info(f"✓ URL funcionando: {search_url}")
+                    # Guardar o destino final se o servidor redirecionou
+                    final_url = response.url.split('?')[0]
+                    return soup, (final_url if final_url != search_url else None), response.url
+                else:
+                    logger.debug(f"Página não contém conteúdo relevante: {search_url}")
+            elif response.status_code in [301, 302, 303, 307, 308]:
+                # Seguir redirect
+                redirect_url = response.headers.get('Location', '')
+                if redirect_url:
+                    if not redirect_url.startswith('http'):
+                        redirect_url = f"{base_url}{redirect_url}"
+                    logger.info(f"Redirect detectado para: {redirect_url}")
+                    response = self.session.get(redirect_url, timeout=30)
+                    if response.status_code == 200:
+                        soup = parse_response(response, only=SEARCH_RESULTS_STRAINER)
+                        logger.info(f"✓ URL após redirect funcionando: {redirect_url}")
+                        return soup, redirect_url.split('?')[0], response.url
+        except requests.RequestException as e:
+            logger.debug(f"Erro ao acessar {search_url}: {e}")
+        
+        return None
+    
+    def _remember_endpoint(self, base_url: str, search_url: str, redirect_url: Optional[str]):
+        """Guarda o endpoint de busca que funcionou para este base_url"""
+        _endpoint_cache.set(
+            base_url,
+            {'url': search_url, 'redirect_url': redirect_url},
+            ttl=settings.MEDIADOR_ENDPOINT_CACHE_TTL_SECONDS,
+        )
+    
+    def _parse_search_results(self, soup: BeautifulSoup, limit: int, loose_links: bool = True) -> List[Dict]:
+        """
+        Extrai convenções dos resultados da busca
+        
+        Com loose_links=False, a busca por links soltos (estratégia 3) só roda
+        se tabelas e divs não encontraram nada, para não completar a página com
+        links de rodapé e navegação.
+        """
+        convencoes = []
+        # IDs já aceitos, para descartar duplicados em O(1)
+        seen_ids = set()
+        
+        def add(convencao: Dict) -> bool:
+            """Adiciona se não for duplicado; retorna True quando atingiu o limite"""
+            instrumento_id = convencao.get('instrumento_id')
+            if instrumento_id not in seen_ids:
+                seen_ids.add(instrumento_id)
+                convencoes.append(convencao)
+            return len(convencoes) >= limit
         
         try:
             # Estratégia 1: Buscar em tabelas de resultados
@@ -267,44 +536,34 @@ class MediadorAPIClient:
                     cells = row.find_all(['td', 'th'])
                     if len(cells) >= 3:
                         convencao = self._parse_table_row(cells)
-                        if convencao:
-                            # Filtrar apenas se for claramente um item de menu
-                            titulo_conv = convencao.get('titulo', '')
-                            if not is_menu_item(titulo_conv):
-                                convencoes.append(convencao)
-                                if len(convencoes) >= limit:
-                                    break
+                        # Filtrar apenas se for claramente um item de menu
+                        if convencao and not is_menu_item(convencao.get('titulo', '')):
+                            # Linhas da tabela não são deduplicadas entre si
+                            seen_ids.add(convencao.get('instrumento_id'))
+                            convencoes.append(convencao)
+                            if len(convencoes) >= limit:
+                                break
                 if len(convencoes) >= limit:
                     break
             
             # Estratégia 2: Buscar em divs com classes específicas de resultados
             if len(convencoes) < limit:
-                result_divs = soup.find_all(['div', 'li'], class_=re.compile(r'result|item|convencao|instrumento|registro', re.I))
+                result_divs = soup.find_all(['div', 'li'], class_=RESULT_ITEM_CLASS_RE)
                 for div in result_divs[:limit * 2]:
                     convencao = self._parse_div_result(div)
-                    if convencao:
-                        # Filtrar apenas se for claramente um item de menu
-                        titulo_conv = convencao.get('titulo', '')
-                        if not is_menu_item(titulo_conv):
-                            # Verificar se não é duplicado
-                            if not any(c.get('instrumento_id') == convencao.get('instrumento_id') for c in convencoes):
-                                convencoes.append(convencao)
-                                if len(convencoes) >= limit:
-                                    break
+                    # Filtrar apenas se for claramente um item de menu
+                    if convencao and not is_menu_item(convencao.get('titulo', '')):
+                        if add(convencao):
+                            break
             
             # Estratégia 3: Buscar links específicos de convenções (filtrar menu)
-            if len(convencoes) < limit:
-                # Buscar links que contenham padrões de IDs numéricos ou códigos
-                all_links = soup.find_all('a', href=True)
-                
+            if len(convencoes) < limit and (loose_links or not convencoes):
                 # Primeiro, tentar encontrar área de resultados (pode estar em uma div específica)
                 # Excluir áreas de menu/navegação
-                result_containers = soup.find_all(['div', 'section', 'main'], 
-                    class_=re.compile(r'result|lista|tabela|conteudo|content|main', re.I))
-                
-                # Excluir containers de menu/navegação
-                result_containers = [c for c in result_containers 
-                    if not any(kw in c.get('class', []) for kw in ['menu', 'nav', 'navigation', 'sidebar'])]
+                result_containers = [
+                    c for c in soup.find_all(['div', 'section', 'main'], class_=RESULT_CONTAINER_CLASS_RE)
+                    if NAV_CLASSES.isdisjoint(c.get('class', []))
+                ]
                 
                 links_to_check = []
                 if result_containers:
@@ -313,52 +572,24 @@ class MediadorAPIClient:
                         links_to_check.extend(container.find_all('a', href=True))
                 else:
                     # Caso contrário, verificar todos os links, mas excluir áreas de menu
-                    nav_areas = soup.find_all(['nav', 'div'], class_=re.compile(r'menu|nav|navigation', re.I))
-                    nav_links = set()
-                    for nav in nav_areas:
-                        nav_links.update([l for l in nav.find_all('a', href=True)])
+                    nav_link_ids = set()
+                    for nav in soup.find_all(['nav', 'div'], class_=NAV_CLASS_RE):
+                        nav_link_ids.update(id(l) for l in nav.find_all('a', href=True))
                     
-                    links_to_check = [l for l in all_links if l not in nav_links]
+                    links_to_check = [l for l in soup.find_all('a', href=True) if id(l) not in nav_link_ids]
                 
                 for link in links_to_check:
-                    href = link.get('href', '')
-                    text = link.get_text(strip=True)
-                    
-                    # Pular links de menu ANTES de processar
-                    if is_menu_item(text) or is_menu_item(href):
+                    # Pular links de menu e de paginação ANTES de processar
+                    if is_menu_item(link.get_text(strip=True)) or is_menu_item(link.get('href', '')):
+                        continue
+                    if is_next_page_link(link):
                         continue
-                    
-                    # Procurar por padrões que indicam convenção real
-                    # Aceitar links com IDs numéricos (4+ dígitos) OU padrões específicos de convenção
-                    # Ser menos restritivo para encontrar mais resultados
-                    has_valid_id = re.search(r'/\d{4,}', href) or re.search(r'[=/:](\d{4,})', href) or re.search(r'\d{4,}', href)
-                    has_instrumento_pattern = (
-                        re.search(r'instrumento', href, re.I) or 
-                        re.search(r'convencao', href, re.I) or
-                        re.search(r'/ConvencaoColetiva/', href, re.I) or
-                        re.search(r'registro', href, re.I)
-                    )
-                    
-                    # Se não tem ID válido nem padrão de instrumento, ainda tentar processar se o texto não for menu
-                    # (ser menos restritivo)
-                    if not has_valid_id and not has_instrumento_pattern:
-                        # Ainda assim, tentar processar se o texto não for claramente um item de menu
-                        if not is_menu_item(text):
-                            # Processar mesmo sem padrão específico
-                            pass
-                        else:
-                            continue
                     
                     convencao = self._parse_link_result(link)
-                    if convencao:
-                        # Filtrar novamente após parse (pode ter detectado menu no título)
-                        titulo_conv = convencao.get('titulo', '')
-                        if not is_menu_item(titulo_conv):
-                            # Verificar se não é duplicado
-                            if not any(c.get('instrumento_id') == convencao.get('instrumento_id') for c in convencoes):
-                                convencoes.append(convencao)
-                                if len(convencoes) >= limit:
-                                    break
+                    # Filtrar novamente após parse (pode ter detectado menu no título)
+                    if convencao and not is_menu_item(convencao.get('titulo', '')):
+                        if add(convencao):
+                            break
             
         except Exception as e:
             logger.error(f"Erro ao fazer parse dos resultados: {e}")
@@ -371,14 +602,6 @@ class MediadorAPIClient:
             # Tentar extrair informações comuns
             texto_completo = ' '.join([cell.get_text(strip=True) for cell in cells])
             
-            # Corrigir encoding - garantir UTF-8
-            try:
-                if 'Ã§' in texto_completo or 'Ã£' in texto_completo or 'Ã' in texto_completo:
-                    texto_bytes = texto_completo.encode('latin-1', errors='ignore')
-                    texto_completo = texto_bytes.decode('utf-8', errors='ignore')
-            except:
-                pass
-            
             # Procurar por padrões comuns
             instrumento_id = None
             titulo = None
@@ -390,36 +613,31 @@ class MediadorAPIClient:
             for cell in cells:
                 links = cell.find_all('a', href=True)
                 for link in links:
-                    href = link.get('href', '')
                     # Extrair ID da URL - aceitar qualquer número (ser menos restritivo)
-                    match = re.search(r'/(\d{4,})', href) or re.search(r'[=/:](\d{4,})', href) or re.search(r'(\d{4,})', href)
-                    if match:
-                        instrumento_id = match.group(1)
+                    link_id = extract_instrumento_id(link.get('href', ''))
+                    if link_id:
+                        instrumento_id = link_id
                         link_texto = link.get_text(strip=True) or texto_completo[:100]
-                        # Corrigir encoding do texto do link também
-                        try:
-                            if 'Ã§' in link_texto or 'Ã£' in link_texto or 'Ã' in link_texto:
-                                link_bytes = link_texto.encode('latin-1', errors='ignore')
-                                link_texto = link_bytes.decode('utf-8', errors='ignore')
-                        except:
-                            pass
                         titulo = link_texto
                         break
             
-            # Procurar datas
-            date_pattern = r'(\d{2}[/-]\d{2}[/-]\d{4})'
-            dates = re.findall(date_pattern, texto_completo)
-            if dates:
+            # Procurar datas (dd/mm/aaaa)
+            date_match = DATE_RE.search(texto_completo)
+            if date_match:
+                dia, mes, ano = (int(g) for g in date_match.groups())
                 try:
-                    data_publicacao = parser.parse(dates[0], dayfirst=True).date().isoformat()
-                except:
-                    pass
+                    data_publicacao = date(ano, mes, dia).isoformat()
+                except ValueError:
+                    # Mesmo fallback do dateutil: tentar mês/dia
+                    try:
+                        data_publicacao = date(ano, dia, mes).isoformat()
+                    except ValueError:
+                        pass
             
             # Procurar município/UF
-            uf_pattern = r'\b([A-Z]{2})\b'
-            ufs = re.findall(uf_pattern, texto_completo)
-            if ufs:
-                uf = ufs[0]
+            uf_match = UF_RE.search(texto_completo)
+            if uf_match:
+                uf = uf_match.group(1)
             
             if instrumento_id or titulo:
                 return {
@@ -443,26 +661,11 @@ class MediadorAPIClient:
             if len(texto) < 10:  # Muito curto, provavelmente não é um resultado válido
                 return None
             
-            # Corrigir encoding - garantir UTF-8
-            try:
-                if 'Ã§' in texto or 'Ã£' in texto or 'Ã' in texto:
-                    texto_bytes = texto.encode('latin-1', errors='ignore')
-                    texto = texto_bytes.decode('utf-8', errors='ignore')
-            except:
-                pass
-            
             # Filtrar divs de menu - ser mais específico
             texto_lower = texto.lower().strip()
-            menu_patterns = [
-                r'^continuar solicitação$',
-                r'^retificar solicitação$',
-                r'^acompanhar solicitação$',
-                r'^solicitar mediação$',
-            ]
             
             # Verificar se é exatamente um item de menu
-            is_menu = any(re.match(pattern, texto_lower, re.I) for pattern in menu_patterns)
-            if is_menu:
+            if DIV_MENU_RE.match(texto_lower):
                 return None
             
             # Procurar link dentro do div
@@ -471,23 +674,15 @@ class MediadorAPIClient:
             titulo = texto[:200]
             
             if link:
-                href = link.get('href', '')
                 # Procurar por IDs numéricos (4+ dígitos para ser menos restritivo)
-                match = re.search(r'/(\d{4,})', href)
+                match = ID_AFTER_SLASH_RE.search(link.get('href', ''))
                 if match:
                     instrumento_id = match.group(1)
                     link_texto = link.get_text(strip=True) or titulo
-                    # Corrigir encoding do texto do link também
-                    try:
-                        if 'Ã§' in link_texto or 'Ã£' in link_texto or 'Ã' in link_texto:
-                            link_bytes = link_texto.encode('latin-1', errors='ignore')
-                            link_texto = link_bytes.decode('utf-8', errors='ignore')
-                    except:
-                        pass
                     titulo = link_texto
             
             # Retornar resultado se encontrou ID OU se o texto parece ser uma convenção válida
-            if instrumento_id or (len(texto) > 20 and not any(kw in texto_lower for kw in ['continuar', 'retificar', 'acompanhar'])):
+            if instrumento_id or (len(texto) > 20 and not DIV_ACTION_RE.search(texto_lower)):
                 return {
                     'instrumento_id': instrumento_id or f"TEMP-{hash(texto) % 1000000}",
                     'titulo': titulo,
@@ -508,19 +703,8 @@ class MediadorAPIClient:
             if not texto or len(texto) < 5:
                 return None
             
-            # Corrigir encoding - garantir UTF-8
-            try:
-                # Se o texto parece estar mal codificado, tentar corrigir
-                if 'Ã§' in texto or 'Ã£' in texto or 'Ã' in texto:
-                    # Tentar decodificar como latin-1 e re-encodar como UTF-8
-                    texto_bytes = texto.encode('latin-1', errors='ignore')
-                    texto = texto_bytes.decode('utf-8', errors='ignore')
-            except:
-                pass
-            
             # Extrair ID da URL - aceitar qualquer número (ser menos restritivo)
-            match = re.search(r'/(\d{4,})', href) or re.search(r'[=/:](\d{4,})', href) or re.search(r'(\d{4,})', href)
-            instrumento_id = match.group(1) if match else f"TEMP-{hash(href) % 1000000}"
+            instrumento_id = extract_instrumento_id(href) or f"TEMP-{hash(href) % 1000000}"
             
             return {
                 'instrumento_id': instrumento_id,
@@ -532,28 +716,37 @@ class MediadorAPIClient:
     
     def get_convencao_details(self, instrumento_id: str) -> Optional[Dict]:
         """Busca detalhes de uma convenção específica"""
+        return _details_flight.do(instrumento_id, lambda: self._get_convencao_details(instrumento_id))
+    
+    def _get_convencao_details(self, instrumento_id: str) -> Optional[Dict]:
+        """Executa a busca de detalhes (sem coalescência)"""
         try:
-            # Tentar diferentes padrões de URL
-            urls = [
-                f"{self.base_url}/ConvencaoColetiva/Detalhes/{instrumento_id}",
-                f"{self.base_url}/instrumento/{instrumento_id}",
-                f"{self.base_url}/ConvencaoColetiva/Visualizar/{instrumento_id}",
-            ]
-            
-            for url in urls:
-                try:
-                    response = self.session.get(url, timeout=30)
-                    if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
-                        return self._parse_detail_page(soup, instrumento_id)
-                except:
-                    continue
-            
+            return self.mirrors.fetch(lambda base_url: self._details_on_mirror(base_url, instrumento_id))
         except Exception as e:
             logger.error(f"Erro ao buscar detalhes da convenção {instrumento_id}: {e}")
         
         return None
     
+    def _details_on_mirror(self, base_url: str, instrumento_id: str) -> Optional[Dict]:
+        """Busca a página de detalhes em um espelho"""
+        # Tentar diferentes padrões de URL
+        urls = [
+            f"{base_url}/ConvencaoColetiva/Detalhes/{instrumento_id}",
+            f"{base_url}/instrumento/{instrumento_id}",
+            f"{base_url}/ConvencaoColetiva/Visualizar/{instrumento_id}",
+        ]
+        
+        for url in urls:
+            try:
+                response = self.session.get(url, timeout=30)
+                if response.status_code == 200:
+                    soup = parse_response(response)
+                    return self._parse_detail_page(soup, instrumento_id)
+            except:
+                continue
+        
+        return None
+    
     def _parse_detail_page(self, soup: BeautifulSoup, instrumento_id: str) -> Dict:
         """Extrai detalhes de uma página de convenção"""
         detalhes = {
@@ -0,0 +1,194 @@
+"""
+Non-blocking facade over MediadorAPIClient for async endpoints
+
+The live search endpoints are `async def`, so calling the blocking requests
+client directly stalls the whole event loop while the government site
+answers. AsyncMediadorClient runs those calls on a dedicated thread pool,
+bounded by a semaphore, and reuses one process-wide MediadorAPIClient so its
+connection pool, mirror statistics, circuit breakers and HTTP cache are
+shared by every request.
+
+Streamed searches are coalesced too: identical searches running at the same
+time share one fetch whose pages are fanned out to every subscriber, and the
+assembled result is stored in the search cache.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.services.mediador_api import MediadorAPIClient
+from app.services.search_cache import get_search_cache, normalize_search_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _PageFeed:
+    """Pages of one in-flight streamed search, replayed to every subscriber (event loop only)"""
+
+    def __init__(self):
+        self.pages: List[List[Dict]] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.producer: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def publish(self, page: List[Dict]):
+        self.pages.append(page)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    async def subscribe(self) -> AsyncIterator[List[Dict]]:
+        position = 0
+        while True:
+            while position < len(self.pages):
+                yield self.pages[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class _LoopState:
+    """asyncio primitives of one event loop; they must not be used from another loop"""
+
+    def __init__(self, max_concurrency: int):
+        # Callers beyond the limit wait on the event loop, not in the executor queue
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Streamed searches in flight, by search cache key
+        self.feeds: Dict[str, _PageFeed] = {}
+
+
+class AsyncMediadorClient:
+    """Runs Mediador fetches off the event loop with bounded concurrency"""
+
+    def __init__(self, client: Optional[MediadorAPIClient] = None, max_concurrency: Optional[int] = None):
+        self.client = client or MediadorAPIClient()
+        self.max_concurrency = max(1, max_concurrency or settings.MEDIADOR_LIVE_CONCURRENCY)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="mediador-live")
+        # The client is process-wide but may serve several event loops (tests,
+        # asyncio.run in scripts), so loop-bound state is created per loop
+        self._loop_states: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopState]" = weakref.WeakKeyDictionary()
+        self._loop_states_lock = threading.Lock()
+
+    def _state(self) -> _LoopState:
+        loop = asyncio.get_running_loop()
+        with self._loop_states_lock:
+            state = self._loop_states.get(loop)
+            if state is None:
+                state = self._loop_states[loop] = _LoopState(self.max_concurrency)
+            return state
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking call on the live-search pool"""
+        async with self._state().semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def search_convencoes(self, **kwargs) -> List[Dict]:
+        return await self.run(self.client.search_convencoes, **kwargs)
+
+    async def iter_result_pages(self, **kwargs) -> AsyncIterator[List[Dict]]:
+        """
+        Async version of MediadorAPIClient.iter_result_pages
+
+        Each page is fetched on the pool only when the consumer asks for it.
+        """
+        pages = self.client.iter_result_pages(**kwargs)
+        semaphore = self._state().semaphore
+        in_flight = None
+        try:
+            while True:
+                async with semaphore:
+                    in_flight = self._executor.submit(next, pages, None)
+                    page = await asyncio.wrap_future(in_flight)
+                if page is None:
+                    return
+                yield page
+        finally:
+            # A cancelled consumer can leave next() running on the pool; the
+            # generator may only be closed once it returns, from a pool thread
+            if in_flight is not None and not in_flight.done():
+                in_flight.add_done_callback(lambda _: pages.close())
+            else:
+                self._executor.submit(pages.close)
+
+    async def stream_search(self, limit: int, **kwargs) -> AsyncIterator[List[Dict]]:
+        """
+        Pages of a live search as they are extracted, coalesced with identical searches
+
+        The fetch runs in its own task, so it completes and fills the search
+        cache even if the subscriber that started it disconnects.
+        """
+        key = normalize_search_key(limit=limit, **kwargs)
+        feeds = self._state().feeds
+        feed = feeds.get(key)
+        if feed is None:
+            feed = feeds[key] = _PageFeed()
+            feed.producer = asyncio.get_running_loop().create_task(self._produce(key, feed, limit, kwargs))
+        else:
+            logger.debug(f"Joining streamed search {key[:12]} in flight")
+        async for page in feed.subscribe():
+            yield page
+
+    async def _produce(self, key: str, feed: _PageFeed, limit: int, params: Dict):
+        loop = asyncio.get_running_loop()
+        feeds = self._state().feeds
+
+        def publish(page: List[Dict]):
+            # Called from the pool thread; runs before the fetch's own completion callback
+            loop.call_soon_threadsafe(feed.publish, page)
+
+        def fetch():
+            results = self.client.search_result_pages(limit=limit, on_page=publish, **params)
+            if results:
+                get_search_cache().store(key, results)
+
+        error = None
+        try:
+            await self.run(fetch)
+        except Exception as e:
+            error = e
+        finally:
+            if feeds.get(key) is feed:
+                del feeds[key]
+            feed.finish(error)
+
+    async def iter_convencoes(self, **kwargs) -> AsyncIterator[Dict]:
+        """Async version of MediadorAPIClient.iter_convencoes"""
+        async for page in self.iter_result_pages(**kwargs):
+            for convencao in page:
+                yield convencao
+
+    async def get_convencao_details(self, instrumento_id: str) -> Optional[Dict]:
+        return await self.run(self.client.get_convencao_details, instrumento_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+_async_client: Optional[AsyncMediadorClient] = None
+_async_client_lock = threading.Lock()
+
+
+def get_async_mediador_client() -> AsyncMediadorClient:
+    """Process-wide async client"""
+    global _async_client
+    if _async_client is None:
+        with _async_client_lock:
+            if _async_client is None:
+                _async_client = AsyncMediadorClient()
+    return _async_client
@@ -0,0 +1,257 @@
+"""
+Hedged requests across the Mediador mirror hosts
+
+The same Mediador content is served by several government hosts and any of
+them can be slow at a given moment. A request goes to the preferred mirror
+first; if no valid answer arrives within that mirror's recent latency
+percentile, a backup request is started on the next mirror and the first
+valid answer wins. Latencies are tracked per mirror so the fastest healthy
+one becomes the preferred one.
+
+Losing requests cannot be cancelled and keep a worker until they finish, so
+at most MEDIADOR_MAX_OUTSTANDING_HEDGES backup requests run at once; when
+they are all taken a slow mirror is waited on instead of hedged, rather than
+queueing hedges behind primary requests in the pool.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, TypeVar
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Latency samples kept per mirror
+LATENCY_WINDOW = 50
+# Samples needed before the percentile replaces the configured hedge delay
+MIN_SAMPLES = 5
+# Bounds for the hedge delay, in seconds
+MIN_HEDGE_DELAY = 0.05
+MAX_HEDGE_DELAY = 30.0
+# A mirror is demoted after this many consecutive failures...
+MAX_CONSECUTIVE_FAILURES = 3
+# ...until this many seconds have passed since its last failure
+FAILURE_COOLDOWN_SECONDS = 60
+
+
+class MirrorStats:
+    """Recent latencies and outcome counters of one mirror"""
+
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_failure_at: Optional[float] = None
+        self.wins = 0
+        self.hedges = 0
+        # Hedges not started because every hedge slot was taken
+        self.hedges_skipped = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def healthy(self) -> bool:
+        if self.consecutive_failures < MAX_CONSECUTIVE_FAILURES:
+            return True
+        return time.monotonic() - (self.last_failure_at or 0) > FAILURE_COOLDOWN_SECONDS
+
+    def as_dict(self) -> Dict:
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "healthy": self.healthy,
+            "samples": len(self.latencies),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "successes": self.successes,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures,
+            "wins": self.wins,
+            "hedges": self.hedges,
+            "hedges_skipped": self.hedges_skipped,
+        }
+
+
+# Process-wide, so every client instance learns from the others
+_stats: Dict[str, MirrorStats] = {}
+_stats_lock = threading.Lock()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+# Outstanding backup requests, including abandoned losers still running
+_hedge_slots: Optional[threading.BoundedSemaphore] = None
+
+
+def _get_executor(mirror_count: int) -> ThreadPoolExecutor:
+    """Pool for one request per mirror for each live search, plus the hedge slots"""
+    global _executor, _hedge_slots
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_hedges = max(0, settings.MEDIADOR_MAX_OUTSTANDING_HEDGES)
+                workers = max(1, settings.MEDIADOR_LIVE_CONCURRENCY) * max(1, mirror_count) + max_hedges
+                _hedge_slots = threading.BoundedSemaphore(max_hedges) if max_hedges else None
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mirror-hedge")
+    return _executor
+
+
+def _try_acquire_hedge_slot() -> bool:
+    return _hedge_slots is not None and _hedge_slots.acquire(blocking=False)
+
+
+def _release_hedge_slot(_future: Future):
+    _hedge_slots.release()
+
+
+def get_mirror_stats() -> Dict[str, Dict]:
+    """Latency and health of every mirror seen by this process"""
+    with _stats_lock:
+        return {base_url: stats.as_dict() for base_url, stats in _stats.items()}
+
+
+class MirrorSet:
+    """Ordered, latency-aware list of base URLs serving the same content"""
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        percentile: Optional[float] = None,
+        default_delay: Optional[float] = None,
+    ):
+        self.base_urls = list(dict.fromkeys(base_urls))
+        self.percentile = percentile if percentile is not None else settings.MEDIADOR_HEDGE_PERCENTILE
+        self.default_delay = default_delay if default_delay is not None else settings.MEDIADOR_HEDGE_DELAY_SECONDS
+        with _stats_lock:
+            for base_url in self.base_urls:
+                _stats.setdefault(base_url, MirrorStats())
+
+    def _stats_for(self, base_url: str) -> MirrorStats:
+        return _stats[base_url]
+
+    def ordered(self) -> List[str]:
+        """Healthy mirrors first, fastest median first; unmeasured ones keep the configured order"""
+        with _stats_lock:
+            def key(item):
+                index, base_url = item
+                stats = self._stats_for(base_url)
+                median = stats.percentile(50)
+                return (not stats.healthy, median is None, median or 0.0, index)
+            return [base_url for _, base_url in sorted(enumerate(self.base_urls), key=key)]
+
+    @property
+    def preferred(self) -> str:
+        return self.ordered()[0]
+
+    def hedge_delay(self, base_url: str) -> float:
+        """Seconds to wait on `base_url` before starting a backup request"""
+        with _stats_lock:
+            stats = self._stats_for(base_url)
+            delay = stats.percentile(self.percentile) if len(stats.latencies) >= MIN_SAMPLES else None
+        if delay is None:
+            delay = self.default_delay
+        return min(max(delay, MIN_HEDGE_DELAY), MAX_HEDGE_DELAY)
+
+    def _timed(self, fetch: Callable[[str], Optional[T]], base_url: str) -> Optional[T]:
+        """Run fetch on one mirror and record how it went"""
+        started = time.monotonic()
+        try:
+            result = fetch(base_url)
+        except Exception as e:
+            logger.debug(f"Mirror {base_url} failed: {e}")
+            result = None
+        elapsed = time.monotonic() - started
+
+        with _stats_lock:
+            stats = self._stats_for(base_url)
+            if result is not None:
+                stats.latencies.append(elapsed)
+                stats.successes += 1
+                stats.consecutive_failures = 0
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                stats.last_failure_at = time.monotonic()
+        return result
+
+    def _won(self, base_url: str):
+        with _stats_lock:
+            self._stats_for(base_url).wins += 1
+
+    def fetch(self, fetch: Callable[[str], Optional[T]]) -> Optional[T]:
+        """
+        Run `fetch(base_url)` against the mirrors and return the first valid answer
+
+        `fetch` returns None when a mirror has no usable answer. With hedging
+        disabled the mirrors are simply tried one after the other.
+        """
+        mirrors = self.ordered()
+
+        if not settings.MEDIADOR_HEDGED_REQUESTS or len(mirrors) == 1:
+            for base_url in mirrors:
+                result = self._timed(fetch, base_url)
+                if result is not None:
+                    self._won(base_url)
+                    return result
+            return None
+
+        executor = _get_executor(len(mirrors))
+        pending: Dict[Future, str] = {}
+        next_index = 0
+        # Set when the hedge slots were full: no more hedging for this request
+        hedging = True
+
+        def launch() -> Future:
+            nonlocal next_index
+            base_url = mirrors[next_index]
+            next_index += 1
+            future = executor.submit(self._timed, fetch, base_url)
+            pending[future] = base_url
+            return future
+
+        launch()
+        while pending:
+            # Wait for the most recently started mirror's percentile before hedging
+            timeout = None
+            if hedging and next_index < len(mirrors):
+                timeout = self.hedge_delay(mirrors[next_index - 1])
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                slow = mirrors[next_index - 1]
+                if not _try_acquire_hedge_slot():
+                    logger.info(f"No answer from {slow} after {timeout:.2f}s, but no hedge slot free; waiting")
+                    with _stats_lock:
+                        self._stats_for(slow).hedges_skipped += 1
+                    hedging = False
+                    continue
+                logger.info(f"No answer from {slow} after {timeout:.2f}s, hedging on {mirrors[next_index]}")
+                with _stats_lock:
+                    self._stats_for(slow).hedges += 1
+                # The slot is held until the backup request finishes, won or abandoned
+                launch().add_done_callback(_release_hedge_slot)
+                continue
+
+            for future in done:
+                base_url = pending.pop(future)
+                result = future.result()
+                if result is not None:
+                    # Slower requests still running finish in the background
+                    # and only contribute their latency
+                    self._won(base_url)
+                    return result
+
+            # A mirror answered without a valid result: go to the next one now
+            if next_index < len(mirrors):
+                launch()
+
+        return None
@@ -1,20 +1,97 @@
 """
 Scraper service for collecting convenções from Mediador MTE
 """
+import html
+import re
 import time
 import requests
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from app.core.config import settings
+from app.services.circuit_breaker import install_circuit_breaker
+from app.services.http_cache import install_http_cache
+from app.services.http_fixtures import install_http_fixtures
+from app.services.http_transport import mount_shared_transport
+from app.services.html_parser import parse_response
+from app.services.storage import get_storage, CHUNK_SIZE
+from app.services.driver_pool import create_chrome_driver, get_driver_pool
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Patterns for instrumento IDs in listing pages, compiled once. The bytes
+# versions scan the raw response without building a DOM; the str versions
+# serve the BeautifulSoup fallback.
+INSTRUMENTO_ID_RE = re.compile(r'instrumento[_-]?id["\']?\s*[:=]\s*["\']?(\d+)', re.IGNORECASE)
+INSTRUMENTO_PATH_RE = re.compile(r'/instrumento/(\d+)')
+INSTRUMENTO_ID_BYTES_RE = re.compile(rb'instrumento[_-]?id["\']?\s*[:=]\s*["\']?(\d+)', re.IGNORECASE)
+INSTRUMENTO_PATH_BYTES_RE = re.compile(rb'/instrumento/(\d+)')
+# href="/.../instrumento/<id>..." (the segment right after "instrumento")
+HREF_INSTRUMENTO_BYTES_RE = re.compile(rb'<a\s[^>]*?href\s*=\s*["\']?[^"\'\s>]*?/instrumento/([^/?#"\'\s>]+)', re.IGNORECASE)
+DATA_ID_BYTES_RE = re.compile(rb'\sdata-id\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))', re.IGNORECASE)
+SCRIPT_BLOCK_BYTES_RE = re.compile(rb'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+
+
+def scan_instrumento_ids(content: bytes) -> List[str]:
+    """
+    Instrumento IDs in a listing page, scanned straight from the response bytes
+
+    Finds the same IDs as dom_instrumento_ids (links to /instrumento/<id>,
+    data-id attributes and IDs embedded in scripts) without parsing the page.
+    """
+    found = {}
+
+    def add(raw: bytes):
+        value = html.unescape(raw.decode('utf-8', errors='replace')).strip()
+        if value:
+            found.setdefault(value, None)
+
+    for match in HREF_INSTRUMENTO_BYTES_RE.finditer(content):
+        add(match.group(1))
+    for match in DATA_ID_BYTES_RE.finditer(content):
+        add(match.group(1) or match.group(2) or match.group(3) or b'')
+    for script in SCRIPT_BLOCK_BYTES_RE.finditer(content):
+        body = script.group(1)
+        for pattern in (INSTRUMENTO_ID_BYTES_RE, INSTRUMENTO_PATH_BYTES_RE):
+            for match in pattern.finditer(body):
+                add(match.group(1))
+    return list(found)
+
+
+def dom_instrumento_ids(soup: BeautifulSoup) -> List[str]:
+    """Instrumento IDs in a parsed listing page (fallback for scan_instrumento_ids)"""
+    # Insertion-ordered set
+    found = {}
+
+    # Find all links containing 'instrumento'
+    for link in soup.find_all('a', href=True):
+        parts = link.get('href', '').split('/')
+        if 'instrumento' in parts:
+            idx = parts.index('instrumento')
+            if idx + 1 < len(parts):
+                instrumento_id = parts[idx + 1].split('?')[0].split('#')[0]
+                if instrumento_id:
+                    found.setdefault(instrumento_id, None)
+
+    # Also try to find IDs in data attributes
+    for elem in soup.find_all(attrs={'data-id': True}):
+        data_id = elem.get('data-id')
+        if data_id:
+            found.setdefault(str(data_id), None)
+
+    # Try to find IDs in JavaScript/JSON embedded in page
+    for script in soup.find_all('script'):
+        if script.string:
+            # Look for patterns like "instrumento_id": "123" or instrumento/123
+            for pattern in (INSTRUMENTO_ID_RE, INSTRUMENTO_PATH_RE):
+                for match in pattern.findall(script.string):
+                    found.setdefault(match, None)
+
+    return list(found)
+
 
 class MediadorScraper:
     """Scraper for Mediador MTE website"""
@@ -27,16 +104,15 @@ class MediadorScraper:
         self.session.headers.update({
             'User-Agent': self.user_agent
         })
+        # Process-wide connection pools, sized for the concurrent crawler workers
+        mount_shared_transport(self.session)
+        install_circuit_breaker(self.session)
+        install_http_cache(self.session)
+        install_http_fixtures(self.session)
     
     def get_driver(self):
-        """Get Selenium WebDriver"""
-        chrome_options = Options()
-        chrome_options.add_argument('--headless')
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument(f'user-agent={self.user_agent}')
-        driver = webdriver.Chrome(options=chrome_options)
-        return driver
+        """Get a new Selenium WebDriver (prefer get_driver_pool().lease() for reuse)"""
+        return create_chrome_driver(self.user_agent)
     
     def extract_instrumento_ids(self, search_params: Optional[Dict] = None) -> List[str]:
         """
@@ -64,7 +140,7 @@ class MediadorScraper:
                 
                 for api_url in api_urls:
                     try:
-                        response = self.session.get(api_url, timeout=10)
+                        response = self.session.get(api_url, params=search_params, timeout=10)
                         if response.status_code == 200:
                             data = response.json()
                             if isinstance(data, list):
@@ -86,74 +162,68 @@ class MediadorScraper:
             except Exception as e:
                 logger.debug(f"API strategy failed: {e}")
             
-            # Strategy 2: Use Selenium for dynamic content
+            # Strategy 2: Use Selenium for dynamic content (warm driver from the pool)
             try:
-                driver = self.get_driver()
-                
-                # Try different search URLs
-                search_urls = [
-                    f"{self.base_url}/busca",
-                    f"{self.base_url}/pesquisa",
-                    f"{self.base_url}/instrumentos",
-                    f"{self.base_url}/convencoes",
-                ]
-                
-                for search_url in search_urls:
-                    try:
-                        driver.get(search_url)
-                        time.sleep(self.delay * 2)  # Wait longer for dynamic content
-                        
-                        # Try multiple selectors
-                        selectors = [
-                            "a[href*='/instrumento/']",
-                            "a[href*='instrumento']",
-                            ".instrumento-link",
-                            ".convencao-link",
-                            "[data-instrumento-id]",
-                        ]
-                        
-                        for selector in selectors:
-                            try:
-                                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                                for element in elements:
-                                    href = element.get_attribute('href')
-                                    if href:
-                                        # Extract ID from URL
-                                        parts = href.split('/')
-                                        if 'instrumento' in parts:
-                                            idx = parts.index('instrumento')
-                                            if idx + 1 < len(parts):
-                                                instrumento_id = parts[idx + 1].split('?')[0].split('#')[0]
-                                                if instrumento_id and instrumento_id not in instrumento_ids:
-                                                    instrumento_ids.append(instrumento_id)
+                with get_driver_pool().lease() as pooled:
+                    driver = pooled.driver
+                    
+                    # Try different search URLs
+                    search_urls = [
+                        f"{self.base_url}/busca",
+                        f"{self.base_url}/pesquisa",
+                        f"{self.base_url}/instrumentos",
+                        f"{self.base_url}/convencoes",
+                    ]
+                    
+                    for search_url in search_urls:
+                        try:
+                            pooled.get(search_url)
+                            time.sleep(self.delay * 2)  # Wait longer for dynamic content
+                            
+                            # Try multiple selectors
+                            selectors = [
+                                "a[href*='/instrumento/']",
+                                "a[href*='instrumento']",
+                                ".instrumento-link",
+                                ".convencao-link",
+                                "[data-instrumento-id]",
+                            ]
+                            
+                            for selector in selectors:
+                                try:
+                                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
+                                    for element in elements:
+                                        href = element.get_attribute('href')
+                                        if href:
+                                            # Extract ID from URL
+                                            parts = href.split('/')
+                                            if 'instrumento' in parts:
+                                                idx = parts.index('instrumento')
+                                                if idx + 1 < len(parts):
+                                                    instrumento_id = parts[idx + 1].split('?')[0].split('#')[0]
+                                                    if instrumento_id and instrumento_id not in instrumento_ids:
+                                                        instrumento_ids.append(instrumento_id)
+                                        
+                                        # Also try data attributes
+                                        data_id = element.get_attribute('data-instrumento-id')
+                                        if data_id and data_id not in instrumento_ids:
+                                            instrumento_ids.append(data_id)
                                     
-                                    # Also try data attributes
-                                    data_id = element.get_attribute('data-instrumento-id')
-                                    if data_id and data_id not in instrumento_ids:
-                                        instrumento_ids.append(data_id)
-                                
-                                if instrumento_ids:
-                                    break
-                            except:
-                                continue
-                        
-                        if instrumento_ids:
-                            break
-                    except Exception as e:
-                        logger.debug(f"Failed to extract from {search_url}: {e}")
-                        continue
-                
-                driver.quit()
-                
+                                    if instrumento_ids:
+                                        break
+                                except:
+                                    continue
+                            
+                            if instrumento_ids:
+                                break
+                        except Exception as e:
+                            logger.debug(f"Failed to extract from {search_url}: {e}")
+                            continue
+            
             except Exception as e:
                 logger.warning(f"Selenium strategy failed: {e}")
-                if 'driver' in locals():
-                    try:
-                        driver.quit()
-                    except:
-                        pass
             
-            # Strategy 3: Try simple HTTP request with BeautifulSoup
+            # Strategy 3: Plain HTTP request, regex scan with a BeautifulSoup fallback
             if not instrumento_ids:
                 try:
                     search_urls = [
@@ -168,42 +238,14 @@ class MediadorScraper:
                         try:
                             response = self.session.get(search_url, timeout=30)
                             if response.status_code == 200:
-                                soup = BeautifulSoup(response.content, 'html.parser')
-                                
-                                # Find all links containing 'instrumento'
-                                links = soup.find_all('a', href=True)
-                                for link in links:
-                                    href = link.get('href', '')
-                                    if '/instrumento/' in href or 'instrumento' in href.lower():
-                                        parts = href.split('/')
-                                        if 'instrumento' in parts:
-                                            idx = parts.index('instrumento')
-                                            if idx + 1 < len(parts):
-                                                instrumento_id = parts[idx + 1].split('?')[0].split('#')[0]
-                                                if instrumento_id and instrumento_id not in instrumento_ids:
-                                                    instrumento_ids.append(instrumento_id)
-                                
-                                # Also try to find IDs in data attributes or text content
-                                elements_with_data = soup.find_all(attrs={'data-id': True})
-                                for elem in elements_with_data:
-                                    data_id = elem.get('data-id')
-                                    if data_id and data_id not in instrumento_ids:
-                                        instrumento_ids.append(str(data_id))
-                                
-                                # Try to find IDs in JavaScript/JSON embedded in page
-                                scripts = soup.find_all('script')
-                                for script in scripts:
-                                    if script.string:
-                                        import re
-                                        # Look for patterns like "instrumento_id": "123" or instrumento/123
-                                        matches = re.findall(r'instrumento[_-]?id["\']?\s*[:=]\s*["\']?(\d+)', script.string, re.IGNORECASE)
-                                        matches.extend(re.findall(r'/instrumento/(\d+)', script.string))
-                                        for match in matches:
-                                            if match and match not in instrumento_ids:
-                                                instrumento_ids.append(match)
+                                # Fast path: scan the raw bytes, no DOM
+                                page_ids = scan_instrumento_ids(response.content)
+                                if not page_ids:
+                                    page_ids = dom_instrumento_ids(parse_response(response))
+                                instrumento_ids.extend(page_ids)
                                 
                                 if instrumento_ids:
-                                    logger.info(f"Found IDs via BeautifulSoup from {search_url}")
+                                    logger.info(f"Found {len(instrumento_ids)} IDs via HTTP from {search_url}")
                                     break
                         except Exception as e:
                             logger.debug(f"Failed to extract from {search_url}: {e}")
@@ -220,12 +262,21 @@ class MediadorScraper:
         
         return instrumento_ids
     
-    def extract_metadados(self, instrumento_id: str) -> Optional[Dict]:
+    def extract_metadados(
+        self,
+        instrumento_id: str,
+        throttle: bool = True,
+        before_request: Optional[Callable[[], None]] = None,
+    ) -> Optional[Dict]:
         """
         Extract metadata from convenção detail page
         
         Args:
             instrumento_id: ID of the instrumento coletivo
+            throttle: Sleep for the configured delay after the page. The async
+                crawler passes False and applies its own global rate limit.
+            before_request: Called before every HTTP request (one per URL
+                pattern tried); the async crawler takes a rate limit slot here.
         
         Returns:
             Dictionary with metadata or None if error
@@ -241,9 +292,11 @@ class MediadorScraper:
             soup = None
             for url in urls:
                 try:
+                    if before_request is not None:
+                        before_request()
                     response = self.session.get(url, timeout=30)
                     if response.status_code == 200:
-                        soup = BeautifulSoup(response.content, 'html.parser')
+                        soup = parse_response(response)
                         break
                 except:
                     continue
@@ -295,7 +348,8 @@ class MediadorScraper:
                 ]),
             }
             
-            time.sleep(self.delay)  # Be respectful
+            if throttle:
+                time.sleep(self.delay)  # Be respectful
             
             return metadados
             
@@ -307,35 +361,33 @@ class MediadorScraper:
         """
         Download documento from URL
         
+        The body is streamed to the configured storage in chunks and stored
+        under its SHA-256, so identical documents are kept once.
+        
         Args:
             url: URL of the document
-            instrumento_id: ID for naming the file
+            instrumento_id: ID of the instrumento (for logging)
         
         Returns:
-            Tuple of (filepath, extension) or None if error
+            Tuple of (filepath, extension, sha256) or None if error
         """
         try:
-            response = self.session.get(url, timeout=60)
-            response.raise_for_status()
-            
-            # Determine file extension
-            content_type = response.headers.get('content-type', '').lower()
-            if 'pdf' in content_type:
-                ext = '.pdf'
-            elif 'html' in content_type:
-                ext = '.html'
-            else:
-                ext = '.pdf'  # default
-            
-            # Save to temporary location
-            import os
-            os.makedirs('temp_downloads', exist_ok=True)
-            filepath = f"temp_downloads/{instrumento_id}{ext}"
-            
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            with self.session.get(url, timeout=60, stream=True) as response:
+                response.raise_for_status()
+                
+                # Determine file extension
+                content_type = response.headers.get('content-type', '').lower()
+                if 'pdf' in content_type:
+                    ext = '.pdf'
+                elif 'html' in content_type:
+                    ext = '.html'
+                else:
+                    ext = '.pdf'  # default
+                
+                stored = get_storage().save_stream(response.iter_content(chunk_size=CHUNK_SIZE), ext)
             
-            return (filepath, ext)
+            logger.info(f"Stored documento for {instrumento_id}: {stored.sha256} ({stored.size} bytes)")
+            return (stored.path, ext, stored.sha256)
             
         except Exception as e:
             logger.error(f"Error downloading documento from {url}: {e}")
@@ -0,0 +1,214 @@
+"""
+Result cache for live Mediador searches, with stale-while-revalidate
+
+Live searches scrape the government site, which takes seconds, while many
+users ask the same question (same city, same CNAE) within minutes. Results
+are cached under the search parameters sent to the site in two tiers: an
+in-process LRU in front of the shared Redis cache. Within the TTL an entry
+is served as is. After the TTL, and for up to the stale window, it is still
+served right away while a background refresh fetches a new answer.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core.cache import SharedCache
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Cache outcomes reported to callers
+HIT = "HIT"
+STALE = "STALE"
+MISS = "MISS"
+
+REFRESH_WORKERS = 2
+
+
+def _digits(value: Optional[str]) -> Optional[str]:
+    digits = ''.join(c for c in value or '' if c.isdigit())
+    return digits or None
+
+
+def search_params(
+    municipio: Optional[str] = None,
+    uf: Optional[str] = None,
+    cnae: Optional[str] = None,
+    cnpj: Optional[str] = None,
+) -> Dict[str, str]:
+    """
+    Query parameters sent to the site for a search
+
+    Only formatting is removed (surrounding and repeated spaces, CNAE/CNPJ
+    punctuation, lowercase UF); case and accents of the city are kept since
+    the site may treat them as different searches.
+    """
+    params = {}
+    municipio = ' '.join((municipio or '').split())
+    if municipio:
+        params['municipio'] = municipio
+    uf = (uf or '').strip().upper()
+    if uf:
+        params['uf'] = uf
+    if _digits(cnae):
+        params['cnae'] = _digits(cnae)
+    if _digits(cnpj):
+        params['cnpj'] = _digits(cnpj)
+    return params
+
+
+def normalize_search_key(
+    municipio: Optional[str] = None,
+    uf: Optional[str] = None,
+    cnae: Optional[str] = None,
+    cnpj: Optional[str] = None,
+    limit: int = 20,
+) -> str:
+    """Cache key for a search, built from exactly the parameters sent to the site"""
+    parts = [search_params(municipio, uf, cnae, cnpj), int(limit)]
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SearchResultCache:
+    """Two-tier (LRU + Redis) TTL cache with background revalidation"""
+
+    def __init__(
+        self,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        max_local_entries: Optional[int] = None,
+    ):
+        self.ttl = ttl if ttl is not None else settings.SEARCH_CACHE_TTL_SECONDS
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.SEARCH_CACHE_STALE_SECONDS
+        self.max_local_entries = max(1, max_local_entries or settings.SEARCH_CACHE_LOCAL_MAX_ENTRIES)
+        self._shared = SharedCache("mediador:search")
+        self._local: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="search-refresh")
+        self._counters = {"local_hits": 0, "redis_hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _age(self, entry: Dict) -> float:
+        return time.time() - entry.get("stored_at", 0)
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+            return entry
+
+    def _put_local(self, key: str, entry: Dict):
+        with self._lock:
+            self._local[key] = entry
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_local_entries:
+                self._local.popitem(last=False)
+
+    def _lookup(self, key: str) -> Tuple[Optional[Dict], str]:
+        """Newest entry from either tier, and which tier answered"""
+        entry = self._get_local(key)
+        if entry is not None and self._age(entry) < self.ttl:
+            return entry, "local"
+
+        # Another worker may have refreshed it already
+        shared = self._shared.get(key)
+        if shared is not None and (entry is None or shared.get("stored_at", 0) > entry.get("stored_at", 0)):
+            self._put_local(key, shared)
+            return shared, "redis"
+        return entry, "local"
+
+    def store(self, key: str, results: List[Dict]):
+        entry = {"results": results, "stored_at": time.time()}
+        self._put_local(key, entry)
+        self._shared.set(key, entry, ttl=int(self.ttl + self.stale_ttl))
+
+    def _refresh(self, key: str, fetch: Callable[[], List[Dict]]):
+        try:
+            results = fetch()
+            # An empty answer usually means the site misbehaved; keep the stale one
+            if results:
+                self.store(key, results)
+            self._count("refreshes")
+        except Exception as e:
+            logger.warning(f"Background refresh of search {key[:12]} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: str, fetch: Callable[[], List[Dict]]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, fetch)
+
+    def lookup(self, key: str, fetch: Callable[[], List[Dict]]) -> Optional[Tuple[List[Dict], str]]:
+        """
+        Cached results for `key` without fetching on a miss
+
+        A stale entry is returned and refreshed in the background with `fetch`.
+
+        Returns:
+            Tuple of (results, HIT | STALE), or None on a miss
+        """
+        entry, tier = self._lookup(key)
+        if entry is not None:
+            age = self._age(entry)
+            if age < self.ttl:
+                self._count("local_hits" if tier == "local" else "redis_hits")
+                return entry["results"], HIT
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                self._schedule_refresh(key, fetch)
+                return entry["results"], STALE
+
+        self._count("misses")
+        return None
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], List[Dict]]) -> Tuple[List[Dict], str]:
+        """
+        Cached results for `key`, calling `fetch` on a miss
+
+        Returns:
+            Tuple of (results, HIT | STALE | MISS)
+        """
+        cached = self.lookup(key, fetch)
+        if cached is not None:
+            return cached
+
+        results = fetch()
+        if results:
+            self.store(key, results)
+        return results, MISS
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["local_entries"] = len(self._local)
+        hits = counters["local_hits"] + counters["redis_hits"] + counters["stale_hits"]
+        total = hits + counters["misses"]
+        counters["hit_ratio"] = round(hits / total, 3) if total else 0.0
+        return counters
+
+
+_search_cache: Optional[SearchResultCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> SearchResultCache:
+    """Process-wide live search cache"""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchResultCache()
+    return _search_cache
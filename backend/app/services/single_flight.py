@@ -0,0 +1,144 @@
+"""
+Single-flight coalescing of identical Mediador fetches
+
+When several users run the same live search at the same time, only one fetch
+should reach the government site. Concurrent calls with the same key inside
+a process wait for the first one. Across processes the first caller takes a
+Redis lock and publishes its result under the lock token; callers in other
+workers poll for that result instead of fetching themselves. Without Redis
+coalescing is per process only.
+"""
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+from app.core.cache import SharedCache, get_redis, _redis_error
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# How long a published result stays readable for waiting workers
+RESULT_TTL_SECONDS = 30
+POLL_INTERVAL_SECONDS = 0.1
+
+# Delete the lock only if we still own it
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_MISSING = object()
+
+
+class _Call:
+    """An in-process fetch that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Run at most one fetch per key at a time; concurrent callers share its result"""
+
+    def __init__(
+        self,
+        namespace: str,
+        lock_seconds: Optional[int] = None,
+        wait_seconds: Optional[float] = None,
+    ):
+        self.namespace = namespace
+        self.lock_seconds = lock_seconds or settings.SINGLE_FLIGHT_LOCK_SECONDS
+        self.wait_seconds = wait_seconds or settings.SINGLE_FLIGHT_WAIT_SECONDS
+        self._results = SharedCache(f"flight:{namespace}:result")
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return fn(), or the result of an identical call already in flight"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            logger.debug(f"Joining in-flight {self.namespace} call {key}")
+            if not call.done.wait(self.wait_seconds):
+                logger.warning(f"In-flight {self.namespace} call {key} took too long, fetching directly")
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _do_shared(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Coalesce with other processes through a Redis lock"""
+        client = get_redis()
+        if client is None:
+            return fn()
+
+        lock_key = f"cc:flight:{self.namespace}:lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            try:
+                if client.set(lock_key, token, nx=True, ex=self.lock_seconds):
+                    break
+                owner = client.get(lock_key)
+            except Exception as e:
+                _redis_error(e)
+                return fn()
+
+            if owner is not None:
+                logger.debug(f"Waiting for {self.namespace} call {key} running in another worker")
+                result = self._wait_for_result(client, lock_key, owner.decode('utf-8'), deadline)
+                if result is not _MISSING:
+                    return result
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for {self.namespace} call {key}, fetching directly")
+                return fn()
+            # The other worker gave up without a result: try to take over
+
+        try:
+            value = fn()
+            self._results.set(token, {"value": value}, ttl=RESULT_TTL_SECONDS)
+            return value
+        finally:
+            try:
+                client.eval(RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                _redis_error(e)
+
+    def _wait_for_result(self, client, lock_key: str, owner: str, deadline: float) -> Any:
+        """Poll for the owner's published result while it still holds the lock"""
+        while time.monotonic() < deadline:
+            published = self._results.get(owner)
+            if published is not None:
+                return published.get("value")
+            try:
+                current = client.get(lock_key)
+            except Exception as e:
+                _redis_error(e)
+                return _MISSING
+            if current is None or current.decode('utf-8') != owner:
+                # Released: the result may have landed just before
+                published = self._results.get(owner)
+                return published.get("value") if published is not None else _MISSING
+            time.sleep(POLL_INTERVAL_SECONDS)
+        return _MISSING
@@ -0,0 +1,167 @@
+"""
+Content-addressed storage for downloaded documents
+
+Documents are streamed to disk in chunks while their SHA-256 is computed,
+then stored under STORAGE_PATH/documents/<aa>/<sha256><ext>. Identical files
+are kept once, whatever instrumento they were downloaded for.
+"""
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StoredDocument(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+
+class LocalDocumentStorage:
+    """Content-addressed blob store on the local filesystem"""
+
+    def __init__(self, base_path: Optional[str] = None):
+        self.base_path = base_path or settings.STORAGE_PATH
+        self.documents_path = os.path.join(self.base_path, 'documents')
+        self.tmp_path = os.path.join(self.base_path, 'tmp')
+        os.makedirs(self.documents_path, exist_ok=True)
+        os.makedirs(self.tmp_path, exist_ok=True)
+
+    def path_for(self, sha256: str, ext: str) -> str:
+        """Final location of a blob"""
+        return os.path.join(self.documents_path, sha256[:2], f"{sha256}{ext}")
+
+    def save_stream(self, chunks: Iterable[bytes], ext: str) -> StoredDocument:
+        """
+        Write chunks to a temporary file while hashing, then move it into place
+
+        Args:
+            chunks: Iterable of byte chunks (e.g. response.iter_content())
+            ext: File extension including the dot
+
+        Returns:
+            StoredDocument with the final path, hash and size
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_file = tempfile.mkstemp(dir=self.tmp_path, suffix=ext)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            final_path = self.path_for(sha256, ext)
+            if os.path.exists(final_path):
+                # Same content already stored
+                os.remove(tmp_file)
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(tmp_file, final_path)
+            return StoredDocument(final_path, sha256, size)
+        except Exception:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+
+    def iter_blobs(self) -> Iterator[Tuple[str, str]]:
+        """Yield (sha256, path) for every stored blob"""
+        for root, _, files in os.walk(self.documents_path):
+            for name in files:
+                sha256 = os.path.splitext(name)[0]
+                yield sha256, os.path.join(root, name)
+
+    def delete(self, path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_storage() -> LocalDocumentStorage:
+    """Return the storage backend configured by STORAGE_TYPE"""
+    if settings.STORAGE_TYPE != 'local':
+        raise ValueError(f"Unsupported STORAGE_TYPE: {settings.STORAGE_TYPE}")
+    return LocalDocumentStorage()
+
+
+def sha256_file(filepath: str) -> str:
+    """Hash a file on disk without loading it in memory"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def collect_garbage(db: Session, grace_seconds: int = 3600, dry_run: bool = False) -> Dict:
+    """
+    Delete blobs no longer referenced by any convenção or pending frontier entry
+
+    Downloaded documents of instrumentos still in the crawl frontier (BAIXADO,
+    EXTRAIDO) are kept for the run that resumes them. Blobs younger than
+    `grace_seconds` are kept too, since a running collection may have stored
+    them without committing the reference yet. Leftover temporary files from
+    interrupted downloads are removed as well.
+
+    Returns:
+        Dictionary with counters of the run
+    """
+    from app.models.convencao import Convencao
+    from app.models.crawl import CrawlFrontier
+    from app.services.crawl_frontier import FINAL_STAGES
+
+    storage = get_storage()
+    referenced = {
+        row[0] for row in db.query(Convencao.documento_sha256).filter(
+            Convencao.documento_sha256.isnot(None)
+        ).all()
+    }
+    referenced.update(
+        row[0] for row in db.query(CrawlFrontier.documento_sha256).filter(
+            CrawlFrontier.documento_sha256.isnot(None),
+            CrawlFrontier.stage.notin_(FINAL_STAGES),
+        ).all()
+    )
+
+    now = time.time()
+    result = {"checked": 0, "deleted": 0, "bytes_freed": 0, "tmp_deleted": 0}
+
+    for sha256, path in storage.iter_blobs():
+        result["checked"] += 1
+        if sha256 in referenced:
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        if now - stat.st_mtime < grace_seconds:
+            continue
+        if not dry_run:
+            storage.delete(path)
+        result["deleted"] += 1
+        result["bytes_freed"] += stat.st_size
+
+    for name in os.listdir(storage.tmp_path):
+        path = os.path.join(storage.tmp_path, name)
+        try:
+            if now - os.stat(path).st_mtime >= grace_seconds:
+                if not dry_run:
+                    os.remove(path)
+                result["tmp_deleted"] += 1
+        except OSError:
+            continue
+
+    logger.info(f"Storage GC: {result}")
+    return result
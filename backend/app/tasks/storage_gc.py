@@ -0,0 +1,29 @@
+"""
+Celery task for removing orphaned document blobs from storage
+"""
+from app.core.database import SessionLocal
+from app.services.storage import collect_garbage
+from app.tasks.collector import celery_app
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="gc_document_blobs")
+def gc_document_blobs_task(grace_seconds: int = 3600, dry_run: bool = False):
+    """
+    Remove documentos do storage que não são referenciados por nenhuma convenção
+    """
+    db = SessionLocal()
+    
+    try:
+        logger.info("Iniciando limpeza de documentos órfãos...")
+        result = collect_garbage(db, grace_seconds=grace_seconds, dry_run=dry_run)
+        return {"status": "success", **result}
+    
+    except Exception as e:
+        logger.error(f"Erro na limpeza de documentos: {e}")
+        return {"status": "error", "message": str(e)}
+    
+    finally:
+        db.close()
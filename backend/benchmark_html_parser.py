@@ -0,0 +1,118 @@
+"""
+Benchmark do parse de páginas de busca do Mediador MTE: antes x depois
+
+Antes: duas árvores completas com html.parser (temp_soup + soup) e find_all
+sobre a árvore inteira. Depois: um único parse com lxml restrito por
+SEARCH_RESULTS_STRAINER.
+
+Uso:
+    python benchmark_html_parser.py [diretorio_com_html] [repeticoes]
+
+Por padrão usa as páginas salvas em debug_html/ por debug_mediador_html.py.
+Se o diretório não existir, gera uma página sintética.
+"""
+import sys
+import os
+import re
+import glob
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bs4 import BeautifulSoup
+from app.services.html_parser import parse_html, SEARCH_RESULTS_STRAINER, PARSER
+
+
+def build_synthetic_page(rows: int = 500) -> bytes:
+    """Gera uma página de resultados parecida com a do Mediador"""
+    menu = ''.join(
+        f'<li><a href="/menu/{i}">{texto}</a></li>'
+        for i, texto in enumerate([
+            'Solicitação de Registro de Instrumento Coletivo', 'Continuar Solicitação',
+            'Retificar Solicitação', 'Acompanhar Solicitação', 'Manual do Usuário',
+        ])
+    )
+    linhas = ''.join(
+        f'<tr><td><a href="/ConvencaoColetiva/Detalhes/{1000000 + i}">'
+        f'Convenção Coletiva de Trabalho {2024 - i % 3} - Sindicato {i}</a></td>'
+        f'<td>{(i % 28) + 1:02d}/03/2024</td><td>São Paulo</td><td>SP</td></tr>'
+        for i in range(rows)
+    )
+    scripts = '<script>var x = 1;</script>' * 20
+    html = (
+        '<html><head><meta charset="utf-8"><title>Mediador</title>'
+        f'<style>body {{ font-family: sans-serif; }}</style>{scripts}</head><body>'
+        f'<nav class="menu"><ul>{menu}</ul></nav>'
+        '<form><input name="municipio"><select name="uf"><option>SP</option></select></form>'
+        '<div class="resultado"><table><tr><th>Instrumento</th><th>Data</th>'
+        f'<th>Município</th><th>UF</th></tr>{linhas}</table></div>'
+        '<footer>Ministério do Trabalho e Emprego</footer></body></html>'
+    )
+    return html.encode('utf-8')
+
+
+def parse_before(content: bytes):
+    """Comportamento antigo de search_convencoes"""
+    temp_soup = BeautifulSoup(content, 'html.parser', from_encoding='utf-8')
+    has_results = (
+        len(temp_soup.find_all('table')) > 0 or
+        len(temp_soup.find_all(['div', 'ul'], class_=re.compile(r'result|lista|tabela', re.I))) > 0 or
+        len([l for l in temp_soup.find_all('a', href=True) if re.search(r'/\d{6,}', l.get('href', ''))]) > 0
+    )
+    soup = BeautifulSoup(content, 'html.parser', from_encoding='utf-8')
+    return soup, has_results
+
+
+def parse_after(content: bytes):
+    """Comportamento novo: um parse só, com lxml e SoupStrainer"""
+    soup = parse_html(content, only=SEARCH_RESULTS_STRAINER, from_encoding='utf-8')
+    has_results = (
+        soup.find('table') is not None or
+        soup.find(['div', 'ul'], class_=re.compile(r'result|lista|tabela', re.I)) is not None or
+        soup.find('a', href=re.compile(r'/\d{6,}')) is not None
+    )
+    return soup, has_results
+
+
+def measure(func, pages, repeticoes: int) -> float:
+    """Tempo médio por página em milissegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for content in pages:
+            func(content)
+    return (time.perf_counter() - inicio) * 1000 / (repeticoes * len(pages))
+
+
+def main():
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else 'debug_html'
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    arquivos = sorted(glob.glob(os.path.join(diretorio, '*.html')))
+    if arquivos:
+        pages = []
+        for arquivo in arquivos:
+            with open(arquivo, 'rb') as f:
+                pages.append(f.read())
+        origem = f"{len(pages)} páginas de {diretorio}/"
+    else:
+        pages = [build_synthetic_page()]
+        origem = "página sintética (execute debug_mediador_html.py para capturar páginas reais)"
+
+    print("=" * 60)
+    print("Benchmark: parse de páginas de busca do Mediador")
+    print("=" * 60)
+    print(f"Entrada: {origem}")
+    print(f"Tamanho total: {sum(len(p) for p in pages) / 1024:.1f} KB, {repeticoes} repetições")
+    print(f"Parser novo: {PARSER}")
+
+    antes = measure(parse_before, pages, repeticoes)
+    depois = measure(parse_after, pages, repeticoes)
+
+    print(f"\nAntes  (html.parser x2): {antes:8.2f} ms/página")
+    print(f"Depois ({PARSER} + strainer): {depois:8.2f} ms/página")
+    if depois:
+        print(f"Ganho: {antes / depois:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark da extração de IDs de instrumentos em páginas de listagem
+
+Compara a varredura direta dos bytes (scan_instrumento_ids, sem DOM) com o
+caminho BeautifulSoup (parse + dom_instrumento_ids) usado como fallback pela
+estratégia 3 de MediadorScraper.extract_instrumento_ids. As páginas geradas
+têm N links, atributos data-id e IDs em blocos <script>; os dois caminhos
+devem encontrar exatamente os mesmos IDs.
+
+Uso:
+    python benchmark_instrumento_ids.py [linhas] [repeticoes]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.html_parser import parse_html
+from app.services.scraper import scan_instrumento_ids, dom_instrumento_ids
+
+MENU = (
+    '<nav class="menu"><ul>'
+    '<li><a href="/Solicitacao/Registro">Solicitação de Registro de Instrumento Coletivo</a></li>'
+    '<li><a href="/Manual">Manual do Usuário</a></li>'
+    '</ul></nav>'
+)
+
+
+def page_listing(rows: int) -> bytes:
+    """Listagem com links, data-id e um bloco de script a cada 100 linhas"""
+    partes = [f'<html><head><meta charset="utf-8"><title>Instrumentos</title></head><body>{MENU}<ul class="lista">']
+    for i in range(rows):
+        instrumento_id = 1000000 + i
+        if i % 3 == 0:
+            partes.append(f'<li data-id="{instrumento_id}">Convenção Coletiva {i} - Campinas/SP</li>')
+        else:
+            partes.append(f'<li><a class="item" href="/consulta/instrumento/{instrumento_id}?origem=lista">'
+                          f'Convenção Coletiva {i}</a> Sindicato dos Trabalhadores {i}</li>')
+        if i % 100 == 99:
+            ids = ', '.join(f'{{"instrumento_id": "{2000000 + j}"}}' for j in range(i - 9, i + 1))
+            partes.append(f'<script>window.destaques = [{ids}];</script>')
+    partes.append('</ul></body></html>')
+    return ''.join(partes).encode('utf-8')
+
+
+def measure(fn, repeticoes: int):
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        ids = fn()
+    return (time.perf_counter() - inicio) / repeticoes, ids
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    content = page_listing(rows)
+
+    print("=" * 60)
+    print(f"Benchmark: IDs em listagem com {rows} linhas ({len(content) / 1024:.0f} KB, {repeticoes} repetições)")
+    print("=" * 60)
+
+    scan_elapsed, scan_ids = measure(lambda: scan_instrumento_ids(content), repeticoes)
+    dom_elapsed, dom_ids = measure(lambda: dom_instrumento_ids(parse_html(content)), repeticoes)
+
+    for nome, elapsed, ids in [('bytes', scan_elapsed, scan_ids), ('dom', dom_elapsed, dom_ids)]:
+        print(f"{nome:6s}: {elapsed * 1000:9.1f} ms  ({len(ids)} IDs, {len(content) / 1024 / 1024 / elapsed:,.1f} MB/s)")
+    print(f"Aceleração: {dom_elapsed / scan_elapsed:.1f}x")
+
+    if set(scan_ids) != set(dom_ids):
+        print(f"❌ Resultados diferentes: {len(set(scan_ids) ^ set(dom_ids))} IDs divergentes")
+        return 1
+    print("✓ Mesmos IDs nos dois caminhos")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
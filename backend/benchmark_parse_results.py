@@ -0,0 +1,79 @@
+"""
+Microbenchmark de MediadorAPIClient._parse_search_results
+
+Gera páginas de resultados com N linhas (padrão 5.000) nos três formatos que o
+parser entende (tabela, divs de resultado e links soltos) e mede apenas a
+extração, com a árvore já construída.
+
+Uso:
+    python benchmark_parse_results.py [linhas] [repeticoes]
+"""
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.mediador_api import MediadorAPIClient
+from app.services.html_parser import parse_html, SEARCH_RESULTS_STRAINER
+
+MENU = (
+    '<nav class="menu"><ul>'
+    '<li><a href="/Solicitacao/Registro">Solicitação de Registro de Instrumento Coletivo</a></li>'
+    '<li><a href="/Solicitacao/Continuar">Continuar Solicitação</a></li>'
+    '<li><a href="/Solicitacao/Retificar">Retificar Solicitação</a></li>'
+    '<li><a href="/Manual">Manual do Usuário</a></li>'
+    '</ul></nav>'
+)
+
+
+def page_table(rows: int) -> str:
+    linhas = ''.join(
+        f'<tr><td><a href="/ConvencaoColetiva/Detalhes/{1000000 + i}">Convenção Coletiva {i}</a></td>'
+        f'<td>{(i % 28) + 1:02d}/03/2024</td><td>Campinas</td><td>SP</td></tr>'
+        for i in range(rows)
+    )
+    return f'<html><body>{MENU}<table><tr><th>Instrumento</th><th>Data</th><th>Município</th><th>UF</th></tr>{linhas}</table></body></html>'
+
+
+def page_divs(rows: int) -> str:
+    itens = ''.join(
+        f'<div class="resultado-item"><a href="/instrumento/{1000000 + i}">Convenção Coletiva {i}</a>'
+        f' Sindicato dos Trabalhadores {i} - Campinas/SP</div>'
+        for i in range(rows)
+    )
+    return f'<html><body>{MENU}{itens}</body></html>'
+
+
+def page_links(rows: int) -> str:
+    links = ''.join(
+        f'<p><a href="/ConvencaoColetiva/Visualizar?id={1000000 + i}">Convenção Coletiva de Trabalho {i}</a></p>'
+        for i in range(rows)
+    )
+    return f'<html><body>{MENU}<section class="conteudo">{links}</section></body></html>'
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    client = MediadorAPIClient()
+
+    print("=" * 60)
+    print(f"Benchmark: _parse_search_results com {rows} linhas ({repeticoes} repetições)")
+    print("=" * 60)
+
+    for nome, builder in [('tabela', page_table), ('divs', page_divs), ('links', page_links)]:
+        soup = parse_html(builder(rows), only=SEARCH_RESULTS_STRAINER)
+
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            convencoes = client._parse_search_results(soup, limit=rows)
+        elapsed = (time.perf_counter() - inicio) / repeticoes
+
+        print(f"{nome:8s}: {elapsed * 1000:9.1f} ms  ({len(convencoes)} convenções, "
+              f"{len(convencoes) / elapsed:,.0f} resultados/s)")
+
+
+if __name__ == "__main__":
+    main()
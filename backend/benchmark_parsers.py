@@ -0,0 +1,127 @@
+"""
+Benchmark dos parsers do Mediador sobre o corpus de fixtures gravado
+
+Grave o corpus executando qualquer script com MEDIADOR_HTTP_MODE=record, por
+exemplo:
+    MEDIADOR_HTTP_MODE=record python debug_mediador_html.py
+    MEDIADOR_HTTP_MODE=record python collect_convencoes.py 20
+
+Este script reproduz as páginas gravadas sem acesso à rede e mede, para
+_parse_search_results, _parse_detail_page e extract_metadados, páginas por
+segundo e memória alocada por página (pico do tracemalloc).
+
+Uso:
+    python benchmark_parsers.py [diretorio_do_corpus] [repeticoes]
+"""
+import sys
+import os
+import re
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.config import settings
+
+# Os clientes precisam ser criados já em modo replay
+if len(sys.argv) > 1:
+    settings.MEDIADOR_FIXTURES_PATH = sys.argv[1]
+settings.MEDIADOR_HTTP_MODE = 'replay'
+
+from app.services.http_fixtures import iter_fixtures
+from app.services.html_parser import parse_html, SEARCH_RESULTS_STRAINER
+from app.services.mediador_api import MediadorAPIClient, MAX_RESULTS_PER_PAGE
+from app.services.scraper import MediadorScraper
+
+SEARCH_URL_RE = re.compile(r'consulta|busca|pesquisa', re.I)
+DETAIL_URL_RE = re.compile(r'/(?:ConvencaoColetiva/(?:Detalhes|Visualizar)|instrumento)/(\d+)$', re.I)
+SCRAPER_URL_RE = re.compile(r'/(?:instrumento|convencao|detalhes)/(\d+)$')
+
+
+def load_cases():
+    """Separa as páginas HTML gravadas por parser"""
+    client = MediadorAPIClient()
+    scraper = MediadorScraper()
+
+    search, detail, metadados = [], [], []
+    for fixture in iter_fixtures():
+        content_type = fixture.headers.get('Content-Type', fixture.headers.get('content-type', ''))
+        if fixture.method != 'GET' or fixture.status_code != 200 or 'html' not in content_type.lower():
+            continue
+        path = fixture.url.split('?')[0]
+        body = fixture.body
+
+        if SEARCH_URL_RE.search(path):
+            search.append(lambda body=body: client._parse_search_results(
+                parse_html(body, only=SEARCH_RESULTS_STRAINER), MAX_RESULTS_PER_PAGE
+            ))
+
+        match = DETAIL_URL_RE.search(path)
+        if match:
+            detail.append(lambda body=body, i=match.group(1): client._parse_detail_page(parse_html(body), i))
+
+        match = SCRAPER_URL_RE.search(path)
+        if match:
+            base_url = path[:match.start()]
+
+            def run(base_url=base_url, i=match.group(1)):
+                # Passa pelo transporte de replay, como em produção passaria pela rede
+                scraper.base_url = base_url
+                return scraper.extract_metadados(i, throttle=False)
+            metadados.append(run)
+
+    return [
+        ('_parse_search_results', search),
+        ('_parse_detail_page', detail),
+        ('extract_metadados', metadados),
+    ]
+
+
+def measure(pages, repeticoes: int):
+    """Retorna (páginas/s, memória média por página em KB, pico em KB)"""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for page in pages:
+            page()
+    elapsed = time.perf_counter() - inicio
+
+    # Memória medida numa passada separada: o tracemalloc distorce o tempo
+    picos = []
+    tracemalloc.start()
+    try:
+        for page in pages:
+            tracemalloc.reset_peak()
+            antes = tracemalloc.get_traced_memory()[0]
+            page()
+            picos.append(tracemalloc.get_traced_memory()[1] - antes)
+    finally:
+        tracemalloc.stop()
+
+    return len(pages) * repeticoes / elapsed, sum(picos) / len(picos) / 1024, max(picos) / 1024
+
+
+def main():
+    repeticoes = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print("=" * 60)
+    print(f"Benchmark dos parsers (corpus: {settings.MEDIADOR_FIXTURES_PATH}, {repeticoes} repetições)")
+    print("=" * 60)
+
+    cases = load_cases()
+    if not any(pages for _, pages in cases):
+        print("Nenhuma página HTML no corpus. Grave fixtures com MEDIADOR_HTTP_MODE=record.")
+        return 1
+
+    print(f"{'parser':24s} {'páginas':>8s} {'páginas/s':>10s} {'KB/página':>10s} {'pico KB':>9s}")
+    for nome, pages in cases:
+        if not pages:
+            print(f"{nome:24s} {0:8d}  (sem páginas no corpus)")
+            continue
+        pages_per_second, media_kb, pico_kb = measure(pages, repeticoes)
+        print(f"{nome:24s} {len(pages):8d} {pages_per_second:10.1f} {media_kb:10.1f} {pico_kb:9.1f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -23,14 +23,21 @@ logger = logging.getLogger(__name__)
 def main():
     """Main function to run collection"""
     limit = None
+    args = sys.argv[1:]
+    
+    # --full ignora o watermark e reprocessa toda a fronteira pendente
+    full = '--full' in args
+    args = [a for a in args if a != '--full']
+    if full:
+        print("Coleta completa (ignorando watermark)")
     
     # Check for limit argument
-    if len(sys.argv) > 1:
+    if args:
         try:
-            limit = int(sys.argv[1])
+            limit = int(args[0])
             print(f"Limitando coleta a {limit} convenções")
         except ValueError:
-            print("Uso: python collect_convencoes.py [limit]")
+            print("Uso: python collect_convencoes.py [limit] [--full]")
             print("Exemplo: python collect_convencoes.py 10")
             return
     
@@ -41,16 +48,35 @@ def main():
     db = SessionLocal()
     
     try:
-        result = run_collection_task(limit=limit, db=db)
+        result = run_collection_task(limit=limit, db=db, full=full)
         
         print("\n" + "=" * 60)
         print("Coleta concluída!")
         print("=" * 60)
         print(f"Status: {result.get('status')}")
+        if 'discovered' in result:
+            print(f"Novos IDs na fronteira: {result['discovered']}")
         if 'new_count' in result:
             print(f"Novas convenções adicionadas: {result['new_count']}")
+        if 'skipped_count' in result:
+            print(f"Ignoradas (anteriores ao watermark): {result['skipped_count']}")
         if 'error_count' in result:
             print(f"Erros: {result['error_count']}")
+        if 'crawl' in result:
+            crawl = result['crawl']
+            print(f"Páginas coletadas: {crawl['pages']} em {crawl['elapsed_seconds']}s "
+                  f"({crawl['pages_per_second']} páginas/s)")
+        if 'ocr' in result:
+            ocr = result['ocr']
+            print(f"Páginas OCR: {ocr['pages']} em {ocr['elapsed_seconds']}s "
+                  f"({ocr['seconds_per_page']} s/página, {ocr['workers']} workers)")
+            if ocr.get('dpi'):
+                resolucoes = ', '.join(f"{n} a {dpi} dpi" for dpi, n in ocr['dpi'].items())
+                print(f"  Resolução: {resolucoes} (~{ocr['seconds_saved']}s economizados)")
+        if 'stages' in result:
+            print(f"Tempo total: {result['elapsed_seconds']}s ({result['instrumentos_per_second']} instrumentos/s)")
+            for etapa, segundos in result['stages'].items():
+                print(f"  {etapa:14s} {segundos:8.2f}s")
         if 'message' in result:
             print(f"Mensagem: {result['message']}")
         
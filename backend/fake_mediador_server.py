@@ -0,0 +1,402 @@
+"""
+Servidor Mediador sintético para testes de carga de ponta a ponta
+
+Gera, para qualquer quantidade de instrumentos, a listagem da API, páginas de
+busca paginadas, páginas de detalhes com as classes CSS que o scraper lê e
+documentos PDF (digitais, com camada de texto, ou só imagem, para o OCR).
+Todo o conteúdo é determinístico por ID, então execuções repetidas são
+comparáveis. Latência e taxa de erro são configuráveis.
+
+Uso:
+    python fake_mediador_server.py --instrumentos 5000 --latencia-ms 150 --taxa-erro 0.02
+
+Depois aponte o backend para ele e rode a coleta:
+    MEDIADOR_BASE_URL=http://127.0.0.1:8765 MEDIADOR_API_URL=http://127.0.0.1:8765 \\
+    SCRAPER_MAX_REQUESTS_PER_SECOND=1000 SCRAPER_DELAY_SECONDS=0 \\
+    python collect_convencoes.py 500 --full
+"""
+import argparse
+import io
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PRIMEIRO_ID = 100000
+DATA_INICIAL = date(2020, 1, 1)
+RESULTADOS_POR_PAGINA = 50
+
+MUNICIPIOS = [
+    ('SAO PAULO', 'SP'), ('CAMPINAS', 'SP'), ('RIO DE JANEIRO', 'RJ'), ('BELO HORIZONTE', 'MG'),
+    ('PORTO ALEGRE', 'RS'), ('CURITIBA', 'PR'), ('SALVADOR', 'BA'), ('RECIFE', 'PE'),
+    ('FORTALEZA', 'CE'), ('GOIANIA', 'GO'),
+]
+CATEGORIAS = [
+    ('COMERCIO VAREJISTA', '4711302'), ('METALURGICOS', '2599399'), ('CONSTRUCAO CIVIL', '4120400'),
+    ('TRANSPORTE RODOVIARIO DE CARGAS', '4930202'), ('HOTELARIA', '5510801'), ('VIGILANCIA', '8011101'),
+]
+CLAUSULAS = [
+    "CLÁUSULA {n} - REAJUSTE SALARIAL: Os salários serão reajustados em {pct}% a partir da data-base.",
+    "CLÁUSULA {n} - PISO SALARIAL: Fica garantido o piso de R$ {piso},00 para a categoria.",
+    "CLÁUSULA {n} - JORNADA DE TRABALHO: A jornada semanal será de 44 horas.",
+    "CLÁUSULA {n} - HORAS EXTRAS: As horas extras serão pagas com adicional de {he}%.",
+    "CLÁUSULA {n} - VALE ALIMENTAÇÃO: Será concedido vale alimentação de R$ {va},00 mensais.",
+    "CLÁUSULA {n} - ESTABILIDADE: Garantia de emprego de 60 dias após o retorno de férias.",
+]
+
+
+class Catalogo:
+    """Instrumentos sintéticos, gerados sob demanda a partir do ID"""
+
+    def __init__(self, total: int, proporcao_imagem: float, paginas_documento: int):
+        self.total = total
+        self.proporcao_imagem = proporcao_imagem
+        self.paginas_documento = paginas_documento
+
+    def ids(self):
+        return range(PRIMEIRO_ID, PRIMEIRO_ID + self.total)
+
+    def existe(self, instrumento_id: int) -> bool:
+        return PRIMEIRO_ID <= instrumento_id < PRIMEIRO_ID + self.total
+
+    def instrumento(self, instrumento_id: int) -> dict:
+        rng = random.Random(instrumento_id)
+        municipio, uf = rng.choice(MUNICIPIOS)
+        categoria, cnae = rng.choice(CATEGORIAS)
+        # Publicação cresce com o ID, como no site real
+        publicacao = DATA_INICIAL + timedelta(days=(instrumento_id - PRIMEIRO_ID) * 2000 // max(self.total, 1))
+        inicio = date(publicacao.year, rng.choice([1, 3, 5, 9]), 1)
+        return {
+            'id': instrumento_id,
+            'titulo': f"CONVENÇÃO COLETIVA DE TRABALHO {inicio.year}/{inicio.year + 1} - {categoria} DE {municipio}",
+            'data_publicacao': publicacao,
+            'vigencia_inicio': inicio,
+            'vigencia_fim': date(inicio.year + 1, inicio.month, 1) - timedelta(days=1),
+            'sindicato_empregador': f"SINDICATO DAS EMPRESAS DE {categoria} DE {municipio}",
+            'sindicato_trabalhador': f"SINDICATO DOS TRABALHADORES EM {categoria} DE {municipio}",
+            'municipio': municipio,
+            'uf': uf,
+            'cnae': cnae,
+            'imagem': rng.random() < self.proporcao_imagem,
+        }
+
+    def paginas_texto(self, instrumento: dict) -> list:
+        """Texto do documento, uma lista de linhas por página"""
+        rng = random.Random(instrumento['id'] * 7)
+        paginas = []
+        n = 1
+        for _ in range(self.paginas_documento):
+            linhas = [instrumento['titulo'][:80], '']
+            for _ in range(8):
+                linhas.append(rng.choice(CLAUSULAS).format(
+                    n=n, pct=rng.randint(3, 9), piso=rng.randint(1500, 3500),
+                    he=rng.choice([50, 60, 70, 100]), va=rng.randint(300, 900),
+                ))
+                n += 1
+            paginas.append(linhas)
+        return paginas
+
+
+def _quebrar(linha: str, largura: int = 90) -> list:
+    partes = []
+    while len(linha) > largura:
+        corte = linha.rfind(' ', 0, largura)
+        corte = corte if corte > 0 else largura
+        partes.append(linha[:corte])
+        linha = linha[corte:].lstrip()
+    partes.append(linha)
+    return partes
+
+
+def pdf_digital(paginas: list) -> bytes:
+    """PDF mínimo com camada de texto (Helvetica, WinAnsiEncoding)"""
+    objetos = []
+
+    def adicionar(conteudo: bytes) -> int:
+        objetos.append(conteudo)
+        return len(objetos)
+
+    catalogo = adicionar(b'')
+    arvore = adicionar(b'')
+    fonte = adicionar(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>')
+
+    kids = []
+    for linhas in paginas:
+        comandos = [b'BT /F1 10 Tf 14 TL 50 800 Td']
+        for linha in linhas:
+            for parte in _quebrar(linha):
+                texto = parte.encode('cp1252', errors='replace')
+                texto = texto.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+                comandos.append(b'(' + texto + b") '")
+        comandos.append(b'ET')
+        stream = zlib.compress(b'\n'.join(comandos))
+        conteudo = adicionar(
+            b'<< /Length %d /Filter /FlateDecode >>\nstream\n' % len(stream) + stream + b'\nendstream'
+        )
+        kids.append(adicionar(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] '
+            b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>' % (arvore, fonte, conteudo)
+        ))
+
+    objetos[catalogo - 1] = b'<< /Type /Catalog /Pages %d 0 R >>' % arvore
+    objetos[arvore - 1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+        b' '.join(b'%d 0 R' % k for k in kids), len(kids)
+    )
+
+    saida = io.BytesIO()
+    saida.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for numero, conteudo in enumerate(objetos, start=1):
+        offsets.append(saida.tell())
+        saida.write(b'%d 0 obj\n' % numero + conteudo + b'\nendobj\n')
+    xref = saida.tell()
+    saida.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objetos) + 1))
+    for offset in offsets:
+        saida.write(b'%010d 00000 n \n' % offset)
+    saida.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objetos) + 1, catalogo, xref
+    ))
+    return saida.getvalue()
+
+
+def pdf_imagem(paginas: list) -> bytes:
+    """PDF só com imagens das páginas (sem camada de texto), como um documento escaneado"""
+    from PIL import Image, ImageDraw, ImageFont
+
+    try:
+        fonte = ImageFont.load_default(size=22)
+    except TypeError:
+        fonte = ImageFont.load_default()
+
+    imagens = []
+    for linhas in paginas:
+        # A4 a 150 DPI
+        imagem = Image.new('L', (1240, 1754), 255)
+        desenho = ImageDraw.Draw(imagem)
+        y = 100
+        for linha in linhas:
+            for parte in _quebrar(linha, 80):
+                desenho.text((90, y), parte, fill=0, font=fonte)
+                y += 32
+        imagens.append(imagem)
+
+    saida = io.BytesIO()
+    imagens[0].save(saida, 'PDF', resolution=150.0, save_all=True, append_images=imagens[1:])
+    return saida.getvalue()
+
+
+def pagina_detalhes(instrumento: dict) -> str:
+    i = instrumento
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Mediador - Instrumento {i['id']}</title></head>
+<body>
+<nav class="menu"><a href="/">Início</a> <a href="/ConvencaoColetiva/Consulta">Consultar</a></nav>
+<div class="conteudo detalhes">
+  <h1 class="titulo">{i['titulo']}</h1>
+  <p>Tipo: <span class="tipo">CCT</span></p>
+  <p>Data de publicação: <span class="data-publicacao">{i['data_publicacao']:%d/%m/%Y}</span></p>
+  <p>Vigência: <span class="vigencia-inicio">{i['vigencia_inicio']:%d/%m/%Y}</span>
+     a <span class="vigencia-fim">{i['vigencia_fim']:%d/%m/%Y}</span></p>
+  <div class="sindicato-empregador">{i['sindicato_empregador']}</div>
+  <div class="sindicato-trabalhador">{i['sindicato_trabalhador']}</div>
+  <p>Abrangência: <span class="municipio">{i['municipio']}</span>/<span class="uf">{i['uf']}</span></p>
+  <p>CNAE: <span class="cnae">{i['cnae']}</span></p>
+  <a class="download-documento" href="/documentos/{i['id']}.pdf">Baixar documento</a>
+</div>
+</body></html>"""
+
+
+def pagina_busca(instrumentos: list, pagina: int, tem_proxima: bool, query: str) -> str:
+    linhas = '\n'.join(
+        f"<tr><td><a href=\"/ConvencaoColetiva/Detalhes/{i['id']}\">{i['titulo']}</a></td>"
+        f"<td>{i['data_publicacao']:%d/%m/%Y}</td><td>{i['municipio']}</td><td>{i['uf']}</td></tr>"
+        for i in instrumentos
+    )
+    proxima = ''
+    if tem_proxima:
+        proxima = f"<a class=\"proxima\" href=\"/ConvencaoColetiva/Consulta?{query}pagina={pagina + 1}\">Próxima</a>"
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR"><head><meta charset="utf-8"><title>Mediador - Consulta</title></head>
+<body>
+<div class="resultados">
+<table>
+<tr><th>Instrumento</th><th>Publicação</th><th>Município</th><th>UF</th></tr>
+{linhas}
+</table>
+<div class="paginacao">{proxima}</div>
+</div>
+</body></html>"""
+
+
+class Estatisticas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requisicoes = 0
+        self.erros = 0
+        self.bytes = 0
+        self.inicio = time.monotonic()
+
+    def registrar(self, status: int, tamanho: int):
+        with self.lock:
+            self.requisicoes += 1
+            self.bytes += tamanho
+            if status >= 500:
+                self.erros += 1
+
+    def resumo(self) -> str:
+        elapsed = time.monotonic() - self.inicio
+        return (f"{self.requisicoes} requisições ({self.requisicoes / elapsed:.1f}/s), "
+                f"{self.erros} erros injetados, {self.bytes / 1024 / 1024:.1f} MB enviados")
+
+
+class MediadorFalsoHandler(BaseHTTPRequestHandler):
+    server_version = "MediadorFalso/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        srv = self.server
+        # Latência simulada, com jitter
+        atraso = srv.latencia_ms + (random.uniform(0, srv.jitter_ms) if srv.jitter_ms else 0)
+        if atraso:
+            time.sleep(atraso / 1000)
+
+        if srv.taxa_erro and random.random() < srv.taxa_erro:
+            return self._responder(503, b'Servico temporariamente indisponivel', 'text/plain; charset=utf-8')
+
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip('/') or '/'
+
+        if path == '/api/instrumentos':
+            return self._api_instrumentos(params)
+        if path in ('/ConvencaoColetiva/Consulta', '/Consulta', '/busca', '/pesquisa'):
+            return self._busca(params)
+
+        match = re.fullmatch(r'/(?:instrumento|convencao|detalhes|ConvencaoColetiva/(?:Detalhes|Visualizar))/(\d+)', path)
+        if match:
+            instrumento_id = int(match.group(1))
+            if not srv.catalogo.existe(instrumento_id):
+                return self._responder(404, b'Instrumento nao encontrado', 'text/plain; charset=utf-8')
+            html = pagina_detalhes(srv.catalogo.instrumento(instrumento_id))
+            return self._responder(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+        match = re.fullmatch(r'/documentos/(\d+)\.pdf', path)
+        if match:
+            return self._documento(int(match.group(1)))
+
+        if path == '/':
+            html = '<html><body><a href="/ConvencaoColetiva/Consulta">Consultar instrumentos coletivos</a></body></html>'
+            return self._responder(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+        return self._responder(404, b'Not Found', 'text/plain; charset=utf-8')
+
+    def _api_instrumentos(self, params: dict):
+        catalogo = self.server.catalogo
+        desde = params.get('data_publicacao_inicio')
+        resultados = []
+        for instrumento_id in catalogo.ids():
+            if desde:
+                if catalogo.instrumento(instrumento_id)['data_publicacao'].isoformat() < desde[:10]:
+                    continue
+            resultados.append({'id': instrumento_id})
+        corpo = json.dumps({'count': len(resultados), 'results': resultados}).encode('utf-8')
+        self._responder(200, corpo, 'application/json')
+
+    def _busca(self, params: dict):
+        catalogo = self.server.catalogo
+        pagina = max(1, int(params.pop('pagina', 1) or 1))
+        uf = (params.get('uf') or '').upper()
+        municipio = (params.get('municipio') or '').upper()
+
+        encontrados = []
+        for instrumento_id in catalogo.ids():
+            instrumento = catalogo.instrumento(instrumento_id)
+            if uf and instrumento['uf'] != uf:
+                continue
+            if municipio and municipio not in instrumento['municipio']:
+                continue
+            encontrados.append(instrumento)
+
+        inicio = (pagina - 1) * RESULTADOS_POR_PAGINA
+        pagina_atual = encontrados[inicio:inicio + RESULTADOS_POR_PAGINA]
+        query = ''.join(f"{k}={v}&" for k, v in params.items())
+        html = pagina_busca(pagina_atual, pagina, inicio + RESULTADOS_POR_PAGINA < len(encontrados), query)
+        self._responder(200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _documento(self, instrumento_id: int):
+        srv = self.server
+        if not srv.catalogo.existe(instrumento_id):
+            return self._responder(404, b'Documento nao encontrado', 'text/plain; charset=utf-8')
+
+        with srv.documentos_lock:
+            corpo = srv.documentos.get(instrumento_id)
+        if corpo is None:
+            instrumento = srv.catalogo.instrumento(instrumento_id)
+            paginas = srv.catalogo.paginas_texto(instrumento)
+            corpo = pdf_imagem(paginas) if instrumento['imagem'] else pdf_digital(paginas)
+            with srv.documentos_lock:
+                srv.documentos[instrumento_id] = corpo
+        self._responder(200, corpo, 'application/pdf')
+
+    def _responder(self, status: int, corpo: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+        self.server.estatisticas.registrar(status, len(corpo))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor Mediador sintético para testes de carga")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--instrumentos', type=int, default=1000, help="Quantidade de instrumentos gerados")
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help="Latência fixa por requisição")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="Latência adicional aleatória (0 a N ms)")
+    parser.add_argument('--taxa-erro', type=float, default=0.0, help="Fração das requisições respondidas com 503")
+    parser.add_argument('--proporcao-imagem', type=float, default=0.3,
+                        help="Fração dos documentos gerados como PDF só imagem (exigem OCR)")
+    parser.add_argument('--paginas-documento', type=int, default=3, help="Páginas por documento PDF")
+    parser.add_argument('--verbose', action='store_true', help="Registrar cada requisição")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.porta), MediadorFalsoHandler)
+    server.daemon_threads = True
+    server.catalogo = Catalogo(args.instrumentos, args.proporcao_imagem, max(1, args.paginas_documento))
+    server.latencia_ms = args.latencia_ms
+    server.jitter_ms = args.jitter_ms
+    server.taxa_erro = args.taxa_erro
+    server.verbose = args.verbose
+    server.estatisticas = Estatisticas()
+    # PDFs gerados ficam em memória: o custo de gerar não deve entrar na medição
+    server.documentos = {}
+    server.documentos_lock = threading.Lock()
+
+    print("=" * 60)
+    print(f"Mediador sintético em http://{args.host}:{args.porta}")
+    print(f"{args.instrumentos} instrumentos, latência {args.latencia_ms:.0f}+{args.jitter_ms:.0f} ms, "
+          f"taxa de erro {args.taxa_erro:.1%}, {args.proporcao_imagem:.0%} PDFs só imagem")
+    print("=" * 60)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n{server.estatisticas.resumo()}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,21 @@
+"""
+Script para remover do storage documentos que não pertencem a nenhuma convenção
+"""
+import sys
+import os
+
+# Adicionar o diretório raiz ao path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.tasks.storage_gc import gc_document_blobs_task
+
+if __name__ == "__main__":
+    dry_run = '--dry-run' in sys.argv
+    print("Iniciando limpeza de documentos órfãos..." + (" (simulação)" if dry_run else ""))
+    result = gc_document_blobs_task(dry_run=dry_run)
+    print(f"\nResultado: {result}")
+    if result.get("status") == "success":
+        print(f"✅ {result.get('deleted', 0)} documentos removidos, "
+              f"{result.get('bytes_freed', 0) / (1024 * 1024):.1f} MB liberados")
+    else:
+        print(f"❌ Erro: {result.get('message', 'Erro desconhecido')}")
@@ -0,0 +1,149 @@
+import threading
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from app.services import circuit_breaker as cb
+from app.services.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerAdapter, CircuitOpenError,
+)
+
+KEY = "https://mediador.example/ConvencaoColetiva/Detalhes/{id}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cb.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture(params=["local", "redis"])
+def backend(request):
+    """Run each test against the in-process fallback and against Redis"""
+    if request.param == "redis":
+        request.getfixturevalue("fake_redis")
+    return request.param
+
+
+def breaker():
+    return CircuitBreaker(failure_threshold=3, backoff_seconds=10, max_backoff_seconds=80)
+
+
+def open_circuit(b, key=KEY):
+    state = None
+    for _ in range(3):
+        state = b.allow(key)
+        b.record_failure(key, state, "timeout")
+
+
+def test_opens_after_consecutive_failures(clock, backend):
+    b = breaker()
+    for _ in range(2):
+        b.record_failure(KEY, b.allow(KEY), "timeout")
+    assert cb._states.get(KEY)["state"] == CLOSED
+    b.record_failure(KEY, b.allow(KEY), "timeout")
+    state = cb._states.get(KEY)
+    assert state["state"] == OPEN and state["opens"] == 1
+    assert 5 <= state["retry_at"] - clock.now <= 10
+    with pytest.raises(CircuitOpenError):
+        b.allow(KEY)
+
+
+def test_success_resets_failures(clock, backend):
+    b = breaker()
+    b.record_failure(KEY, b.allow(KEY), "timeout")
+    b.record_success(KEY, b.allow(KEY))
+    assert cb._states.get(KEY) is None
+
+
+def test_half_open_probe_then_close(clock, backend):
+    b = breaker()
+    open_circuit(b)
+    clock.now = cb._states.get(KEY)["retry_at"] + 1
+    probe = b.allow(KEY)
+    assert probe["state"] == HALF_OPEN
+    # Only one probe per window
+    with pytest.raises(CircuitOpenError):
+        b.allow(KEY)
+    b.record_success(KEY, probe)
+    assert cb._states.get(KEY) is None
+    assert b.allow(KEY) is None
+
+
+def test_failed_probe_reopens_with_longer_backoff(clock, backend):
+    b = breaker()
+    open_circuit(b)
+    clock.now = cb._states.get(KEY)["retry_at"] + 1
+    b.record_failure(KEY, b.allow(KEY), "timeout")
+    state = cb._states.get(KEY)
+    assert state["state"] == OPEN and state["opens"] == 2
+    assert 10 <= state["retry_at"] - clock.now <= 20
+
+
+def test_single_probe_among_concurrent_callers(clock, backend):
+    b = breaker()
+    open_circuit(b)
+    clock.now = cb._states.get(KEY)["retry_at"] + 1
+    allowed, rejected = [], []
+    barrier = threading.Barrier(8)
+
+    def call():
+        barrier.wait()
+        try:
+            allowed.append(b.allow(KEY))
+        except CircuitOpenError:
+            rejected.append(1)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(allowed) == 1 and len(rejected) == 7
+
+
+class FakeAdapter(BaseAdapter):
+    def __init__(self):
+        super().__init__()
+        self.sent = 0
+
+    def send(self, request, **kwargs):
+        self.sent += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def test_host_probe_released_when_endpoint_is_open(clock, backend):
+    inner = FakeAdapter()
+    adapter = CircuitBreakerAdapter(inner, breaker())
+    session = requests.Session()
+    session.mount("https://", adapter)
+    url = "https://mediador.example/ConvencaoColetiva/Detalhes/123456"
+    host_key, endpoint_key = cb.circuit_keys(url)
+
+    open_circuit(adapter.breaker, host_key)
+    open_circuit(adapter.breaker, endpoint_key)
+    clock.now = cb._states.get(host_key)["retry_at"] + 1
+    cb._states.set(endpoint_key, dict(cb._states.get(endpoint_key), retry_at=clock.now + 60))
+
+    with pytest.raises(CircuitOpenError):
+        session.get(url)
+    assert inner.sent == 0
+    # The host probe was given back: a request to another endpoint may probe now
+    assert cb._states.get(host_key)["state"] == OPEN
+    response = session.get("https://mediador.example/Consulta")
+    assert response.status_code == 200 and inner.sent == 1
+    assert cb._states.get(host_key) is None
@@ -0,0 +1,46 @@
+import threading
+import time
+from app.services.crawler import MetadataCrawler
+
+RATE = 20.0
+
+
+class FallbackScraper:
+    """Each detail page needs three requests, as when the first URL patterns 404"""
+
+    def __init__(self):
+        self.request_times = []
+        self._lock = threading.Lock()
+
+    def extract_metadados(self, instrumento_id, throttle=True, before_request=None):
+        for _ in range(3):
+            if before_request is not None:
+                before_request()
+            with self._lock:
+                self.request_times.append(time.monotonic())
+        return {"instrumento_id": instrumento_id}
+
+
+def test_rate_limit_applies_to_every_request():
+    scraper = FallbackScraper()
+    crawler = MetadataCrawler(scraper, workers=4, max_requests_per_second=RATE)
+
+    results, stats = crawler.run([str(i) for i in range(4)])
+
+    assert stats.pages == 4 and stats.failures == 0
+    assert set(results) == {"0", "1", "2", "3"}
+    times = sorted(scraper.request_times)
+    assert len(times) == 12
+    # Slots are 1/RATE apart: 12 requests take at least 11 intervals
+    assert times[-1] - times[0] >= 11 / RATE * 0.9
+    # and no second holds more than RATE requests
+    for i, start in enumerate(times):
+        assert sum(1 for t in times[i:] if t - start < 1.0) <= RATE
+
+
+def test_no_limit_when_rate_is_zero():
+    scraper = FallbackScraper()
+    started = time.monotonic()
+    MetadataCrawler(scraper, workers=4, max_requests_per_second=0).run([str(i) for i in range(4)])
+    assert time.monotonic() - started < 0.5
+    assert len(scraper.request_times) == 12
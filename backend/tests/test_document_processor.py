@@ -0,0 +1,47 @@
+import os
+import pytest
+from PIL import Image
+from app.services import document_processor as dp
+from app.services.document_processor import OcrOptions
+
+
+def word_boxes(words, confidence):
+    """image_to_data output: one paragraph of two lines"""
+    return {
+        "text": words,
+        "conf": [confidence] * len(words),
+        "block_num": [1] * len(words),
+        "par_num": [1] * len(words),
+        "line_num": [1] + [2] * (len(words) - 1),
+    }
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Render pages as images whose width is the dpi; low resolutions read with low confidence"""
+    def render(filepath, first_page, last_page, dpi, output_folder):
+        paths = []
+        for number in range(first_page, last_page + 1):
+            path = os.path.join(output_folder, f"{number}-{dpi}.png")
+            Image.new("L", (dpi, 10)).save(path)
+            paths.append(path)
+        return paths, 0.0
+
+    def image_to_data(image, lang, output_type):
+        confidence = 40.0 if image.width < 300 else 90.0
+        return word_boxes(["CLAUSULA", "PRIMEIRA", f"{image.width}dpi"], confidence)
+
+    monkeypatch.setattr(dp, "_render", render)
+    monkeypatch.setattr(dp.pytesseract, "image_to_data", image_to_data)
+    monkeypatch.setattr(dp.pytesseract, "image_to_string", lambda *a, **k: pytest.fail("image_to_string used"))
+
+
+def test_escalated_pages_share_the_rebuilt_layout(fake_ocr):
+    pages = dp._ocr_pages("doc.pdf", 1, 2, OcrOptions("por", 300, 150, 60.0))
+    assert [page.dpi for page in pages] == [300, 300]
+    assert [page.text for page in pages] == ["CLAUSULA\nPRIMEIRA 300dpi"] * 2
+
+
+def test_non_adaptive_pages_use_the_same_layout(fake_ocr):
+    pages = dp._ocr_pages("doc.pdf", 1, 1, OcrOptions("por", 300, None, 60.0))
+    assert pages[0].text == "CLAUSULA\nPRIMEIRA 300dpi"
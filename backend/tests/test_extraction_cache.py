@@ -0,0 +1,67 @@
+import os
+import pytest
+from app.services import extraction_cache
+from app.services.extraction_cache import ExtractionCache
+
+
+def value(n):
+    # Incompressible enough that every entry has about the same size on disk
+    return {"text": os.urandom(2048).hex(), "n": n}
+
+
+@pytest.fixture
+def entry_size(tmp_path):
+    probe = ExtractionCache(str(tmp_path / "probe"), max_bytes=1 << 30)
+    probe.put("probe", value(0))
+    return probe.size_bytes
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    extraction_cache.stats.reset()
+
+
+def age(cache, key, mtime):
+    os.utime(cache._path(key), (mtime, mtime))
+
+
+def test_evicts_least_recently_used_entries(tmp_path, entry_size):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=int(entry_size * 3.5))
+    for n, key in enumerate(["a", "b", "c"]):
+        cache.put(key, value(n))
+        age(cache, key, 1_000_000 + n)
+    # A hit refreshes the entry, so "b" is now the oldest
+    assert cache.get("document", "a")["n"] == 0
+
+    cache.put("d", value(3))
+
+    assert cache.get("document", "b") is None
+    assert all(cache.get("document", key) is not None for key in ["a", "c", "d"])
+    assert extraction_cache.stats.evicted == 1
+    assert cache.size_bytes <= cache.max_bytes * extraction_cache.EVICTION_TARGET
+
+
+def test_evicts_down_to_the_target(tmp_path, entry_size):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=int(entry_size * 4.5))
+    for n in range(5):
+        cache.put(f"k{n}", value(n))
+        age(cache, f"k{n}", 1_000_000 + n)
+    # 5 entries over a 4.5 limit, target 4.05: only the oldest goes
+    assert extraction_cache.stats.evicted == 1
+    assert cache.get("page", "k0") is None
+    assert cache.get("page", "k1") is not None
+
+
+def test_size_is_recounted_on_startup(tmp_path, entry_size):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+    for n in range(3):
+        cache.put(f"k{n}", value(n))
+    assert ExtractionCache(str(tmp_path / "cache"), max_bytes=1 << 30).size_bytes == cache.size_bytes
+
+
+def test_overwrite_does_not_double_count(tmp_path, entry_size):
+    cache = ExtractionCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+    cache.put("k", value(0))
+    cache.put("k", value(1))
+    assert abs(cache.size_bytes - entry_size) < 64
+    assert cache.get("document", "k")["n"] == 1
@@ -0,0 +1,73 @@
+import codecs
+import pytest
+from app.services.html_parser import SEARCH_RESULTS_STRAINER, _decode, decode_html, parse_html
+
+TEXT = "Convenção Coletiva – São Paulo"
+
+
+def test_bom_wins_over_declarations():
+    body = codecs.BOM_UTF8 + TEXT.encode("utf-8")
+    assert _decode(body, "text/html; charset=iso-8859-1") == (TEXT, "utf-8")
+
+
+def test_utf16_bom():
+    body = codecs.BOM_UTF16_LE + TEXT.encode("utf-16-le")
+    assert _decode(body, None) == (TEXT, "utf-16-le")
+
+
+def test_non_latin_declaration_is_trusted():
+    body = "Конвенция".encode("koi8-r")
+    assert _decode(body, "text/html; charset=koi8-r") == ("Конвенция", "koi8-r")
+
+
+def test_header_declaration_before_meta():
+    body = '<meta charset="utf-8"><p>Конвенция</p>'.encode("koi8-r")
+    text, encoding = _decode(body, "text/html; charset=koi8-r")
+    assert encoding == "koi8-r" and "Конвенция" in text
+
+
+def test_meta_declaration_when_no_header():
+    body = '<meta charset="koi8-r"><p>Конвенция</p>'.encode("koi8-r")
+    text, encoding = _decode(body, "text/html")
+    assert encoding == "koi8-r" and "Конвенция" in text
+
+
+def test_meta_only_in_first_kilobyte():
+    body = b"<p>" + b" " * 2000 + '<meta charset="koi8-r">Конвенция'.encode("koi8-r")
+    # Not valid UTF-8 and no usable declaration: windows-1252 fallback
+    assert _decode(body, None)[1] == "cp1252"
+
+
+def test_wrong_non_latin_declaration_falls_back_to_sniffing():
+    # Declared ASCII, but the body is UTF-8
+    assert _decode(TEXT.encode("utf-8"), "text/html; charset=ascii") == (TEXT, "utf-8")
+
+
+@pytest.mark.parametrize("declared", ["iso-8859-1", "windows-1252"])
+def test_latin1_declaration_with_utf8_body_is_read_as_utf8(declared):
+    body = TEXT.encode("utf-8")
+    assert _decode(body, f"text/html; charset={declared}") == (TEXT, "utf-8")
+
+
+def test_latin1_declaration_used_when_body_is_not_utf8():
+    body = "Convenção São Paulo".encode("iso-8859-1")
+    assert _decode(body, "text/html; charset=iso-8859-1") == ("Convenção São Paulo", "iso8859-1")
+
+
+def test_undeclared_latin_body_falls_back_to_cp1252():
+    body = TEXT.encode("cp1252")
+    assert _decode(body, None) == (TEXT, "cp1252")
+
+
+def test_undefined_cp1252_bytes_are_replaced_not_dropped():
+    text, encoding = _decode(b"a\x81b\xe7", None)
+    assert encoding == "cp1252"
+    assert text == "a�bç"
+
+
+def test_parse_html_decodes_bytes_with_strainer():
+    body = '<html><head><title>x</title></head><body><table><tr><td>São Paulo</td></tr></table></body></html>'
+    soup = parse_html(body.encode("utf-8"), only=SEARCH_RESULTS_STRAINER)
+    assert soup.find("td").get_text() == "São Paulo"
+    assert soup.find("title") is None
+    assert decode_html(body.encode("cp1252")) == body
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+from app.services.http_fixtures import RECORD, REPLAY, fixture_path, install_http_fixtures
+
+
+class EchoAdapter(BaseAdapter):
+    """Answers with the request body, or the URL for requests without one"""
+
+    def send(self, request, **kwargs):
+        body = request.body or request.url
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response._content = body.encode("utf-8") if isinstance(body, str) else body
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def session(mode, corpus):
+    s = requests.Session()
+    s.mount("https://", EchoAdapter())
+    install_http_fixtures(s, mode=mode, corpus_dir=corpus)
+    return s
+
+
+def test_posts_with_different_bodies_are_recorded_apart(tmp_path):
+    url = "https://mediador.example/Consulta"
+    recorder = session(RECORD, str(tmp_path))
+    recorder.post(url, data={"uf": "SP"})
+    recorder.post(url, data={"uf": "RJ"})
+    recorder.get(url)
+
+    replay = session(REPLAY, str(tmp_path))
+    assert replay.post(url, data={"uf": "SP"}).text == "uf=SP"
+    assert replay.post(url, data={"uf": "RJ"}).text == "uf=RJ"
+    assert replay.get(url).text == url
+    with pytest.raises(requests.ConnectionError):
+        replay.post(url, data={"uf": "MG"})
+
+
+def test_requests_without_body_keep_the_method_and_url_key(tmp_path):
+    url = "https://mediador.example/Consulta?uf=SP"
+    key = hashlib.sha256(f"GET {url}".encode("utf-8")).hexdigest()[:32]
+    assert fixture_path(str(tmp_path), "get", url) == os.path.join(str(tmp_path), "mediador.example", f"{key}.json.gz")
@@ -0,0 +1,36 @@
+import asyncio
+import threading
+import time
+from app.services.mediador_async import AsyncMediadorClient
+
+
+class SlowClient:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def search_convencoes(self, **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return [kwargs]
+
+
+def test_shared_client_serves_several_event_loops():
+    client = SlowClient()
+    live = AsyncMediadorClient(client=client, max_concurrency=2)
+
+    async def burst():
+        return await asyncio.gather(*(live.search_convencoes(uf=f"U{n}") for n in range(6)))
+
+    try:
+        # Callers queue on the semaphore in both loops, which binds it to the loop
+        for _ in range(2):
+            assert len(asyncio.run(burst())) == 6
+    finally:
+        live.shutdown()
+    assert client.peak <= 2
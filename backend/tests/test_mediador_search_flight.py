@@ -0,0 +1,84 @@
+import threading
+import time
+import pytest
+import requests
+from app.services.mediador_api import MediadorAPIClient
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_buffered_and_streamed_searches_keep_their_error_contracts(monkeypatch):
+    client = MediadorAPIClient()
+    calls = []
+    release = threading.Event()
+
+    def failing_pages(*args, **kwargs):
+        calls.append(args)
+        release.wait(5)
+        raise requests.ConnectionError("site down")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(client, "iter_result_pages", failing_pages)
+    outcome = {}
+
+    def buffered():
+        outcome["buffered"] = client.search_convencoes(municipio="São Paulo", uf="sp", limit=5)
+
+    def streamed():
+        try:
+            client.search_result_pages("São Paulo", "sp", None, None, 5, on_page=lambda page: None)
+        except requests.ConnectionError as e:
+            outcome["streamed"] = e
+
+    threads = [threading.Thread(target=buffered), threading.Thread(target=streamed)]
+    for t in threads:
+        t.start()
+    # Both searches reach the site instead of one joining the other
+    assert wait_for(lambda: len(calls) == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert outcome["buffered"] == []
+    assert isinstance(outcome["streamed"], requests.ConnectionError)
+
+
+def test_concurrent_streamed_searches_share_one_fetch(monkeypatch):
+    client = MediadorAPIClient()
+    calls = []
+    release = threading.Event()
+    rows = [{"instrumento_id": f"MR{n:06d}"} for n in range(3)]
+
+    def pages(*args, **kwargs):
+        calls.append(args)
+        release.wait(5)
+        yield rows[:2]
+        yield rows[2:]
+
+    monkeypatch.setattr(client, "iter_result_pages", pages)
+    delivered = {0: [], 1: []}
+    results = {}
+
+    def streamed(n):
+        results[n] = client.search_result_pages(
+            "Campinas", "SP", None, None, 10, on_page=delivered[n].extend
+        )
+
+    leader = threading.Thread(target=streamed, args=(0,))
+    leader.start()
+    assert wait_for(lambda: len(calls) == 1)
+    follower = threading.Thread(target=streamed, args=(1,))
+    follower.start()
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(calls) == 1
+    assert results[0] == results[1] == rows
+    assert delivered[0] == delivered[1] == rows
@@ -0,0 +1,31 @@
+import pytest
+from app.services.search_cache import normalize_search_key, search_params
+
+
+@pytest.mark.parametrize("a, b", [
+    (dict(municipio="São Paulo", uf="sp"), dict(municipio="  São   Paulo ", uf=" SP ")),
+    (dict(cnae="6201-5/01"), dict(cnae="62.01-5/01")),
+    (dict(cnpj="12.345.678/0001-90"), dict(cnpj="12345678000190")),
+    (dict(municipio="", uf=None), dict()),
+    (dict(municipio="Campinas", uf="SP"), dict(uf="SP", municipio="Campinas")),
+])
+def test_formatting_variants_share_a_key(a, b):
+    assert normalize_search_key(**a) == normalize_search_key(**b)
+
+
+@pytest.mark.parametrize("a, b", [
+    # The site receives the city as typed, so these are different searches
+    (dict(municipio="São Paulo"), dict(municipio="sao paulo")),
+    (dict(municipio="Campinas", uf="SP"), dict(municipio="Campinas", uf="RJ")),
+    (dict(cnae="6201501"), dict(cnpj="6201501")),
+    (dict(uf="SP", limit=20), dict(uf="SP", limit=50)),
+])
+def test_different_searches_get_different_keys(a, b):
+    assert normalize_search_key(**a) != normalize_search_key(**b)
+
+
+def test_key_is_built_from_the_params_sent():
+    params = search_params(municipio=" São  Paulo", uf="sp", cnae="6201-5/01", cnpj="12.345.678/0001-90")
+    assert params == {"municipio": "São Paulo", "uf": "SP", "cnae": "6201501", "cnpj": "12345678000190"}
+    # Searching again with the sent params is the same cache entry
+    assert normalize_search_key(**params) == normalize_search_key(" São  Paulo", "sp", "6201-5/01", "12.345.678/0001-90")
@@ -0,0 +1,86 @@
+import threading
+import time
+import pytest
+from app.services.single_flight import SingleFlight
+
+
+class SlowFetch:
+    def __init__(self, result="result", error=None, seconds=0.2):
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.result, self.error, self.seconds = result, error, seconds
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.seconds)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(calls):
+    """Start every call at once; returns {index: result or exception}"""
+    outcomes = {}
+    barrier = threading.Barrier(len(calls))
+
+    def run(index, call):
+        barrier.wait()
+        try:
+            outcomes[index] = call()
+        except Exception as e:
+            outcomes[index] = e
+
+    threads = [threading.Thread(target=run, args=item) for item in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return outcomes
+
+
+def test_one_leader_per_key_in_process():
+    flight = SingleFlight("test", lock_seconds=5, wait_seconds=5)
+    fetch = SlowFetch()
+    outcomes = run_concurrently([lambda: flight.do("key", fetch)] * 8)
+    assert fetch.calls == 1
+    assert list(outcomes.values()) == ["result"] * 8
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight("test", lock_seconds=5, wait_seconds=5)
+    fetch = SlowFetch()
+    run_concurrently([lambda: flight.do("a", fetch), lambda: flight.do("b", fetch)])
+    assert fetch.calls == 2
+
+
+def test_leader_error_reaches_every_caller():
+    flight = SingleFlight("test", lock_seconds=5, wait_seconds=5)
+    fetch = SlowFetch(error=ValueError("site down"))
+    outcomes = run_concurrently([lambda: flight.do("key", fetch)] * 4)
+    assert fetch.calls == 1
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes.values())
+
+
+def test_one_leader_across_workers(fake_redis):
+    # Separate instances share nothing in process, like two Celery/uvicorn workers
+    workers = [SingleFlight("test", lock_seconds=5, wait_seconds=5) for _ in range(4)]
+    fetch = SlowFetch(result={"convencoes": [1, 2, 3]})
+    outcomes = run_concurrently([lambda w=w: w.do("key", fetch) for w in workers])
+    assert fetch.calls == 1
+    assert list(outcomes.values()) == [{"convencoes": [1, 2, 3]}] * 4
+    assert not fake_redis.keys("cc:flight:test:lock:*")
+
+
+def test_waiting_worker_fetches_itself_after_timeout(fake_redis):
+    slow = SingleFlight("test", lock_seconds=5, wait_seconds=5)
+    impatient = SingleFlight("test", lock_seconds=5, wait_seconds=0.2)
+    fetch = SlowFetch(seconds=1.0)
+
+    def late():
+        time.sleep(0.05)
+        return impatient.do("key", fetch)
+
+    outcomes = run_concurrently([lambda: slow.do("key", fetch), late])
+    assert fetch.calls == 2
+    assert list(outcomes.values()) == ["result"] * 2